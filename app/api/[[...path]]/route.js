@@ -12,6 +12,8 @@ const DB_NAME = process.env.DB_NAME || 'pinly_store';
 const JWT_SECRET = process.env.JWT_SECRET || 'your-super-secret-jwt-key';
 const BASE_URL = process.env.NEXT_PUBLIC_BASE_URL || 'http://localhost:3000';
 const APP_VERSION = '1.0.0';
+// Overridable so tests/player_api_stub.py can stand in for RapidAPI
+const RAPIDAPI_BASE_URL = process.env.RAPIDAPI_BASE_URL || 'https://id-game-checker.p.rapidapi.com';
 
 // ============================================
 // RATE LIMITING CONFIG
@@ -969,7 +971,7 @@ export async function GET(request) {
 
         // Call PUBG Mobile ID Game Checker API via RapidAPI
         const response = await fetch(
-          `https://id-game-checker.p.rapidapi.com/pubgm-global/${playerId}`,
+          `${RAPIDAPI_BASE_URL}/pubgm-global/${playerId}`,
           {
             method: 'GET',
             headers: {
@@ -3,47 +3,63 @@
 Callback Security Tests - Focused test for callback validation
 """
 
-import requests
 import json
 import time
-import hashlib
 from datetime import datetime
+from tests.http_client import get_client
+from tests import token_cache, results_store
+from tests.shopier_crypto import shopier_hash
 
 BASE_URL = "https://cpanel-db-setup.preview.emergentagent.com/api"
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin123"
 TEST_SHOPIER_API_SECRET = "test_secret_abcdef"
 
+# Shared keep-alive client (tests/http_client.py)
+http = get_client()
+
 admin_token = None
 test_product_id = None
 
+# test_result.md task each test name reports to (tests/results_store.py)
+RESULT_TASKS = {
+    "Callback with Correct Hash Validation": "Callback Handler - Hash Validation",
+    "Callback with Incorrect Hash (Should Reject)": "Callback Handler - Hash Validation",
+    "Immutable Status Transitions (FAILED → PAID Rejected)": "Callback Handler - Immutable Status Transitions",
+}
+
 def print_test_header(test_name):
     print(f"\n{'='*80}")
     print(f"TEST: {test_name}")
     print(f"{'='*80}")
 
-def print_result(success, message):
+def print_result(test_name, success, message):
+    results_store.record(test_name, success, message, task=RESULT_TASKS.get(test_name))
     status = "✅ PASS" if success else "❌ FAIL"
     print(f"{status}: {message}")
 
 def generate_shopier_hash(order_id, amount, secret):
-    data = f"{order_id}{amount}{secret}"
-    return hashlib.sha256(data.encode()).hexdigest()
+    # Formats the amount like the backend's `${amount}` (20.0 -> "20")
+    return shopier_hash(order_id, amount, secret)
 
-# Login and get product
-def setup():
-    global admin_token, test_product_id
-    
-    # Login
-    response = requests.post(
+def request_admin_token():
+    response = http.post(
         f"{BASE_URL}/admin/login",
         json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD},
         timeout=10
     )
-    if response.status_code == 200:
-        admin_token = response.json()['data']['token']
-        print("✅ Admin login successful")
-    else:
+    if response.status_code != 200:
+        return None
+    print("✅ Admin login successful")
+    return response.json()['data']['token']
+
+# Login and get product
+def setup():
+    global admin_token, test_product_id
+    
+    # Login (token reused across runs and renewed on 401, see tests/token_cache.py)
+    admin_token = token_cache.get_token(BASE_URL, f"admin:{ADMIN_USERNAME}", request_admin_token)
+    if not admin_token:
         print("❌ Admin login failed")
         return False
     
@@ -55,7 +71,7 @@ def setup():
         "apiSecret": TEST_SHOPIER_API_SECRET,
         "mode": "production"
     }
-    response = requests.post(
+    response = http.post(
         f"{BASE_URL}/admin/settings/payments",
         json=payload,
         headers=headers,
@@ -68,7 +84,7 @@ def setup():
         return False
     
     # Get products
-    response = requests.get(f"{BASE_URL}/products", timeout=10)
+    response = http.get(f"{BASE_URL}/products", timeout=10)
     if response.status_code == 200:
         products = response.json()['data']
         test_product_id = products[0]['id']
@@ -81,18 +97,19 @@ def setup():
 
 # TEST: Callback with Correct Hash
 def test_callback_correct_hash():
-    print_test_header("Callback with Correct Hash Validation")
+    test_name = "Callback with Correct Hash Validation"
+    print_test_header(test_name)
     
     try:
         # Create order
-        order_response = requests.post(
+        order_response = http.post(
             f"{BASE_URL}/orders",
             json={"productId": test_product_id, "playerId": "7777777777", "playerName": "CallbackTest#7777"},
             timeout=10
         )
         
         if order_response.status_code != 200:
-            print_result(False, f"Failed to create order: {order_response.status_code} - {order_response.text}")
+            print_result(test_name, False, f"Failed to create order: {order_response.status_code} - {order_response.text}")
             return False
         
         order = order_response.json()['data']['order']
@@ -117,7 +134,7 @@ def test_callback_correct_hash():
             "hash": correct_hash
         }
         
-        response = requests.post(
+        response = http.post(
             f"{BASE_URL}/payment/shopier/callback",
             json=callback_payload,
             timeout=10
@@ -129,7 +146,7 @@ def test_callback_correct_hash():
         if response.status_code == 200:
             data = response.json()
             if data.get('success'):
-                print_result(True, "Callback with correct hash accepted")
+                print_result(test_name, True, "Callback with correct hash accepted")
                 
                 # Verify order status
                 from pymongo import MongoClient
@@ -138,37 +155,38 @@ def test_callback_correct_hash():
                 updated_order = db.orders.find_one({"id": order_id})
                 
                 if updated_order['status'] == 'paid':
-                    print_result(True, "Order status updated to 'paid'")
+                    print_result(test_name, True, "Order status updated to 'paid'")
                     return True
                 else:
-                    print_result(False, f"Order status: {updated_order['status']}")
+                    print_result(test_name, False, f"Order status: {updated_order['status']}")
                     return False
             else:
-                print_result(False, f"Callback failed: {data}")
+                print_result(test_name, False, f"Callback failed: {data}")
                 return False
         else:
-            print_result(False, f"Callback failed with status {response.status_code}")
+            print_result(test_name, False, f"Callback failed with status {response.status_code}")
             return False
     except Exception as e:
-        print_result(False, f"Test error: {str(e)}")
+        print_result(test_name, False, f"Test error: {str(e)}")
         import traceback
         traceback.print_exc()
         return False
 
 # TEST: Callback with Incorrect Hash
 def test_callback_incorrect_hash():
-    print_test_header("Callback with Incorrect Hash (Should Reject)")
+    test_name = "Callback with Incorrect Hash (Should Reject)"
+    print_test_header(test_name)
     
     try:
         # Create order
-        order_response = requests.post(
+        order_response = http.post(
             f"{BASE_URL}/orders",
             json={"productId": test_product_id, "playerId": "8888888888", "playerName": "WrongHashTest#8888"},
             timeout=10
         )
         
         if order_response.status_code != 200:
-            print_result(False, f"Failed to create order: {order_response.text}")
+            print_result(test_name, False, f"Failed to create order: {order_response.text}")
             return False
         
         order = order_response.json()['data']['order']
@@ -185,7 +203,7 @@ def test_callback_incorrect_hash():
             "hash": wrong_hash
         }
         
-        response = requests.post(
+        response = http.post(
             f"{BASE_URL}/payment/shopier/callback",
             json=callback_payload,
             timeout=10
@@ -195,7 +213,7 @@ def test_callback_incorrect_hash():
         print(f"   Response body: {response.text}")
         
         if response.status_code == 403:
-            print_result(True, "Callback with incorrect hash rejected (403)")
+            print_result(test_name, True, "Callback with incorrect hash rejected (403)")
             
             # Check security log
             from pymongo import MongoClient
@@ -204,34 +222,35 @@ def test_callback_incorrect_hash():
             security_log = db.payment_security_logs.find_one({"orderId": order_id, "event": "hash_mismatch"})
             
             if security_log:
-                print_result(True, "Security log created for hash mismatch")
+                print_result(test_name, True, "Security log created for hash mismatch")
                 return True
             else:
-                print_result(False, "Security log NOT created")
+                print_result(test_name, False, "Security log NOT created")
                 return False
         else:
-            print_result(False, f"Should return 403, got {response.status_code}")
+            print_result(test_name, False, f"Should return 403, got {response.status_code}")
             return False
     except Exception as e:
-        print_result(False, f"Test error: {str(e)}")
+        print_result(test_name, False, f"Test error: {str(e)}")
         import traceback
         traceback.print_exc()
         return False
 
 # TEST: Immutable Status Transitions
 def test_immutable_status_transitions():
-    print_test_header("Immutable Status Transitions (FAILED → PAID Rejected)")
+    test_name = "Immutable Status Transitions (FAILED → PAID Rejected)"
+    print_test_header(test_name)
     
     try:
         # Create order
-        order_response = requests.post(
+        order_response = http.post(
             f"{BASE_URL}/orders",
             json={"productId": test_product_id, "playerId": "9999999999", "playerName": "ImmutableTest#9999"},
             timeout=10
         )
         
         if order_response.status_code != 200:
-            print_result(False, f"Failed to create order: {order_response.text}")
+            print_result(test_name, False, f"Failed to create order: {order_response.text}")
             return False
         
         order = order_response.json()['data']['order']
@@ -248,12 +267,12 @@ def test_immutable_status_transitions():
             "hash": hash1
         }
         
-        response1 = requests.post(f"{BASE_URL}/payment/shopier/callback", json=callback1, timeout=10)
+        response1 = http.post(f"{BASE_URL}/payment/shopier/callback", json=callback1, timeout=10)
         if response1.status_code != 200:
-            print_result(False, f"Failed to set order to FAILED: {response1.text}")
+            print_result(test_name, False, f"Failed to set order to FAILED: {response1.text}")
             return False
         
-        print_result(True, "Order set to FAILED")
+        print_result(test_name, True, "Order set to FAILED")
         
         # Second: Try FAILED → PAID (should be rejected)
         hash2 = generate_shopier_hash(order_id, amount, TEST_SHOPIER_API_SECRET)
@@ -265,13 +284,13 @@ def test_immutable_status_transitions():
             "hash": hash2
         }
         
-        response2 = requests.post(f"{BASE_URL}/payment/shopier/callback", json=callback2, timeout=10)
+        response2 = http.post(f"{BASE_URL}/payment/shopier/callback", json=callback2, timeout=10)
         
         print(f"   Second callback response: {response2.status_code}")
         print(f"   Response body: {response2.text}")
         
         if response2.status_code == 400:
-            print_result(True, "FAILED → PAID transition rejected (400)")
+            print_result(test_name, True, "FAILED → PAID transition rejected (400)")
             
             # Verify order still FAILED
             from pymongo import MongoClient
@@ -280,22 +299,32 @@ def test_immutable_status_transitions():
             final_order = db.orders.find_one({"id": order_id})
             
             if final_order['status'] == 'failed':
-                print_result(True, "Order status remains 'failed' (immutable)")
+                print_result(test_name, True, "Order status remains 'failed' (immutable)")
                 return True
             else:
-                print_result(False, f"Order status changed to: {final_order['status']}")
+                print_result(test_name, False, f"Order status changed to: {final_order['status']}")
                 return False
         else:
-            print_result(False, f"Should return 400, got {response2.status_code}")
+            print_result(test_name, False, f"Should return 400, got {response2.status_code}")
             return False
     except Exception as e:
-        print_result(False, f"Test error: {str(e)}")
+        print_result(test_name, False, f"Test error: {str(e)}")
         import traceback
         traceback.print_exc()
         return False
 
 # Main
 if __name__ == "__main__":
+    import sys
+    if "--load" in sys.argv:
+        # Async load mode: python callback_test.py --load --orders 2000 --rate 50
+        from tests.callback_load import main as load_main
+        sys.exit(load_main([arg for arg in sys.argv[1:] if arg != "--load"]))
+    if "--race" in sys.argv:
+        # Stock race mode: python callback_test.py --race --codes 50 --orders 80
+        from tests.stock_race import main as race_main
+        sys.exit(race_main([arg for arg in sys.argv[1:] if arg != "--race"]))
+
     print("\n" + "="*80)
     print("CALLBACK SECURITY TESTS")
     print("="*80)
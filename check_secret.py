@@ -3,8 +3,9 @@
 Check what secret is actually being used by the backend
 """
 
-import hashlib
+import os
 from pymongo import MongoClient
+from tests.shopier_crypto import decrypt, master_key, shopier_hash
 
 # Get the order and security log
 client = MongoClient("mongodb://localhost:27017")
@@ -41,8 +42,7 @@ test_secrets = [
 
 print("Trying different secrets:")
 for secret in test_secrets:
-    data = f"{order_id}{amount}{secret}"
-    hash_result = hashlib.sha256(data.encode()).hexdigest()
+    hash_result = shopier_hash(order_id, amount, secret)
     match = "✅ MATCH!" if hash_result == expected_hash else ""
     print(f"  Secret: '{secret}' -> {hash_result} {match}")
 
@@ -57,61 +57,15 @@ if settings:
     print(f"  apiSecret: {settings.get('apiSecret')[:30]}...")
     print()
     
-    # Try to decrypt using the same logic as the backend
-    # We need to import the crypto module
-    import sys
-    sys.path.insert(0, '/app')
-    
+    # Decrypt in-process with the same logic as lib/crypto.js
     try:
-        # Import the decrypt function
-        import subprocess
-        result = subprocess.run(
-            ['node', '-e', '''
-            const crypto = require('crypto');
-            const ALGORITHM = 'aes-256-gcm';
-            const IV_LENGTH = 16;
-            const AUTH_TAG_LENGTH = 16;
-            
-            function getMasterKey() {
-              const masterKey = process.env.MASTER_ENCRYPTION_KEY;
-              const hash = crypto.createHash('sha256');
-              hash.update(masterKey);
-              return hash.digest();
-            }
-            
-            function decrypt(encryptedData) {
-              const key = getMasterKey();
-              const combined = Buffer.from(encryptedData, 'base64');
-              const iv = combined.slice(0, IV_LENGTH);
-              const authTag = combined.slice(-AUTH_TAG_LENGTH);
-              const encrypted = combined.slice(IV_LENGTH, -AUTH_TAG_LENGTH);
-              const decipher = crypto.createDecipheriv(ALGORITHM, key, iv);
-              decipher.setAuthTag(authTag);
-              let decrypted = decipher.update(encrypted, null, 'utf8');
-              decrypted += decipher.final('utf8');
-              return decrypted;
-            }
-            
-            const encryptedSecret = process.argv[1];
-            const decrypted = decrypt(encryptedSecret);
-            console.log(decrypted);
-            ''', settings.get('apiSecret')],
-            capture_output=True,
-            text=True,
-            cwd='/app',
-            env={'MASTER_ENCRYPTION_KEY': 'o6kPj1WqrrH/ZWdlwh/FXKnOZ02UdkyyxTmsKRy2j9w=', 'PATH': '/usr/local/bin:/usr/bin:/bin'}
-        )
-        
-        if result.returncode == 0:
-            decrypted_secret = result.stdout.strip()
-            print(f"Decrypted API Secret: '{decrypted_secret}'")
-            
-            # Test with decrypted secret
-            data = f"{order_id}{amount}{decrypted_secret}"
-            hash_result = hashlib.sha256(data.encode()).hexdigest()
-            match = "✅ MATCH!" if hash_result == expected_hash else "❌ NO MATCH"
-            print(f"Hash with decrypted secret: {hash_result} {match}")
-        else:
-            print(f"Decryption failed: {result.stderr}")
-    except Exception as e:
-        print(f"Error decrypting: {e}")
+        key = master_key(os.getenv('MASTER_ENCRYPTION_KEY', 'o6kPj1WqrrH/ZWdlwh/FXKnOZ02UdkyyxTmsKRy2j9w='))
+        decrypted_secret = decrypt(settings.get('apiSecret'), key)
+        print(f"Decrypted API Secret: '{decrypted_secret}'")
+
+        # Test with decrypted secret (amount formatted like the backend)
+        hash_result = shopier_hash(order_id, amount, decrypted_secret)
+        match = "✅ MATCH!" if hash_result == expected_hash else "❌ NO MATCH"
+        print(f"Hash with decrypted secret: {hash_result} {match}")
+    except ValueError as e:
+        print(f"Decryption failed: {e}")
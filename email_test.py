@@ -1,17 +1,48 @@
 #!/usr/bin/env python3
 
-import requests
 import json
 import time
 import sys
 from datetime import datetime
+from tests.http_client import get_client
+from tests import token_cache, results_store
 
 # Configuration
 BASE_URL = "https://cpanel-db-setup.preview.emergentagent.com"
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin123"
+USER_PASSWORDS = ("testpass123", "newpass123")  # password test toggles between these
+
+# Shared keep-alive client (tests/http_client.py)
+http = get_client()
+
+# Tests that write the shared email_settings document must not run concurrently (tests/runner.py)
+TEST_GROUPS = {
+    "test_email_settings_post": "email_settings",
+    "test_email_settings_post_with_masked_password": "email_settings",
+    "test_email_test_authorized": "email_settings",
+}
+
+# test_result.md task each log_test() name reports to (tests/results_store.py)
+RESULT_TASKS = {
+    "Admin Login": "Admin Login Endpoint",
+    "User Registration": "User Registration Endpoint",
+    "Email Settings GET (Unauthorized)": "Email Settings Management - GET",
+    "Email Settings GET (Authorized)": "Email Settings Management - GET",
+    "Email Settings POST": "Email Settings Management - POST",
+    "Email Settings POST (Masked Password)": "Email Settings Management - POST",
+    "Password Encryption Check": "Email Encryption & Security",
+    "Email Logs GET (Unauthorized)": "Email Logs Management",
+    "Email Logs GET (Authorized)": "Email Logs Management",
+    "Test Email POST (Unauthorized)": "Test Email Functionality",
+    "Test Email POST (Authorized)": "Test Email Functionality",
+    "Welcome Email Trigger": "Welcome Email Trigger",
+    "Password Change": "Password Change Email Trigger",
+    "Password Change Email Trigger": "Password Change Email Trigger",
+}
 
 def log_test(test_name, status, details=""):
+    results_store.record(test_name, status, details, task=RESULT_TASKS.get(test_name))
     timestamp = datetime.now().strftime("%H:%M:%S")
     status_symbol = "✅" if status == "PASS" else "❌" if status == "FAIL" else "⚠️"
     print(f"[{timestamp}] {status_symbol} {test_name}")
@@ -19,9 +50,16 @@ def log_test(test_name, status, details=""):
         print(f"    {details}")
 
 def admin_login():
-    """Login as admin and return JWT token"""
+    """Login as admin and return JWT token (cached across runs and renewed on 401 by tests/token_cache.py)"""
+    token = token_cache.get_token(BASE_URL, f"admin:{ADMIN_USERNAME}", request_admin_token)
+    if token:
+        log_test("Admin Login", "PASS", f"Token: {token[:20]}...")
+    return token
+
+def request_admin_token():
+    """POST /api/admin/login; the token or None"""
     try:
-        response = requests.post(f"{BASE_URL}/api/admin/login", json={
+        response = http.post(f"{BASE_URL}/api/admin/login", json={
             "username": ADMIN_USERNAME,
             "password": ADMIN_PASSWORD
         })
@@ -29,9 +67,7 @@ def admin_login():
         if response.status_code == 200:
             data = response.json()
             if data.get('success'):
-                token = data['data']['token']
-                log_test("Admin Login", "PASS", f"Token obtained: {token[:20]}...")
-                return token
+                return data['data']['token']
             else:
                 log_test("Admin Login", "FAIL", f"Login failed: {data.get('error', 'Unknown error')}")
                 return None
@@ -43,42 +79,55 @@ def admin_login():
         return None
 
 def user_register_and_login():
-    """Register a new user and return JWT token"""
+    """Register a new user and return JWT token (reuses the cached test user while its token is valid)"""
+    entry = token_cache.get_entry(BASE_URL, "user:email_test", request_user_token)
+    if not entry:
+        return None, None, None
+    log_test("User Registration", "PASS", f"Test user: {entry['email']}")
+    return entry['token'], entry['userId'], entry['email']
+
+def request_user_token():
+    """Log the cached test user in again (token renewal), else register a new one; cache entry or None"""
     try:
+        known = token_cache.load(BASE_URL, "user:email_test")
+        if known:
+            login_response = http.post(f"{BASE_URL}/api/auth/login",
+                                       json={"email": known['email'], "password": known['password']})
+            if login_response.status_code == 200 and login_response.json().get('success'):
+                return dict(known, token=login_response.json()['data']['token'])
+
         # Generate unique email
         timestamp = int(time.time())
         email = f"testuser{timestamp}@example.com"
         
         # Register user
-        register_response = requests.post(f"{BASE_URL}/api/auth/register", json={
+        register_response = http.post(f"{BASE_URL}/api/auth/register", json={
             "firstName": "Test",
             "lastName": "User",
             "email": email,
             "phone": "5551234567",
-            "password": "testpass123"
+            "password": USER_PASSWORDS[0]
         })
         
         if register_response.status_code == 200:
             register_data = register_response.json()
             if register_data.get('success'):
-                token = register_data['data']['token']
-                user_id = register_data['data']['user']['id']
-                log_test("User Registration", "PASS", f"User registered: {email}")
-                return token, user_id, email
+                return {"token": register_data['data']['token'], "userId": register_data['data']['user']['id'],
+                        "email": email, "password": USER_PASSWORDS[0]}
             else:
                 log_test("User Registration", "FAIL", f"Registration failed: {register_data.get('error')}")
-                return None, None, None
+                return None
         else:
             log_test("User Registration", "FAIL", f"HTTP {register_response.status_code}")
-            return None, None, None
+            return None
     except Exception as e:
         log_test("User Registration", "FAIL", f"Exception: {str(e)}")
-        return None, None, None
+        return None
 
 def test_email_settings_get_unauthorized():
     """Test GET /api/admin/email/settings without admin auth"""
     try:
-        response = requests.get(f"{BASE_URL}/api/admin/email/settings")
+        response = http.get(f"{BASE_URL}/api/admin/email/settings")
         
         if response.status_code == 401:
             log_test("Email Settings GET (Unauthorized)", "PASS", "Correctly rejected unauthorized access")
@@ -94,7 +143,7 @@ def test_email_settings_get_authorized(admin_token):
     """Test GET /api/admin/email/settings with admin auth"""
     try:
         headers = {"Authorization": f"Bearer {admin_token}"}
-        response = requests.get(f"{BASE_URL}/api/admin/email/settings", headers=headers)
+        response = http.get(f"{BASE_URL}/api/admin/email/settings", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -134,7 +183,7 @@ def test_email_settings_post(admin_token):
             "testRecipientEmail": "recipient@test.com"
         }
         
-        response = requests.post(f"{BASE_URL}/api/admin/email/settings", 
+        response = http.post(f"{BASE_URL}/api/admin/email/settings", 
                                headers=headers, json=settings_data)
         
         if response.status_code == 200:
@@ -168,7 +217,7 @@ def test_email_settings_post_with_masked_password(admin_token):
             "testRecipientEmail": "recipient@test.com"
         }
         
-        response = requests.post(f"{BASE_URL}/api/admin/email/settings", 
+        response = http.post(f"{BASE_URL}/api/admin/email/settings", 
                                headers=headers, json=settings_data)
         
         if response.status_code == 200:
@@ -189,7 +238,7 @@ def test_email_settings_post_with_masked_password(admin_token):
 def test_email_logs_get_unauthorized():
     """Test GET /api/admin/email/logs without admin auth"""
     try:
-        response = requests.get(f"{BASE_URL}/api/admin/email/logs")
+        response = http.get(f"{BASE_URL}/api/admin/email/logs")
         
         if response.status_code == 401:
             log_test("Email Logs GET (Unauthorized)", "PASS", "Correctly rejected unauthorized access")
@@ -205,7 +254,7 @@ def test_email_logs_get_authorized(admin_token):
     """Test GET /api/admin/email/logs with admin auth"""
     try:
         headers = {"Authorization": f"Bearer {admin_token}"}
-        response = requests.get(f"{BASE_URL}/api/admin/email/logs", headers=headers)
+        response = http.get(f"{BASE_URL}/api/admin/email/logs", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -227,7 +276,7 @@ def test_email_test_unauthorized():
     """Test POST /api/admin/email/test without admin auth"""
     try:
         headers = {"Content-Type": "application/json"}
-        response = requests.post(f"{BASE_URL}/api/admin/email/test", headers=headers, json={})
+        response = http.post(f"{BASE_URL}/api/admin/email/test", headers=headers, json={})
         
         if response.status_code == 401:
             log_test("Test Email POST (Unauthorized)", "PASS", "Correctly rejected unauthorized access")
@@ -243,7 +292,7 @@ def test_email_test_authorized(admin_token):
     """Test POST /api/admin/email/test with admin auth"""
     try:
         headers = {"Authorization": f"Bearer {admin_token}", "Content-Type": "application/json"}
-        response = requests.post(f"{BASE_URL}/api/admin/email/test", headers=headers, json={})
+        response = http.post(f"{BASE_URL}/api/admin/email/test", headers=headers, json={})
         
         # This will likely fail without real SMTP credentials, but should test the logic
         if response.status_code == 400:
@@ -309,7 +358,7 @@ def test_welcome_email_trigger(user_token, user_id, user_email, admin_token):
     try:
         # Check email logs for welcome email
         headers = {"Authorization": f"Bearer {admin_token}"}
-        response = requests.get(f"{BASE_URL}/api/admin/email/logs", headers=headers)
+        response = http.get(f"{BASE_URL}/api/admin/email/logs", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -334,19 +383,25 @@ def test_welcome_email_trigger(user_token, user_id, user_email, admin_token):
 def test_password_change_email_trigger(user_token, user_id, admin_token):
     """Test password change email trigger"""
     try:
+        # The cached test user may already have had its password changed by an earlier run
+        cached = token_cache.load(BASE_URL, "user:email_test")
+        current_password = cached['password'] if cached and cached.get('userId') == user_id else USER_PASSWORDS[0]
+        new_password = USER_PASSWORDS[1] if current_password == USER_PASSWORDS[0] else USER_PASSWORDS[0]
+
         # Change user password
         headers = {"Authorization": f"Bearer {user_token}"}
-        response = requests.put(f"{BASE_URL}/api/account/password", 
+        response = http.put(f"{BASE_URL}/api/account/password", 
                                headers=headers, 
                                json={
-                                   "currentPassword": "testpass123",
-                                   "newPassword": "newpass123",
-                                   "confirmPassword": "newpass123"
+                                   "currentPassword": current_password,
+                                   "newPassword": new_password,
+                                   "confirmPassword": new_password
                                })
         
         if response.status_code == 200:
             data = response.json()
             if data.get('success'):
+                token_cache.update(BASE_URL, "user:email_test", password=new_password)
                 log_test("Password Change", "PASS", "Password changed successfully")
                 
                 # Wait a moment for email to be logged
@@ -354,7 +409,7 @@ def test_password_change_email_trigger(user_token, user_id, admin_token):
                 
                 # Check email logs for password change email
                 admin_headers = {"Authorization": f"Bearer {admin_token}"}
-                logs_response = requests.get(f"{BASE_URL}/api/admin/email/logs", headers=admin_headers)
+                logs_response = http.get(f"{BASE_URL}/api/admin/email/logs", headers=admin_headers)
                 
                 if logs_response.status_code == 200:
                     logs_data = logs_response.json()
@@ -3,16 +3,20 @@
 Test close ticket functionality and full flow with new user
 """
 
-import requests
 import json
 import time
 import sys
 from datetime import datetime
+from tests.http_client import get_client
+from tests import token_cache, results_store
 
 # Configuration
 BASE_URL = "https://cpanel-db-setup.preview.emergentagent.com"
 API_BASE = f"{BASE_URL}/api"
 
+# Shared keep-alive client (tests/http_client.py)
+http = get_client()
+
 # Test data for new user to avoid rate limiting
 TEST_USER_DATA = {
     "firstName": "Mehmet",
@@ -27,12 +31,20 @@ ADMIN_CREDENTIALS = {
     "password": "admin123"
 }
 
+# test_result.md task each print_test_result() name reports to (tests/results_store.py)
+RESULT_TASKS = {
+    "Close ticket without auth": "Admin Support Tickets - Close Ticket",
+    "Admin closes ticket": "Admin Support Tickets - Close Ticket",
+    "User cannot send message to closed ticket": "User Support Tickets - Send Message",
+}
+
 # Global variables
 user_token = None
 admin_token = None
 
 def print_test_result(test_name, success, details=""):
     """Print formatted test result"""
+    results_store.record(test_name, success, details, task=RESULT_TASKS.get(test_name))
     status = "✅ PASS" if success else "❌ FAIL"
     print(f"{status} {test_name}")
     if details:
@@ -44,19 +56,26 @@ def setup_user():
     global user_token
     
     print("🔧 Setting up new test user...")
-    
+    user_token = token_cache.get_token(BASE_URL, f"user:{TEST_USER_DATA['email']}", request_user_token)
+    if not user_token:
+        print(f"❌ Failed to setup user")
+        return False
+    print(f"✅ Test user ready")
+    return True
+
+def request_user_token():
+    """Register the test user, or log it in if it exists; the token or None"""
     try:
-        response = requests.post(f"{API_BASE}/auth/register", json=TEST_USER_DATA)
+        response = http.post(f"{API_BASE}/auth/register", json=TEST_USER_DATA)
         
         if response.status_code == 200:
             data = response.json()
             if data.get('success') and data.get('data') and data['data'].get('token'):
-                user_token = data['data']['token']
                 print(f"✅ New test user registered successfully")
-                return True
+                return data['data']['token']
         elif response.status_code == 409:
             # User exists, login
-            login_response = requests.post(f"{API_BASE}/auth/login", json={
+            login_response = http.post(f"{API_BASE}/auth/login", json={
                 "email": TEST_USER_DATA["email"],
                 "password": TEST_USER_DATA["password"]
             })
@@ -64,39 +83,41 @@ def setup_user():
             if login_response.status_code == 200:
                 login_data = login_response.json()
                 if login_data.get('success') and login_data.get('data') and login_data['data'].get('token'):
-                    user_token = login_data['data']['token']
                     print(f"✅ Test user logged in successfully")
-                    return True
-        
-        print(f"❌ Failed to setup user")
-        return False
+                    return login_data['data']['token']
+        return None
             
     except Exception as e:
         print(f"❌ User setup error: {str(e)}")
-        return False
+        return None
 
 def setup_admin():
     """Setup admin"""
     global admin_token
     
     print("🔧 Logging in as admin...")
-    
+    admin_token = token_cache.get_token(BASE_URL, f"admin:{ADMIN_CREDENTIALS['username']}", request_admin_token)
+    if not admin_token:
+        print(f"❌ Admin login failed")
+        return False
+    print(f"✅ Admin ready")
+    return True
+
+def request_admin_token():
+    """POST /api/admin/login; the token or None"""
     try:
-        response = requests.post(f"{API_BASE}/admin/login", json=ADMIN_CREDENTIALS)
+        response = http.post(f"{API_BASE}/admin/login", json=ADMIN_CREDENTIALS)
         
         if response.status_code == 200:
             data = response.json()
             if data.get('success') and data.get('data') and data['data'].get('token'):
-                admin_token = data['data']['token']
                 print(f"✅ Admin logged in successfully")
-                return True
-        
-        print(f"❌ Admin login failed")
-        return False
+                return data['data']['token']
+        return None
             
     except Exception as e:
         print(f"❌ Admin login error: {str(e)}")
-        return False
+        return None
 
 def test_close_functionality():
     """Test close ticket functionality specifically"""
@@ -106,7 +127,7 @@ def test_close_functionality():
     ticket_id = None
     try:
         headers = {"Authorization": f"Bearer {user_token}"}
-        response = requests.post(f"{API_BASE}/support/tickets", json={
+        response = http.post(f"{API_BASE}/support/tickets", json={
             "subject": "Test close functionality",
             "category": "diger",
             "message": "This ticket will be used to test close functionality"
@@ -129,7 +150,7 @@ def test_close_functionality():
     
     # Test close without auth
     try:
-        response = requests.post(f"{API_BASE}/admin/support/tickets/{ticket_id}/close", json={})
+        response = http.post(f"{API_BASE}/admin/support/tickets/{ticket_id}/close", json={})
         
         success = response.status_code == 401
         print_test_result(
@@ -143,7 +164,7 @@ def test_close_functionality():
     # Test close with admin token
     try:
         headers = {"Authorization": f"Bearer {admin_token}"}
-        response = requests.post(f"{API_BASE}/admin/support/tickets/{ticket_id}/close", json={}, headers=headers)
+        response = http.post(f"{API_BASE}/admin/support/tickets/{ticket_id}/close", json={}, headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -151,7 +172,7 @@ def test_close_functionality():
             
             # Verify ticket status changed to closed
             if success:
-                ticket_response = requests.get(f"{API_BASE}/admin/support/tickets/{ticket_id}", headers=headers)
+                ticket_response = http.get(f"{API_BASE}/admin/support/tickets/{ticket_id}", headers=headers)
                 if ticket_response.status_code == 200:
                     ticket_data = ticket_response.json()
                     if ticket_data.get('success') and ticket_data.get('data'):
@@ -174,7 +195,7 @@ def test_close_functionality():
     # Test user cannot send message to closed ticket
     try:
         headers = {"Authorization": f"Bearer {user_token}"}
-        response = requests.post(f"{API_BASE}/support/tickets/{ticket_id}/messages", 
+        response = http.post(f"{API_BASE}/support/tickets/{ticket_id}/messages", 
                                json={"message": "Bu mesaj kapalı bilete gönderilmemeli"}, 
                                headers=headers)
         
@@ -203,7 +224,7 @@ def test_full_flow():
     
     try:
         headers = {"Authorization": f"Bearer {user_token}"}
-        response = requests.post(f"{API_BASE}/support/tickets", json={
+        response = http.post(f"{API_BASE}/support/tickets", json={
             "subject": "Teslimat sorunu - Full Flow Test",
             "category": "teslimat",
             "message": "UC kodlarım gelmedi, lütfen yardım edin."
@@ -228,7 +249,7 @@ def test_full_flow():
     # Step 2: User tries to send message (should fail)
     try:
         headers = {"Authorization": f"Bearer {user_token}"}
-        response = requests.post(f"{API_BASE}/support/tickets/{flow_ticket_id}/messages", 
+        response = http.post(f"{API_BASE}/support/tickets/{flow_ticket_id}/messages", 
                                json={"message": "Acil yardım gerekiyor!"}, 
                                headers=headers)
         
@@ -244,7 +265,7 @@ def test_full_flow():
     # Step 3: Admin replies
     try:
         headers = {"Authorization": f"Bearer {admin_token}"}
-        response = requests.post(f"{API_BASE}/admin/support/tickets/{flow_ticket_id}/messages", 
+        response = http.post(f"{API_BASE}/admin/support/tickets/{flow_ticket_id}/messages", 
                                json={"message": "Merhaba, sorununuzu inceliyoruz. Sipariş numaranızı paylaşabilir misiniz?"}, 
                                headers=headers)
         
@@ -261,7 +282,7 @@ def test_full_flow():
     # Step 4: User sends message
     try:
         headers = {"Authorization": f"Bearer {user_token}"}
-        response = requests.post(f"{API_BASE}/support/tickets/{flow_ticket_id}/messages", 
+        response = http.post(f"{API_BASE}/support/tickets/{flow_ticket_id}/messages", 
                                json={"message": "Sipariş numarası: ORD789123. Teşekkürler."}, 
                                headers=headers)
         
@@ -278,7 +299,7 @@ def test_full_flow():
     # Step 5: User tries to send another message (should fail)
     try:
         headers = {"Authorization": f"Bearer {user_token}"}
-        response = requests.post(f"{API_BASE}/support/tickets/{flow_ticket_id}/messages", 
+        response = http.post(f"{API_BASE}/support/tickets/{flow_ticket_id}/messages", 
                                json={"message": "Başka bir mesaj"}, 
                                headers=headers)
         
@@ -294,7 +315,7 @@ def test_full_flow():
     # Step 6: Admin closes ticket
     try:
         headers = {"Authorization": f"Bearer {admin_token}"}
-        response = requests.post(f"{API_BASE}/admin/support/tickets/{flow_ticket_id}/close", json={}, headers=headers)
+        response = http.post(f"{API_BASE}/admin/support/tickets/{flow_ticket_id}/close", json={}, headers=headers)
         
         if response.status_code == 200:
             print("✅ Step 6: Admin closed ticket")
@@ -309,7 +330,7 @@ def test_full_flow():
     # Step 7: User tries to send message to closed ticket (should fail)
     try:
         headers = {"Authorization": f"Bearer {user_token}"}
-        response = requests.post(f"{API_BASE}/support/tickets/{flow_ticket_id}/messages", 
+        response = http.post(f"{API_BASE}/support/tickets/{flow_ticket_id}/messages", 
                                json={"message": "Kapalı bilete mesaj"}, 
                                headers=headers)
         
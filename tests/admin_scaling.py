@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Scaling curve for GET /api/admin/dashboard and /api/admin/system-status
+
+Both endpoints run whole-collection counts (and the dashboard a revenue
+aggregate over every paid order) on each admin page load. This tops the
+database up with tests/seed.py's Seeder to each size in --sizes (total
+orders; users, tickets and email_logs scale along), then at every size:
+
+    - times both endpoints over HTTP (--samples after --warmup)
+    - times each Mongo query they run directly with pymongo, to show
+      which one grows
+    - draws latency against order count (log scale) in the terminal, or
+      to --png when matplotlib is installed, and reports where p95
+      crosses the --budget-ms admin budget (projected from the last two
+      sizes when it is not reached)
+
+Seeding is cumulative and every document carries `seeded: True`
+(`python -m tests.seed --purge` removes them). 10M orders take a while;
+start with smaller --sizes.
+
+Usage (from the repository root):
+    python -m tests.admin_scaling --sizes 10000,100000,1000000
+    python -m tests.admin_scaling --sizes 10000,100000,1000000,10000000 --png admin_scaling.png
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from datetime import datetime, timezone
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+except ImportError:
+    plt = None
+
+import callback_test
+from callback_test import BASE_URL
+from tests.db import get_db
+from tests.http_client import create_client
+from tests.latency import summarize, format_summary
+from tests.seed import Seeder
+
+ENDPOINTS = ['/admin/dashboard', '/admin/system-status']
+BUDGET_MS = 200.0
+
+
+def dashboard_queries(db):
+    paid = {'status': 'paid'}
+    return [
+        ("dashboard: count all", lambda: db.orders.count_documents({})),
+        ("dashboard: count paid", lambda: db.orders.count_documents(paid)),
+        ("dashboard: count pending", lambda: db.orders.count_documents({'status': 'pending'})),
+        ("dashboard: revenue", lambda: list(db.orders.aggregate([
+            {'$match': paid}, {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}]))),
+        ("dashboard: recent 5", lambda: list(db.orders.find({}).sort('createdAt', -1).limit(5))),
+    ]
+
+
+def system_status_queries(db):
+    # Local midnight, like setHours(0, 0, 0, 0) on the app host
+    today = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        ("status: users", lambda: db.users.count_documents({})),
+        ("status: orders today", lambda: db.orders.count_documents({'createdAt': {'$gte': today}})),
+        ("status: pending", lambda: db.orders.count_documents({'status': 'pending'})),
+        ("status: stocks available", lambda: db.stocks.count_documents({'status': 'available'})),
+        ("status: open tickets", lambda: db.tickets.count_documents({'status': {'$ne': 'closed'}})),
+    ]
+
+
+def time_queries(db, repeat):
+    """Best-of-`repeat` milliseconds per query"""
+    timings = {}
+    for name, run in dashboard_queries(db) + system_status_queries(db):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best * 1000
+    return timings
+
+
+def top_up(db, target, step, seed, batch_size):
+    """Seed orders until the collection holds `target` of them"""
+    current = db.orders.estimated_document_count()
+    missing = target - current
+    if missing <= 0:
+        print(f"   orders already at {current:,}")
+        return
+    print(f"🌱 Seeding {missing:,} orders ({current:,} -> {target:,})")
+    started = time.perf_counter()
+    seeder = Seeder(db, seed + step, datetime.now(timezone.utc), 180, batch_size)
+    seeder.load_products()
+    users = max(1, missing // 5)
+    seeder.seed_users(users)
+    seeder.seed_orders(missing)
+    seeder.seed_tickets(users // 10)
+    seeder.flush_all()
+    print(f"   done in {time.perf_counter() - started:.0f}s")
+
+
+def measure_endpoints(client, headers, samples, warmup, pause):
+    results = {}
+    for endpoint in ENDPOINTS:
+        url = f"{BASE_URL}{endpoint}"
+        for _ in range(warmup):
+            client.get(url, headers=headers)
+        latencies = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            elapsed = time.perf_counter() - start
+            if response.status_code == 200:
+                latencies.append(elapsed)
+            elif response.status_code == 429:
+                print(f"   ⚠️  {endpoint} rate limited; lower --samples or raise --pause")
+            time.sleep(pause)
+        results[endpoint] = summarize(latencies)
+    return results
+
+
+def crossing(points, metric, budget):
+    """Order count where `metric` reaches budget: (count, projected?) or (None, None)"""
+    for (size_a, a), (size_b, b) in zip(points, points[1:]):
+        if a[metric] < budget <= b[metric]:
+            # Interpolate on log(size)
+            frac = (budget - a[metric]) / (b[metric] - a[metric])
+            return math.exp(math.log(size_a) + frac * (math.log(size_b) - math.log(size_a))), False
+    if points and points[0][1][metric] >= budget:
+        return points[0][0], False
+    if len(points) >= 2:
+        (size_a, a), (size_b, b) = points[-2], points[-1]
+        if b[metric] > a[metric] > 0:
+            # Power law through the last two points
+            slope = math.log(b[metric] / a[metric]) / math.log(size_b / size_a)
+            return size_b * (budget / b[metric]) ** (1 / slope), True
+    return None, None
+
+
+def ascii_plot(series, budget, metric, width=60, height=16):
+    """Latency (ms) vs. order count on log-log axes"""
+    sizes = [size for points in series.values() for size, _ in points]
+    values = [s[metric] for points in series.values() for _, s in points if s[metric] > 0] + [budget]
+    if not sizes or len(set(sizes)) < 2:
+        return
+    x_lo, x_hi = math.log10(min(sizes)), math.log10(max(sizes))
+    y_lo, y_hi = math.log10(min(values) / 1.5), math.log10(max(values) * 1.5)
+    grid = [[' '] * width for _ in range(height)]
+
+    def cell(size, ms):
+        x = round((math.log10(size) - x_lo) / (x_hi - x_lo) * (width - 1))
+        y = round((math.log10(ms) - y_lo) / (y_hi - y_lo) * (height - 1))
+        return height - 1 - y, x
+
+    budget_row, _ = cell(min(sizes), budget)
+    grid[budget_row] = ['-'] * width
+    for marker, points in zip('DS', series.values()):
+        for size, summary in points:
+            if summary[metric] > 0:
+                row, col = cell(size, summary[metric])
+                grid[row][col] = marker
+    print(f"\n{metric} latency (ms, log) vs. orders (log)   D = dashboard, S = system-status, --- = {budget:.0f}ms")
+    for i, row in enumerate(grid):
+        ms = 10 ** (y_hi - i / (height - 1) * (y_hi - y_lo))
+        print(f"{ms:8.1f} |{''.join(row)}")
+    print(" " * 9 + "+" + "-" * width)
+    print(" " * 10 + f"{min(sizes):,}".ljust(width - 12) + f"{max(sizes):,}")
+
+
+def save_png(path, series, budget, metric):
+    fig, ax = plt.subplots(figsize=(8, 5))
+    for endpoint, points in series.items():
+        ax.plot([s for s, _ in points], [v[metric] for _, v in points], marker='o', label=f"GET /api{endpoint}")
+    ax.axhline(budget, color='red', linestyle='--', label=f"{budget:.0f} ms budget")
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('orders')
+    ax.set_ylabel(f'{metric} latency (ms)')
+    ax.legend()
+    ax.grid(True, which='both', alpha=0.3)
+    fig.savefig(path, dpi=120, bbox_inches='tight')
+    print(f"🖼️  Plot saved to {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Admin dashboard/system-status latency vs. data size")
+    parser.add_argument('--sizes', default="10000,100000,1000000,10000000", help="total order counts")
+    parser.add_argument('--samples', type=int, default=20, help="timed requests per endpoint and size")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--pause', type=float, default=1.0,
+                        help="seconds between requests (admin paths allow 60/min each)")
+    parser.add_argument('--query-repeat', type=int, default=3, help="direct pymongo timings, best of N")
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    parser.add_argument('--metric', choices=['p50', 'p95', 'p99'], default='p95')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--no-seed', action='store_true', help="measure only, at the current size")
+    parser.add_argument('--json', default=None, help="write all measurements to this file")
+    parser.add_argument('--png', default=None, help="save the plot here (needs matplotlib)")
+    parser.add_argument('--db', default=None, help="database name (default DB_NAME)")
+    args = parser.parse_args(argv)
+
+    if args.png and plt is None:
+        parser.error("--png needs matplotlib")
+    if not callback_test.setup():
+        return 1
+    headers = {"Authorization": f"Bearer {callback_test.admin_token}"}
+    db = get_db(args.db)
+    sizes = sorted(int(s) for s in args.sizes.split(',') if s.strip())
+    if args.no_seed:
+        sizes = [db.orders.estimated_document_count()]
+
+    series = {endpoint: [] for endpoint in ENDPOINTS}
+    rows = []
+    with create_client(timeout=120, retries=0, pool_size=1) as client:
+        for step, size in enumerate(sizes):
+            if not args.no_seed:
+                top_up(db, size, step, args.seed, args.batch_size)
+            count = db.orders.estimated_document_count()
+            print(f"\n📏 {count:,} orders")
+            endpoints = measure_endpoints(client, headers, args.samples, args.warmup, args.pause)
+            queries = time_queries(db, args.query_repeat)
+            for endpoint, summary in endpoints.items():
+                print(format_summary(f"GET /api{endpoint}", summary))
+                series[endpoint].append((count, summary))
+            for name, ms in queries.items():
+                print(f"   {name:<28} {ms:9.1f}ms")
+            rows.append({"orders": count, "endpoints": endpoints, "queriesMs": queries})
+
+    print("\n" + "=" * 80)
+    print("ADMIN SCALING RESULTS")
+    print("=" * 80)
+    ascii_plot(series, args.budget_ms, args.metric)
+    print()
+    for endpoint, points in series.items():
+        size, projected = crossing(points, args.metric, args.budget_ms)
+        if size is None:
+            print(f"GET /api{endpoint}: stays under {args.budget_ms:.0f}ms ({args.metric}) at every size")
+        else:
+            label = "projected to cross" if projected else "crosses"
+            print(f"GET /api{endpoint}: {label} {args.budget_ms:.0f}ms ({args.metric}) at ~{size:,.0f} orders")
+    print("=" * 80)
+
+    if args.png:
+        save_png(args.png, series, args.budget_ms, args.metric)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"baseUrl": BASE_URL, "budgetMs": args.budget_ms, "sizes": rows}, f, indent=2)
+        print(f"💾 Measurements written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Deep-pagination benchmark for GET /api/admin/audit-logs, with a keyset check
+
+route.js answers every audit log page with countDocuments(query), a
+find().sort({createdAt: -1}).skip((page - 1) * limit).limit(limit) and two
+distinct() calls over the whole collection, so deep pages get slower
+linearly with the offset. For each filter combination and page number
+this measures:
+
+    - the endpoint over HTTP (paced under the 60/min admin limit;
+      --timeout counts as a timeout, like the admin UI giving up)
+    - each of its Mongo queries directly (count, skip page, distincts)
+    - the same page fetched keyset-style: filter plus
+      (createdAt, _id) < (last row of the previous page), sorted
+      createdAt desc, _id desc - the proposed cursor contract
+
+and then verifies the contract: --verify-pages pages walked from the
+start with the keyset cursor, plus every deep page in --pages resumed
+from the API's previous page, must return the API's rows in the API's
+order. Rows that only swap places within the same createdAt are reported
+separately: the API sorts on createdAt alone, so the order of ties (and
+which page a tie at a page boundary lands on) is not defined.
+
+--seed-rows tops audit_logs up with tests/seed.py first.
+
+Usage (from the repository root):
+    python -m tests.audit_pagination --seed-rows 20000000
+    python -m tests.audit_pagination --pages 1,100,10000,last --filters none,action --create-indexes
+"""
+
+import argparse
+import asyncio
+import math
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from bson import ObjectId
+
+import callback_test
+from callback_test import BASE_URL
+from tests.db import get_db
+from tests.http_client import create_async_client
+from tests.latency import summarize, format_summary
+from tests.rate_limits import Pacer, load_limits
+from tests.seed import Seeder
+
+AUDIT_PATH = "/api/admin/audit-logs"
+PAGE_SIZE = 50
+KEYSET_SORT = [('createdAt', -1), ('_id', -1)]
+# What the keyset contract needs; the filtered ones also serve the skip queries
+KEYSET_INDEXES = [
+    [('createdAt', -1), ('_id', -1)],
+    [('action', 1), ('createdAt', -1), ('_id', -1)],
+    [('entityType', 1), ('createdAt', -1), ('_id', -1)],
+    [('actorId', 1), ('createdAt', -1), ('_id', -1)],
+]
+
+
+def filter_params(db, now):
+    """Filter combinations as API query params"""
+    week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    sample = db.audit_logs.find_one({'actorId': {'$nin': [None, 'system']}}, {'actorId': 1}) or {}
+    filters = {
+        'none': {},
+        'action': {'action': 'user.login'},
+        'entityType': {'entityType': 'order'},
+        'last 7 days': {'startDate': week_ago},
+        'action + 7 days': {'action': 'user.login', 'startDate': week_ago},
+    }
+    if sample.get('actorId'):
+        filters['actorId'] = {'actorId': sample['actorId']}
+    return filters
+
+
+def build_query(params):
+    """Same query route.js builds from the search params"""
+    query = {}
+    for name in ('action', 'entityType', 'actorId'):
+        if params.get(name):
+            query[name] = params[name]
+    if params.get('startDate') or params.get('endDate'):
+        query['createdAt'] = {}
+        if params.get('startDate'):
+            query['createdAt']['$gte'] = _parse_date(params['startDate'])
+        if params.get('endDate'):
+            query['createdAt']['$lte'] = _parse_date(params['endDate'])
+    return query
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _ms(value):
+    """createdAt from Mongo (datetime) or the API (ISO string) as epoch milliseconds"""
+    if isinstance(value, str):
+        value = _parse_date(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return round(value.timestamp() * 1000)
+
+
+def keyset_query(query, after):
+    """`query` restricted to rows after (createdAt, _id) in KEYSET_SORT order"""
+    if not after:
+        return query
+    created, oid = after
+    return {'$and': [query, {'$or': [
+        {'createdAt': {'$lt': created}},
+        {'createdAt': created, '_id': {'$lt': oid}},
+    ]}]}
+
+
+def keyset_page(db, query, after, limit=PAGE_SIZE):
+    return list(db.audit_logs.find(keyset_query(query, after)).sort(KEYSET_SORT).limit(limit))
+
+
+def _timed(run):
+    start = time.perf_counter()
+    result = run()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def mongo_breakdown(db, query, page, limit=PAGE_SIZE):
+    """Milliseconds for each query route.js runs, plus the keyset equivalent"""
+    timings = {}
+    _, timings['count'] = _timed(lambda: db.audit_logs.count_documents(query))
+    _, timings['skip page'] = _timed(lambda: list(
+        db.audit_logs.find(query).sort('createdAt', -1).skip((page - 1) * limit).limit(limit)))
+    _, timings['distinct x2'] = _timed(lambda: (db.audit_logs.distinct('action'),
+                                                db.audit_logs.distinct('entityType')))
+    after = None
+    if page > 1:
+        # Boundary row found untimed; a real client carries it from the previous page
+        boundary = list(db.audit_logs.find(query, {'createdAt': 1}).sort(KEYSET_SORT)
+                        .skip((page - 1) * limit - 1).limit(1))
+        if boundary:
+            after = (boundary[0]['createdAt'], boundary[0]['_id'])
+    _, timings['keyset page'] = _timed(lambda: keyset_page(db, query, after, limit))
+    return timings
+
+
+class PageFetcher:
+    """Paced async GETs of audit log pages as the admin"""
+
+    def __init__(self, client, token, timeout):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.token = token
+        self.timeout = timeout
+        self.pacer = Pacer(load_limits())
+
+    async def get(self, params, page):
+        await self.pacer.acquire(AUDIT_PATH, self.token)
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(f"{BASE_URL}/admin/audit-logs", params={**params, 'page': page,
+                                                                                   'limit': PAGE_SIZE},
+                                              headers=self.headers, timeout=self.timeout)
+        except httpx.TimeoutException:
+            return None, 'timeout'
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            return None, response.status_code
+        return response.json()['data'], elapsed
+
+
+def compare_page(api_rows, keyset_rows):
+    """'exact', 'tie order', 'boundary ties' or 'mismatch'"""
+    api = [(row['id'], _ms(row['createdAt'])) for row in api_rows]
+    keyset = [(row['id'], _ms(row['createdAt'])) for row in keyset_rows]
+    if api == keyset:
+        return 'exact'
+    if [t for _, t in api] == [t for _, t in keyset] and {i for i, _ in api} == {i for i, _ in keyset}:
+        return 'tie order'
+    differing = {t for i, t in set(api) ^ set(keyset)}
+    edges = {api[0][1], api[-1][1]} if api else set()
+    if differing and differing <= edges and len(api) == len(keyset):
+        return 'boundary ties'
+    return 'mismatch'
+
+
+async def verify(db, fetcher, filters, walk_pages, deep_pages):
+    outcomes = {}
+    for name, params in filters.items():
+        query = build_query(params)
+        counts = outcomes.setdefault(name, {})
+        after = None
+        # Walk from the start, carrying the keyset cursor
+        for page in range(1, walk_pages + 1):
+            data, _ = await fetcher.get(params, page)
+            if not data or not data['logs']:
+                break
+            rows = keyset_page(db, query, after)
+            result = compare_page(data['logs'], rows)
+            counts[result] = counts.get(result, 0) + 1
+            if rows:
+                after = (rows[-1]['createdAt'], rows[-1]['_id'])
+        # Deep pages resumed from the API's previous page
+        for page in deep_pages:
+            if page < 2:
+                continue
+            previous, _ = await fetcher.get(params, page - 1)
+            current, _ = await fetcher.get(params, page)
+            if not previous or not current or not previous['logs']:
+                continue
+            last = previous['logs'][-1]
+            rows = keyset_page(db, query, (_parse_date(last['createdAt']), ObjectId(last['_id'])))
+            result = compare_page(current['logs'], rows)
+            counts[result] = counts.get(result, 0) + 1
+    return outcomes
+
+
+def resolve_pages(spec, total):
+    last = max(1, math.ceil(total / PAGE_SIZE))
+    pages = []
+    for item in spec.split(','):
+        item = item.strip()
+        page = last if item == 'last' else int(item)
+        if 1 <= page <= last and page not in pages:
+            pages.append(page)
+    return pages
+
+
+def top_up(db, target, seed, batch_size):
+    current = db.audit_logs.estimated_document_count()
+    if current >= target:
+        return
+    missing = target - current
+    print(f"🌱 Seeding {missing:,} audit_logs rows ({current:,} -> {target:,})")
+    started = time.perf_counter()
+    seeder = Seeder(db, seed, datetime.now(timezone.utc), 365, batch_size)
+    seeder.load_products()
+    seeder.seed_users(max(1000, min(missing // 200, 200_000)))
+    seeder.seed_audit_logs(missing)
+    seeder.flush_all()
+    print(f"   done in {time.perf_counter() - started:.0f}s")
+
+
+async def benchmark(db, args, token):
+    now = datetime.now(timezone.utc)
+    filters = filter_params(db, now)
+    if args.filters:
+        filters = {k: v for k, v in filters.items() if k in args.filters.split(',')}
+    results = []
+    async with create_async_client(retries=0, pool_size=1) as client:
+        fetcher = PageFetcher(client, token, args.timeout)
+        for name, params in filters.items():
+            query = build_query(params)
+            total = db.audit_logs.count_documents(query)
+            pages = resolve_pages(args.pages, total)
+            print(f"\n🔎 filter '{name}': {total:,} rows, pages {pages}")
+            for page in pages:
+                latencies, failures = [], []
+                for _ in range(args.samples):
+                    _, outcome = await fetcher.get(params, page)
+                    (latencies if isinstance(outcome, float) else failures).append(outcome)
+                breakdown = mongo_breakdown(db, query, page)
+                summary = summarize(latencies)
+                results.append((name, page, summary, failures, breakdown))
+                print(format_summary(f"page {page:,}", summary) + (f"  failures={failures}" if failures else ""))
+                print("      " + "  ".join(f"{k}={v:.1f}ms" for k, v in breakdown.items()))
+
+        outcomes = None
+        if args.verify_pages or args.verify_deep:
+            print("\n🔁 Verifying the keyset contract against the API")
+            deep = [p for p in resolve_pages(args.pages, db.audit_logs.estimated_document_count())
+                    if p > args.verify_pages] if args.verify_deep else []
+            outcomes = await verify(db, fetcher, filters, args.verify_pages, deep)
+    return results, outcomes
+
+
+def print_report(results, outcomes, budget_ms):
+    print("\n" + "=" * 80)
+    print("AUDIT LOG PAGINATION RESULTS")
+    print("=" * 80)
+    print(f"{'filter':<18} {'page':>9} {'API p50':>10} {'skip page':>10} {'keyset':>9} {'count':>9} {'distinct':>9}")
+    for name, page, summary, failures, breakdown in results:
+        api = f"{summary['p50']:.0f}ms" if summary['count'] else "fail"
+        flag = " ⚠️" if (not summary['count'] or summary['p50'] > budget_ms) else ""
+        print(f"{name:<18} {page:>9,} {api:>10} {breakdown['skip page']:>8.1f}ms {breakdown['keyset page']:>7.1f}ms "
+              f"{breakdown['count']:>7.1f}ms {breakdown['distinct x2']:>7.1f}ms{flag}")
+    if outcomes:
+        print("\nKeyset vs. API pages:")
+        for name, counts in outcomes.items():
+            icon = "❌" if counts.get('mismatch') else "✅"
+            print(f"   {icon} {name:<18} " + "  ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    print("=" * 80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit log deep pagination benchmark and keyset check")
+    parser.add_argument('--pages', default="1,10,100,1000,10000,100000,last")
+    parser.add_argument('--filters', default=None, help="comma-separated subset of filter names")
+    parser.add_argument('--samples', type=int, default=3, help="HTTP requests per page and filter")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help="flag pages slower than this")
+    parser.add_argument('--verify-pages', type=int, default=20, help="pages walked from the start")
+    parser.add_argument('--verify-deep', action='store_true', help="also verify each deep page in --pages")
+    parser.add_argument('--seed-rows', type=int, default=0, help="top audit_logs up to this many rows first")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--create-indexes', action='store_true', help="create the keyset indexes first")
+    parser.add_argument('--db', default=None, help="database name (default DB_NAME)")
+    args = parser.parse_args(argv)
+
+    db = get_db(args.db)
+    if args.seed_rows:
+        top_up(db, args.seed_rows, args.seed, args.batch_size)
+    if args.create_indexes:
+        for keys in KEYSET_INDEXES:
+            print(f"🔧 index {db.audit_logs.create_index(keys)}")
+    existing = [list(spec['key'].items()) for spec in db.audit_logs.list_indexes()]
+    missing = [keys for keys in KEYSET_INDEXES if keys not in existing]
+    if missing:
+        print(f"ℹ️  {len(missing)} keyset index(es) missing; keyset timings will scan (use --create-indexes)")
+
+    if not callback_test.setup():
+        return 1
+    results, outcomes = asyncio.run(benchmark(db, args, callback_test.admin_token))
+    print_report(results, outcomes, args.budget_ms)
+    return 1 if outcomes and any(c.get('mismatch') for c in outcomes.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
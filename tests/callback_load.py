@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Async load generator for the order -> Shopier callback path
+
+Replays create-order + signed-callback pairs concurrently at a configurable
+arrival rate and reports per-step latency and paid-orders-per-second.
+Order creation is paced per buyer with the limits table written by
+tests/rate_limits.py (route.js defaults when it has not been run), and
+--users defaults to enough buyers to carry --rate under that limit.
+
+Usage (from the repository root):
+    python -m tests.callback_load --orders 2000 --rate 50 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+
+import httpx
+
+import callback_test
+from callback_test import BASE_URL, TEST_SHOPIER_API_SECRET, generate_shopier_hash
+from tests.http_client import create_async_client
+from tests.live_dashboard import add_live_arguments, dashboard_from_args
+from tests.latency import summarize, format_summary
+from tests.rate_limits import DEFAULT_TABLE, Pacer, limit_for, load_limits, required_keys
+
+# route.js serves the callback handler on the plural path
+CALLBACK_PATH = "/payments/shopier/callback"
+
+# POST /api/orders is limited per user, register per IP (see tests/rate_limits.py)
+DEFAULT_USERS = 50
+ORDERS_PATH = "/api/orders"
+
+
+def fake_ip(index):
+    """Deterministic synthetic client IP for X-Forwarded-For"""
+    return f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+
+
+class LoadResult:
+    """Collected samples for one load run"""
+
+    def __init__(self):
+        self.order_latencies = []
+        self.callback_latencies = []
+        self.pair_latencies = []
+        self.status_counts = {}
+        self.paid = 0
+        self.errors = 0
+        self.started = None
+        self.finished = None
+        self.pacer = None
+
+    def count_status(self, step, status_code):
+        key = f"{step}:{status_code}"
+        self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+
+async def register_user(client, index):
+    """Register one synthetic buyer and return (token, ip)"""
+    ip = fake_ip(index)
+    response = await client.post(
+        f"{BASE_URL}/auth/register",
+        json={
+            "firstName": "Load",
+            "lastName": f"User{index}",
+            "email": f"load.{uuid.uuid4().hex[:12]}@example.com",
+            "phone": "5551234567",
+            "password": "loadtest123"
+        },
+        headers={"X-Forwarded-For": ip}
+    )
+    if response.status_code != 200:
+        return None
+    return response.json()['data']['token'], ip
+
+
+async def create_users(client, count):
+    users = await asyncio.gather(*(register_user(client, i + 1) for i in range(count)))
+    return [u for u in users if u]
+
+
+async def order_and_pay(client, semaphore, pacer, result, user, product_id, player_index):
+    """Create one order and immediately send its signed success callback"""
+    token, ip = user
+    await pacer.acquire(ORDERS_PATH, token)
+    async with semaphore:
+        pair_start = time.perf_counter()
+        try:
+            start = time.perf_counter()
+            order_response = await client.post(
+                f"{BASE_URL}/orders",
+                json={
+                    "productId": product_id,
+                    "playerId": f"{5000000000 + player_index}",
+                    "playerName": f"LoadTest#{player_index % 10000:04d}"
+                },
+                headers={"Authorization": f"Bearer {token}", "X-Forwarded-For": ip}
+            )
+            result.order_latencies.append(time.perf_counter() - start)
+            result.count_status("order", order_response.status_code)
+            if order_response.status_code != 200:
+                return
+
+            order = order_response.json()['data']['order']
+            order_id = order['id']
+            callback_payload = {
+                "orderId": order_id,
+                "platform_order_id": order_id,
+                "status": "success",
+                "transactionId": f"TXN_LOAD_{uuid.uuid4().hex}",
+                "random_nr": uuid.uuid4().hex[:16],
+                "total_order_value": str(order['amount']),
+                "hash": generate_shopier_hash(order_id, order['amount'], TEST_SHOPIER_API_SECRET)
+            }
+
+            start = time.perf_counter()
+            callback_response = await client.post(f"{BASE_URL}{CALLBACK_PATH}", json=callback_payload)
+            result.callback_latencies.append(time.perf_counter() - start)
+            result.count_status("callback", callback_response.status_code)
+
+            if callback_response.status_code == 200 and callback_response.json().get('success'):
+                result.paid += 1
+                result.pair_latencies.append(time.perf_counter() - pair_start)
+        except (httpx.HTTPError, ValueError, KeyError):
+            result.errors += 1
+        finally:
+            result.finished = time.perf_counter()
+
+
+async def run_load(product_id, orders, rate, concurrency, users, timeout, seed=None, pacer=None):
+    """Open-loop load: Poisson arrivals at `rate` pairs per second"""
+    rng = random.Random(seed)
+    result = LoadResult()
+    result.pacer = pacer = pacer or Pacer(load_limits())
+    async with create_async_client(timeout=timeout, pool_size=concurrency) as client:
+        buyers = await create_users(client, users)
+        if not buyers:
+            print("❌ Could not register any load users")
+            return result
+        print(f"✅ Registered {len(buyers)} load users")
+
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = []
+        result.started = time.perf_counter()
+        for i in range(orders):
+            user = buyers[i % len(buyers)]
+            tasks.append(asyncio.create_task(
+                order_and_pay(client, semaphore, pacer, result, user, product_id, i)
+            ))
+            if rate > 0:
+                await asyncio.sleep(rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+
+    return result
+
+
+def print_report(result):
+    print("\n" + "="*80)
+    print("CALLBACK LOAD RESULTS")
+    print("="*80)
+    print(format_summary("POST /orders", summarize(result.order_latencies)))
+    print(format_summary(f"POST {CALLBACK_PATH}", summarize(result.callback_latencies)))
+    print(format_summary("order -> paid", summarize(result.pair_latencies)))
+
+    print("\nStatus codes:")
+    for key in sorted(result.status_counts):
+        print(f"   {key}: {result.status_counts[key]}")
+    print(f"   client errors: {result.errors}")
+    if result.pacer and result.pacer.waits:
+        print(f"   paced: {result.pacer.waits} orders held back {result.pacer.waited_seconds:.1f}s "
+              "in total to stay under the rate limit (raise --users)")
+
+    elapsed = (result.finished or result.started or 0) - (result.started or 0)
+    throughput = result.paid / elapsed if elapsed > 0 else 0.0
+    print(f"\nPaid orders: {result.paid} in {elapsed:.2f}s -> {throughput:.1f} paid orders/sec")
+    print("="*80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Order -> Shopier callback load generator")
+    parser.add_argument("--orders", type=int, default=1000, help="number of order+callback pairs")
+    parser.add_argument("--rate", type=float, default=20.0, help="arrival rate in pairs/sec (0 = all at once)")
+    parser.add_argument("--concurrency", type=int, default=100, help="max in-flight pairs")
+    parser.add_argument("--users", type=int, default=None,
+                        help="buyer accounts to spread rate limits over (default: enough for --rate)")
+    parser.add_argument("--limits", default=DEFAULT_TABLE, help="rate limits table from tests/rate_limits.py")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for arrival times")
+    add_live_arguments(parser)
+    args = parser.parse_args(argv)
+
+    print("\n" + "="*80)
+    print("CALLBACK LOAD TEST")
+    print("="*80)
+    print(f"Base URL: {BASE_URL}")
+    limits = load_limits(args.limits)
+    if args.users is None:
+        row = limit_for(ORDERS_PATH, limits)
+        args.users = max(DEFAULT_USERS, required_keys(args.rate, row)) if args.rate > 0 and row else DEFAULT_USERS
+    print(f"Orders: {args.orders}, rate: {args.rate}/s, concurrency: {args.concurrency}, users: {args.users}")
+
+    if not callback_test.setup():
+        print("Setup failed!")
+        return 1
+
+    load = run_load(
+        callback_test.test_product_id, args.orders, args.rate,
+        args.concurrency, args.users, args.timeout, args.seed, Pacer(limits)
+    )
+    try:
+        if args.live:
+            with dashboard_from_args(args, "callback load", BASE_URL, callback_test.admin_token) as dashboard:
+                result = asyncio.run(dashboard.watch(load))
+        else:
+            result = asyncio.run(load)
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrupted")
+        return 130
+    print_report(result)
+    return 0 if result.paid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Record/replay cassettes for the API test scripts
+
+backend_test.py, callback_test.py, email_test.py and test_close_and_flow.py
+all talk to the API through tests/http_client.py's shared client. With
+API_CASSETTE set, that client's transport is wrapped:
+
+    record   requests go to the server as usual and every request/response
+             pair is appended to the cassette (gzipped JSON lines) at exit
+    replay   nothing leaves the process; each request is answered from the
+             cassette in memory, and one that was never recorded fails
+             with CassetteMiss (an httpx.TransportError)
+    auto     replay when the cassette exists, record otherwise (default)
+
+Requests are matched on method, path, query and body - not the host, so
+a cassette recorded against a local instance replays for any BASE_URL.
+Identical requests get their recorded responses in recorded order. Before
+matching, the volatile values each run generates are replaced with
+placeholders (API_CASSETTE_NORMALIZE, comma-separated, default all):
+
+    token      JWTs and 64-hex hashes (Shopier signatures)
+    uuid       UUIDs
+    timestamp  ISO datetimes and epoch seconds/milliseconds
+               (test_<time.time()>@example.com, TXN_CORRECT_<...>)
+
+Replayed responses carry the recorded ids and tokens, so a script stays
+consistent with itself. The token cache (tests/token_cache.py) is turned
+off while a cassette is active: a warm cache would skip logins during
+recording or ask for ones the cassette never saw. Direct pymongo checks
+(callback_test.py's order status lookups) still need a database.
+
+Environment:
+    API_CASSETTE            cassette file, or a directory (one
+                            <script>.cassette.jsonl.gz per script)
+    API_CASSETTE_MODE       record | replay | auto (default auto)
+    API_CASSETTE_NORMALIZE  token,uuid,timestamp (default) or none
+
+Usage (from the repository root):
+    API_CASSETTE=tests/cassettes/ API_CASSETTE_MODE=record python callback_test.py
+    API_CASSETTE=tests/cassettes/ python callback_test.py      # offline
+"""
+
+import atexit
+import base64
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+from tests import token_cache
+
+CASSETTE_PATH = os.getenv('API_CASSETTE', '')
+CASSETTE_MODE = os.getenv('API_CASSETTE_MODE', 'auto').lower()
+CASSETTE_SUFFIX = '.cassette.jsonl.gz'
+CASSETTE_VERSION = 1
+
+NORMALIZERS = {
+    'token': [(re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]+'), '<token>'),
+              (re.compile(r'(?<![0-9a-fA-F])[0-9a-f]{64}(?![0-9a-fA-F])'), '<hash>')],
+    'uuid': [(re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'), '<uuid>')],
+    'timestamp': [(re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})?'), '<ts>'),
+                  (re.compile(r'(?<!\d)1\d{9}(\d{3}|\.\d+)?(?!\d)'), '<ts>')],
+}
+DEFAULT_NORMALIZE = ','.join(NORMALIZERS)
+NORMALIZE = [name.strip() for name in os.getenv('API_CASSETTE_NORMALIZE', DEFAULT_NORMALIZE).split(',')
+             if name.strip() in NORMALIZERS]
+
+# Not replayable as recorded: the body is stored decoded, lengths change
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'date', 'keep-alive'}
+
+
+class CassetteMiss(httpx.TransportError):
+    """A replayed request that the cassette has no (more) responses for"""
+
+
+def resolve_path(path):
+    """A directory means one cassette per script, named after sys.argv[0]"""
+    if path.endswith(os.sep) or os.path.isdir(path):
+        script = os.path.splitext(os.path.basename(sys.argv[0] or ''))[0] or 'session'
+        return os.path.join(path, script + CASSETTE_SUFFIX)
+    return path
+
+
+def normalize(text, names=None):
+    for name in NORMALIZE if names is None else names:
+        for pattern, placeholder in NORMALIZERS[name]:
+            text = pattern.sub(placeholder, text)
+    return text
+
+
+def request_key(method, url, body):
+    """Host-independent match key with volatile values normalized"""
+    url = httpx.URL(url)
+    query = urlencode(sorted(parse_qsl(url.query.decode(), keep_blank_values=True)))
+    text = body.decode('utf-8', errors='replace') if body else ''
+    try:
+        text = json.dumps(json.loads(text), sort_keys=True, separators=(',', ':'))
+    except ValueError:
+        pass
+    return normalize(f"{method.upper()} {url.path}?{query} {text}")
+
+
+def _encode_body(content):
+    try:
+        return {'text': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(content).decode('ascii')}
+
+
+def _decode_body(entry):
+    if 'base64' in entry:
+        return base64.b64decode(entry['base64'])
+    return entry.get('text', '').encode('utf-8')
+
+
+class Cassette:
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.responses = defaultdict(deque)
+        self.recorded = []
+        self.served = 0
+        self.misses = []
+        if mode == 'replay':
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != CASSETTE_VERSION:
+                raise ValueError(f"{self.path}: unsupported cassette version {header.get('version')}")
+            for line in f:
+                entry = json.loads(line)
+                self.responses[entry['key']].append(entry)
+
+    def save(self):
+        if self.mode != 'record' or not self.recorded:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            header = {'version': CASSETTE_VERSION, 'recordedAt': datetime.now(timezone.utc).isoformat(),
+                      'normalize': NORMALIZE, 'interactions': len(self.recorded)}
+            f.write(json.dumps(header) + '\n')
+            for entry in self.recorded:
+                f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        os.replace(tmp, self.path)
+
+    def record(self, request, response):
+        entry = {
+            'key': request_key(request.method, request.url, request.content),
+            'method': request.method,
+            'url': str(request.url),
+            'status': response.status_code,
+            'headers': [[k, v] for k, v in response.headers.multi_items() if k.lower() not in DROPPED_HEADERS],
+            'body': _encode_body(response.content),
+        }
+        with self.lock:
+            self.recorded.append(entry)
+
+    def play(self, request):
+        key = request_key(request.method, request.url, request.content)
+        with self.lock:
+            queue = self.responses.get(key)
+            if not queue:
+                self.misses.append(key)
+                raise CassetteMiss(f"no recorded response for {key[:200]}", request=request)
+            entry = queue.popleft()
+            self.served += 1
+        return httpx.Response(entry['status'], headers=entry['headers'], content=_decode_body(entry['body']),
+                              request=request)
+
+    def report(self):
+        if self.mode == 'record':
+            print(f"📼 Cassette recorded: {len(self.recorded)} interactions -> {self.path}")
+        else:
+            unused = sum(len(queue) for queue in self.responses.values())
+            print(f"📼 Cassette replayed: {self.served} served, {len(self.misses)} misses, "
+                  f"{unused} recorded responses unused ({self.path})")
+            for key in self.misses[:5]:
+                print(f"   ❓ {key[:160]}")
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """Answers from the cassette (replay) or records what `wrapped` returns"""
+
+    def __init__(self, cassette, wrapped):
+        self.cassette = cassette
+        self.wrapped = wrapped
+
+    def handle_request(self, request):
+        if self.cassette.mode == 'replay':
+            return self.cassette.play(request)
+        response = self.wrapped.handle_request(request)
+        response.read()
+        self.cassette.record(request, response)
+        return response
+
+    def close(self):
+        self.wrapped.close()
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def active_cassette():
+    """Process-wide cassette from API_CASSETTE, or None when unset"""
+    global _cassette
+    if not CASSETTE_PATH:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            path = resolve_path(CASSETTE_PATH)
+            mode = CASSETTE_MODE
+            if mode == 'auto':
+                mode = 'replay' if os.path.exists(path) else 'record'
+            if mode not in ('record', 'replay'):
+                raise ValueError(f"API_CASSETTE_MODE must be record, replay or auto, not {CASSETTE_MODE!r}")
+            _cassette = Cassette(path, mode)
+            token_cache.ENABLED = False
+
+            def finish():
+                _cassette.save()
+                _cassette.report()
+            atexit.register(finish)
+        return _cassette
+
+
+def wrap_transport(transport):
+    """`transport` behind the active cassette, if any"""
+    cassette = active_cassette()
+    return CassetteTransport(cassette, transport) if cassette else transport
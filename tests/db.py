@@ -0,0 +1,27 @@
+"""
+MongoDB connection settings shared by the Python tools
+
+Environment:
+    MONGO_URL   connection string (default mongodb://localhost:27017)
+    DB_NAME     database name (default pubg_uc_store)
+"""
+
+import os
+
+from pymongo import MongoClient
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('DB_NAME', 'pubg_uc_store')
+
+_client = None
+
+
+def get_mongo_client():
+    global _client
+    if _client is None:
+        _client = MongoClient(MONGO_URL)
+    return _client
+
+
+def get_db(name=None):
+    return get_mongo_client()[name or DB_NAME]
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Coordinator/worker mode for tests/scenario.py
+
+One Python process runs out of CPU long before the Next.js API does, and
+from then on the latencies it reports are its own. The coordinator here
+splits a scenario's virtual users into shards (contiguous VU numbers, so
+synthetic IPs and buyers never collide) and hands them to worker
+processes over a multiprocessing.connection socket:
+
+    - --workers N local workers are started as subprocesses
+    - --remote M more are expected from other hosts, started there with
+      `python -m tests.distributed_load worker --connect <coordinator>:<port>`
+      (same repository checkout, clocks in sync, LOAD_AUTHKEY shared)
+
+The coordinator does the scenario's setup once (admin login, Shopier test
+secret) and passes the admin token along, gives every worker the same
+wall-clock start time, prints combined progress while they run and merges
+their per-step histograms (tests/histogram.py) bucket by bucket, so the
+percentiles are those of all requests - raw and corrected for
+coordinated omission. Each worker also reports the CPU it used; one close
+to 100% was the bottleneck and needs company.
+
+Environment:
+    LOAD_AUTHKEY   shared secret for worker connections (required with --remote;
+                   random for local-only runs)
+
+Usage (from the repository root):
+    python -m tests.distributed_load run tests/scenarios/storefront.yaml --workers 8 --users 8000
+    python -m tests.distributed_load run tests/scenarios/storefront.yaml --workers 4 --remote 2 \\
+        --listen 0.0.0.0:7700
+    python -m tests.distributed_load worker --connect 10.0.0.5:7700
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener, wait
+
+from tests.scenario import Engine, RunStats, Scenario, ScenarioError, load_scenario, print_report
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_DELAY = 3.0
+PROGRESS_INTERVAL = 1.0
+
+
+def send(conn, message):
+    conn.send_bytes(json.dumps(message).encode())
+
+
+def receive(conn):
+    return json.loads(conn.recv_bytes().decode())
+
+
+def parse_address(value):
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def split_users(users, shards):
+    """[(first_user, users)] in contiguous, near-equal shards"""
+    base, extra = divmod(users, shards)
+    result, first = [], 0
+    for index in range(shards):
+        size = base + (1 if index < extra else 0)
+        result.append((first, size))
+        first += size
+    return [shard for shard in result if shard[1]]
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+async def run_shard(engine, conn, started_cpu):
+    async def progress():
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            stats = engine.stats
+            send(conn, {"type": "progress", "requests": stats.requests, "errors": stats.errors,
+                        "inFlight": stats.in_flight, "activeUsers": stats.active_users,
+                        "cpu": time.process_time() - started_cpu})
+
+    reporter = asyncio.create_task(progress())
+    try:
+        await engine.run()
+    finally:
+        reporter.cancel()
+
+
+def worker(address, authkey):
+    conn = Client(address, authkey=authkey)
+    send(conn, {"type": "hello", "host": socket.gethostname(), "pid": os.getpid()})
+    try:
+        shard = receive(conn)
+    except (EOFError, OSError):
+        print("⚠️  Coordinator closed the connection without a shard (joined too late?)")
+        return 1
+    try:
+        scenario = Scenario(shard["scenario"], shard["source"])
+        engine = Engine(scenario, shard["users"], shard["duration"], shard["rampUp"], first_user=shard["firstUser"],
+                        seed=shard["seed"], timeout=shard["timeout"], co_interval=shard["coInterval"])
+        engine.admin_token = shard["adminToken"]
+        time.sleep(max(0.0, shard["startAt"] - time.time()))
+        started_cpu = time.process_time()
+        asyncio.run(run_shard(engine, conn, started_cpu))
+        send(conn, {"type": "result", "stats": engine.stats.to_dict(),
+                    "cpu": time.process_time() - started_cpu, "users": shard["users"]})
+    except Exception as e:
+        send(conn, {"type": "error", "message": f"{type(e).__name__}: {e}"})
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Coordinator
+# ---------------------------------------------------------------------------
+
+class WorkerHandle:
+    __slots__ = ('conn', 'name', 'first_user', 'users', 'progress', 'result', 'cpu', 'error')
+
+    def __init__(self, conn, hello):
+        self.conn = conn
+        self.name = f"{hello.get('host')}:{hello.get('pid')}"
+        self.first_user = self.users = 0
+        self.progress = {}
+        self.result = None
+        self.cpu = 0.0
+        self.error = None
+
+
+def accept_workers(listener, count, timeout):
+    """Workers that said hello within `timeout` seconds
+
+    The listener is closed afterwards, so a worker that turns up late
+    fails to connect instead of waiting forever for a shard.
+    """
+    handles = []
+    lock = threading.Lock()
+
+    def accept():
+        while True:
+            with lock:
+                if len(handles) >= count:
+                    return
+            try:
+                conn = listener.accept()
+                hello = receive(conn)
+            except (OSError, EOFError):
+                return
+            with lock:
+                handles.append(WorkerHandle(conn, hello))
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    listener.close()
+    with lock:
+        return list(handles)
+
+
+def stop_processes(processes, timeout=30):
+    """Wait for local workers; terminate, then kill, the ones still running"""
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        try:
+            process.wait(timeout=max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def collect(handles, deadline):
+    """Relay progress and gather results until every worker answered"""
+    pending = {h.conn: h for h in handles}
+    last_print = 0.0
+    while pending and time.monotonic() < deadline:
+        for conn in wait(list(pending), timeout=PROGRESS_INTERVAL):
+            handle = pending[conn]
+            try:
+                message = receive(conn)
+            except (EOFError, OSError):
+                handle.error = handle.error or "connection lost"
+                del pending[conn]
+                continue
+            if message["type"] == "progress":
+                handle.progress = message
+            elif message["type"] == "result":
+                handle.result = message["stats"]
+                handle.cpu = message["cpu"]
+                del pending[conn]
+            elif message["type"] == "error":
+                handle.error = message["message"]
+                del pending[conn]
+        if time.monotonic() - last_print >= 5:
+            last_print = time.monotonic()
+            live = [h.progress for h in handles if h.progress]
+            print(f"⏱️  {sum(p['requests'] for p in live):>9,} requests  "
+                  f"{sum(p['errors'] for p in live):>6} errors  "
+                  f"{sum(p['inFlight'] for p in live):>5} in flight  "
+                  f"{sum(p['activeUsers'] for p in live):>6} VUs  ({len(pending)} workers running)")
+    for handle in pending.values():
+        handle.error = handle.error or "no result before the deadline"
+
+
+def coordinate(args):
+    scenario = load_scenario(args.scenario)
+    users = args.users or scenario.users
+    duration = args.duration or scenario.duration
+    ramp_up = scenario.ramp_up if args.ramp_up is None else args.ramp_up
+    authkey = os.getenv('LOAD_AUTHKEY')
+    if args.remote and not authkey:
+        print("❌ --remote needs LOAD_AUTHKEY set here and on the worker hosts")
+        return 1
+    authkey = (authkey or secrets.token_hex(16)).encode()
+
+    setup = Engine(scenario, users=1)
+    if not setup.setup():
+        return 1
+
+    listener = Listener(parse_address(args.listen), authkey=authkey)
+    host, port = listener.address
+    connect = f"{'127.0.0.1' if host in ('0.0.0.0', '') else host}:{port}"
+    print(f"🧭 {users} VUs over {args.workers} local + {args.remote} remote workers; listening on {host}:{port}")
+    env = dict(os.environ, LOAD_AUTHKEY=authkey.decode())
+    processes = [subprocess.Popen([sys.executable, '-m', 'tests.distributed_load', 'worker', '--connect', connect],
+                                  cwd=REPO_ROOT, env=env) for _ in range(args.workers)]
+    handles = accept_workers(listener, args.workers + args.remote, args.join_timeout)
+    if not handles:
+        print("❌ No workers connected")
+        stop_processes(processes, timeout=0)
+        return 1
+    if len(handles) < args.workers + args.remote:
+        print(f"⚠️  Only {len(handles)} workers connected; running with those")
+
+    start_at = time.time() + START_DELAY
+    shards = split_users(users, len(handles))
+    for handle, (first_user, size) in zip(handles, shards):
+        handle.first_user, handle.users = first_user, size
+        send(handle.conn, {
+            "type": "shard", "scenario": scenario.raw, "source": scenario.source, "firstUser": first_user,
+            "users": size, "duration": duration, "rampUp": ramp_up,
+            "seed": args.seed, "timeout": args.timeout,
+            "coInterval": args.co_interval, "adminToken": setup.admin_token, "startAt": start_at,
+        })
+    for handle in handles[len(shards):]:
+        handle.conn.close()
+    handles = handles[:len(shards)]
+
+    collect(handles, time.monotonic() + START_DELAY + ramp_up + duration + args.timeout + 60)
+    for handle in handles:
+        handle.conn.close()
+    # Local workers without a shard (connected late, or left over) are stopped here
+    stop_processes(processes)
+
+    merged = RunStats()
+    for handle in handles:
+        if handle.result:
+            merged.merge_dict(handle.result)
+    print_report(scenario, merged, title="DISTRIBUTED RESULTS")
+    print("Workers:")
+    for handle in handles:
+        if handle.error:
+            print(f"   ❌ {handle.name:<28} VUs {handle.first_user}-{handle.first_user + handle.users - 1}: "
+                  f"{handle.error}")
+            continue
+        requests = handle.result["requests"]
+        elapsed = handle.result["elapsed"] or 1
+        cpu = handle.cpu / elapsed
+        flag = "  ⚠️  client-bound, add workers" if cpu > args.cpu_warn else ""
+        print(f"   ✅ {handle.name:<28} {handle.users:>6} VUs  {requests:>9,} requests "
+              f"({requests / elapsed:,.1f} req/s)  CPU {cpu:.0%}{flag}")
+    return 1 if any(h.error for h in handles) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed virtual-user load with merged histograms")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="coordinate a distributed run")
+    run.add_argument('scenario', help="scenario file (see tests/scenario.py)")
+    run.add_argument('--workers', type=int, default=os.cpu_count() or 2, help="local worker processes")
+    run.add_argument('--remote', type=int, default=0, help="workers expected from other hosts")
+    run.add_argument('--listen', default='127.0.0.1:0', help="host:port for worker connections")
+    run.add_argument('--join-timeout', type=float, default=60.0, help="seconds to wait for workers")
+    run.add_argument('--users', type=int, default=None)
+    run.add_argument('--duration', type=float, default=None)
+    run.add_argument('--ramp-up', type=float, default=None)
+    run.add_argument('--timeout', type=float, default=30.0)
+    run.add_argument('--seed', type=int, default=None)
+    run.add_argument('--co-interval', type=float, default=None, help="see tests/scenario.py --co-interval")
+    run.add_argument('--cpu-warn', type=float, default=0.85, help="flag workers above this CPU share")
+
+    work = commands.add_parser('worker', help="run shards for a coordinator")
+    work.add_argument('--connect', required=True, help="coordinator host:port")
+    args = parser.parse_args(argv)
+
+    if args.command == 'worker':
+        authkey = os.getenv('LOAD_AUTHKEY')
+        if not authkey:
+            print("❌ LOAD_AUTHKEY is not set")
+            return 1
+        return worker(parse_address(args.connect), authkey.encode())
+    try:
+        return coordinate(args)
+    except (OSError, ScenarioError) as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+How much of callback and registration latency is email I/O?
+
+Runs the same workload (register a buyer, create an order, send its signed
+Shopier success callback) once with email disabled as the baseline and
+then against tests/smtp_sink.py delaying each message by every value in
+--delays (default 0, 500 and 5000 ms). For every phase it reports:
+
+    - request latency of POST /api/auth/register, /api/orders and the
+      callback, and the share attributable to email (vs. the baseline)
+    - the email pipeline per step, from the sink's timestamps and
+      email_logs.createdAt:
+        trigger -> MAIL FROM   settings read, duplicate check, new
+                               nodemailer transporter, TCP connect, EHLO
+        MAIL -> DATA           envelope
+        DATA -> accepted       message transfer (+ injected delay)
+        accepted -> logged     email_logs insert
+    - how many responses returned before their email was accepted
+
+In this tree every send*Email call is fire-and-forget (`.catch(...)`, not
+awaited), so SMTP delays are expected to leave the response path mostly
+untouched; what remains is event-loop and Mongo contention from the
+transporter built on every send. The per-step numbers are the input for
+moving email onto a background queue with a shared transporter.
+
+Usage (from the repository root):
+    python -m tests.email_overhead --samples 20
+    python -m tests.email_overhead --delays 0,500,5000 --concurrency 5
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import timezone
+
+import httpx
+
+import callback_test
+from callback_test import BASE_URL, TEST_SHOPIER_API_SECRET, generate_shopier_hash
+from tests.callback_load import CALLBACK_PATH, fake_ip
+from tests.db import get_db
+from tests.http_client import create_async_client
+from tests.latency import summarize, format_summary
+from tests.smtp_sink import EmailSettingsOverride, SinkConfig, SmtpSink
+
+STEPS = ("register", "order", "callback")
+EMAIL_STEPS = ("trigger -> MAIL FROM", "MAIL -> DATA", "DATA -> accepted", "accepted -> logged")
+# Which request triggers which email
+TRIGGERS = {"welcome": "register", "order_created": "order", "paid": "callback",
+            "delivered": "callback", "pending": "callback"}
+
+
+class Sample:
+    """One buyer's register/order/callback round and when each response came back"""
+
+    def __init__(self, email):
+        self.email = email
+        self.started = {}
+        self.finished = {}
+        self.status = {}
+
+    def latency(self, step):
+        if step in self.finished:
+            return self.finished[step] - self.started[step]
+        return None
+
+
+class Phase:
+    def __init__(self, name, delay_ms):
+        self.name = name
+        self.delay_ms = delay_ms
+        self.samples = []
+        self.messages = []
+        self.logged = {}
+
+
+async def timed_post(client, sample, step, url, **kwargs):
+    sample.started[step] = time.time()
+    try:
+        response = await client.post(url, **kwargs)
+    except httpx.HTTPError:
+        sample.status[step] = 'error'
+        return None
+    sample.finished[step] = time.time()
+    sample.status[step] = response.status_code
+    return response if response.status_code == 200 else None
+
+
+async def buyer_round(client, semaphore, sample, index):
+    ip = fake_ip(index)
+    async with semaphore:
+        response = await timed_post(client, sample, "register", f"{BASE_URL}/auth/register", json={
+            "firstName": "Mail", "lastName": f"Bench{index}", "email": sample.email,
+            "phone": "5551234567", "password": "mailbench123"
+        }, headers={"X-Forwarded-For": ip})
+        if not response:
+            return
+        token = response.json()['data']['token']
+        response = await timed_post(client, sample, "order", f"{BASE_URL}/orders", json={
+            "productId": callback_test.test_product_id, "playerId": f"{6000000000 + index}",
+            "playerName": f"MailBench#{index % 10000:04d}"
+        }, headers={"Authorization": f"Bearer {token}", "X-Forwarded-For": ip})
+        if not response:
+            return
+        order = response.json()['data']['order']
+        await timed_post(client, sample, "callback", f"{BASE_URL}{CALLBACK_PATH}", json={
+            "orderId": order['id'], "platform_order_id": order['id'], "status": "success",
+            "transactionId": f"TXN_MAIL_{uuid.uuid4().hex}", "random_nr": uuid.uuid4().hex[:16],
+            "total_order_value": str(order['amount']),
+            "hash": generate_shopier_hash(order['id'], order['amount'], TEST_SHOPIER_API_SECRET)
+        }, headers={"X-Forwarded-For": ip})
+
+
+async def run_phase(phase, samples, concurrency, first_index):
+    semaphore = asyncio.Semaphore(concurrency)
+    async with create_async_client(retries=0, timeout=60, pool_size=concurrency) as client:
+        phase.samples = [Sample(f"mailbench.{uuid.uuid4().hex[:12]}@example.com") for _ in range(samples)]
+        await asyncio.gather(*(buyer_round(client, semaphore, sample, first_index + i)
+                               for i, sample in enumerate(phase.samples)))
+
+
+def load_logged(phase):
+    """email_logs.createdAt per (type, recipient) for this phase's buyers"""
+    recipients = [s.email for s in phase.samples]
+    for doc in get_db().email_logs.find({"to": {"$in": recipients}}, {"type": 1, "to": 1, "createdAt": 1}):
+        phase.logged[(doc['type'], doc['to'].lower())] = doc['createdAt'].replace(tzinfo=timezone.utc).timestamp()
+
+
+def email_breakdown(phase):
+    """-> {type: {step: [seconds]}}, responses that beat their email, emails matched"""
+    by_email = {s.email.lower(): s for s in phase.samples}
+    steps = defaultdict(lambda: defaultdict(list))
+    beat, matched = 0, 0
+    for message in phase.messages:
+        sample = by_email.get(message.to)
+        trigger = TRIGGERS.get(message.type)
+        if not sample or trigger not in sample.started:
+            continue
+        matched += 1
+        per_step = steps[message.type]
+        per_step["trigger -> MAIL FROM"].append(message.session_started - sample.started[trigger])
+        per_step["MAIL -> DATA"].append(message.data_started - message.session_started)
+        per_step["DATA -> accepted"].append(message.arrived - message.data_started)
+        logged = phase.logged.get((message.type, message.to))
+        if logged:
+            per_step["accepted -> logged"].append(max(0.0, logged - message.arrived))
+        if trigger in sample.finished and sample.finished[trigger] < message.arrived:
+            beat += 1
+    return steps, beat, matched
+
+
+def print_report(phases):
+    baseline = phases[0]
+    base_means = {}
+    print("\n" + "=" * 80)
+    print("EMAIL OVERHEAD RESULTS")
+    print("=" * 80)
+    for phase in phases:
+        print(f"\n--- {phase.name} ---")
+        for step in STEPS:
+            values = [s.latency(step) for s in phase.samples if s.latency(step) is not None]
+            summary = summarize(values)
+            print(format_summary(f"POST {step}", summary))
+            if phase is baseline:
+                base_means[step] = summary['mean'] if values else None
+            elif values and base_means.get(step):
+                extra = summary['mean'] - base_means[step]
+                print(f"   email share of {step} latency: {max(0.0, extra) / summary['mean']:.0%} "
+                      f"({extra:+.0f}ms vs. email disabled)")
+        if phase is baseline:
+            continue
+        steps, beat, matched = email_breakdown(phase)
+        for kind in sorted(steps):
+            print(f"  {kind} email:")
+            for step in EMAIL_STEPS:
+                if steps[kind][step]:
+                    print("  " + format_summary(step, summarize(steps[kind][step])))
+        rejected = sum(not m.accepted for m in phase.messages)
+        print(f"  {matched} emails matched, {rejected} rejected by the sink; "
+              f"{beat}/{matched} responses returned before their email was accepted")
+    print("\n💡 A response that returns before its email is accepted means the send is not on the "
+          "request path; growth in the email share with the delay means it is.")
+    print("=" * 80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Email share of callback and registration latency")
+    parser.add_argument('--delays', default="0,500,5000", help="comma-separated SMTP DATA delays in ms")
+    parser.add_argument('--samples', type=int, default=20, help="buyers per phase")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--settle', type=float, default=10.0, help="extra seconds to wait for slow emails")
+    parser.add_argument('--smtp-host', default='127.0.0.1')
+    parser.add_argument('--smtp-port', type=int, default=2525)
+    args = parser.parse_args(argv)
+
+    delays = [float(d) for d in args.delays.split(',') if d.strip()]
+    if not callback_test.setup():
+        return 1
+
+    config = SinkConfig()
+    sink = SmtpSink(config, args.smtp_host, args.smtp_port, verbose=False).start()
+    phases = [Phase("email disabled", None)] + [Phase(f"SMTP delay {d:.0f}ms", d) for d in delays]
+    try:
+        for number, phase in enumerate(phases):
+            print(f"🧪 {phase.name}: {args.samples} buyers")
+            config.data_delay_ms = phase.delay_ms or 0.0
+            seen = len(sink.messages)
+            with EmailSettingsOverride(args.smtp_host, args.smtp_port, enabled=phase.delay_ms is not None):
+                asyncio.run(run_phase(phase, args.samples, args.concurrency, 300000 + number * args.samples))
+                if phase.delay_ms is not None:
+                    # welcome + order_created + paid + delivered/pending per buyer
+                    expected = sum(2 + 2 * ("callback" in s.finished) for s in phase.samples)
+                    sink.wait_for(lambda m: True, seen + expected,
+                                  args.settle + phase.delay_ms / 1000 * args.samples / args.concurrency)
+            phase.messages = sink.messages[seen:]
+            load_logged(phase)
+    finally:
+        sink.stop()
+    print_report(phases)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Mergeable log-linear latency histograms (HdrHistogram-style)
+
+Values are recorded in whole microseconds into buckets that keep 7
+significant bits (< 0.8% relative error) from 1us up, so a histogram is a
+small sparse dict whatever the sample count, can be shipped between
+processes as JSON and merged exactly by adding counts - unlike
+percentiles, which cannot be averaged.
+
+record(seconds, expected_interval) applies HdrHistogram's coordinated
+omission correction: a request that took longer than the interval the
+client meant to send at also stands for the requests that interval would
+have started meanwhile, so value - interval, value - 2 * interval, ...
+are added down to the interval.
+"""
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+def bucket_of(micros):
+    exponent = max(0, micros.bit_length() - SUB_BUCKET_BITS)
+    return exponent * SUB_BUCKETS + (micros >> exponent)
+
+
+def bucket_value(bucket):
+    """Midpoint of a bucket in microseconds"""
+    exponent, sub = divmod(bucket, SUB_BUCKETS)
+    return (sub << exponent) + ((1 << exponent) >> 1)
+
+
+class LatencyHistogram:
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record_micros(self, micros, times=1):
+        micros = max(0, int(micros))
+        bucket = bucket_of(micros)
+        self.counts[bucket] = self.counts.get(bucket, 0) + times
+        self.count += times
+        self.total += micros * times
+        self.min = micros if self.min is None else min(self.min, micros)
+        self.max = max(self.max, micros)
+
+    def record(self, seconds, expected_interval=None):
+        micros = round(seconds * 1_000_000)
+        self.record_micros(micros)
+        if expected_interval:
+            interval = round(expected_interval * 1_000_000)
+            missing = micros - interval
+            while interval > 0 and missing >= interval:
+                self.record_micros(missing)
+                missing -= interval
+
+    def merge(self, other):
+        for bucket, n in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def value_at(self, pct):
+        """Nearest-rank percentile in microseconds (same ranking as tests.latency.percentile)"""
+        if not self.count:
+            return 0
+        rank = max(1, min(self.count, -(-pct * self.count // 100)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(max(bucket_value(bucket), self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """Same shape as tests.latency.summarize(), in milliseconds"""
+        if not self.count:
+            return {"count": 0, "min": 0.0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "count": self.count,
+            "min": self.min / 1000,
+            "mean": self.total / self.count / 1000,
+            "p50": self.value_at(50) / 1000,
+            "p95": self.value_at(95) / 1000,
+            "p99": self.value_at(99) / 1000,
+            "max": self.max / 1000,
+        }
+
+    def to_dict(self):
+        return {"counts": {str(b): n for b, n in self.counts.items()}, "count": self.count,
+                "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(b): n for b, n in data.get("counts", {}).items()}
+        histogram.count = data.get("count", 0)
+        histogram.total = data.get("total", 0)
+        histogram.min = data.get("min")
+        histogram.max = data.get("max", 0)
+        return histogram
+
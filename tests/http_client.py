@@ -0,0 +1,260 @@
+"""
+Shared pooled HTTP client for the API test scripts
+
+One keep-alive connection pool per process (HTTP/2 when the `h2` package is
+installed), configurable timeouts and retries, and a connection report on
+exit showing how much handshake time the pool saved.
+
+Environment:
+    API_TEST_TIMEOUT   per-request timeout in seconds (default 10)
+    API_TEST_RETRIES   retries for connect failures and gateway errors (default 2)
+    API_TEST_POOL      max pooled connections (default 20)
+    API_CASSETTE       record/replay the sync client's traffic (tests/cassette.py)
+"""
+
+import atexit
+import os
+import threading
+import time
+
+import httpx
+
+from tests import cassette, token_cache
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_TIMEOUT = float(os.getenv('API_TEST_TIMEOUT', '10'))
+DEFAULT_RETRIES = int(os.getenv('API_TEST_RETRIES', '2'))
+DEFAULT_POOL_SIZE = int(os.getenv('API_TEST_POOL', '20'))
+
+# Only idempotent requests are retried on these; POSTs only on connect failures
+RETRY_STATUS_CODES = (502, 503, 504)
+RETRY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+RETRY_BACKOFF = 0.5
+
+RequestError = httpx.HTTPError
+
+
+class ConnectionStats:
+    """Counts requests vs. new connections and the time spent opening them"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.handshake_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def record_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def record_connection(self, seconds):
+        with self.lock:
+            self.connections += 1
+            self.handshake_seconds += seconds
+
+    def saved_seconds(self):
+        """Handshake time a connection-per-request client would have spent on top"""
+        if not self.connections:
+            return 0.0
+        average = self.handshake_seconds / self.connections
+        return max(0, self.requests - self.connections) * average
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        protocol = "HTTP/2" if HTTP2_AVAILABLE else "HTTP/1.1 keep-alive"
+        print(
+            f"\n🔌 HTTP pool ({protocol}): {self.requests} requests over {self.connections} connections, "
+            f"{self.handshake_seconds:.2f}s in handshakes, ~{self.saved_seconds():.2f}s saved "
+            f"(run wall-clock {elapsed:.2f}s)"
+        )
+
+
+stats = ConnectionStats()
+
+# Callables notified of every completed sync request as
+# (method, url, status_code, seconds, payload_bytes); see tests/results_store.py
+listeners = []
+
+
+def add_listener(listener):
+    if listener not in listeners:
+        listeners.append(listener)
+
+
+# Objects told about every request of the async clients created while they are
+# registered: started(request) and finished(request, status_code, seconds, error),
+# status_code None on transport errors; see tests/live_dashboard.py
+observers = []
+
+
+def add_observer(observer):
+    if observer not in observers:
+        observers.append(observer)
+
+
+def remove_observer(observer):
+    if observer in observers:
+        observers.remove(observer)
+
+
+def _handshake_tracer():
+    """httpcore trace hook timing TCP connect + TLS for new connections"""
+    started = {}
+
+    def trace(event_name, info):
+        if event_name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+            started[event_name.rsplit('.', 1)[0]] = time.perf_counter()
+        elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            step = event_name.rsplit('.', 1)[0]
+            seconds = time.perf_counter() - started.pop(step, time.perf_counter())
+            if step == "connection.connect_tcp":
+                stats.record_connection(seconds)
+            else:
+                with stats.lock:
+                    stats.handshake_seconds += seconds
+
+    return trace
+
+
+def _async_handshake_tracer():
+    trace = _handshake_tracer()
+
+    async def async_trace(event_name, info):
+        trace(event_name, info)
+
+    return async_trace
+
+
+def _on_request(request):
+    stats.record_request()
+    request.extensions["trace"] = _handshake_tracer()
+
+
+async def _on_async_request(request):
+    stats.record_request()
+    request.extensions["trace"] = _async_handshake_tracer()
+
+
+def _bearer_token(headers):
+    if not headers:
+        return None
+    value = httpx.Headers(headers).get("Authorization", "")
+    return value[len("Bearer "):] if value.startswith("Bearer ") else None
+
+
+class PooledClient(httpx.Client):
+    """httpx.Client that also retries idempotent requests on gateway errors,
+    and requests rejected with 401 once with a renewed token (tests/token_cache.py)"""
+
+    def __init__(self, *args, retries=DEFAULT_RETRIES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retries = retries
+
+    def request(self, method, url, *args, **kwargs):
+        response = self._request(method, url, *args, **kwargs)
+        token = _bearer_token(kwargs.get("headers"))
+        if response.status_code == 401 and token:
+            renewed = token_cache.renew(token)
+            if renewed:
+                headers = httpx.Headers(kwargs["headers"])
+                headers["Authorization"] = f"Bearer {renewed}"
+                response = self._request(method, url, *args, **dict(kwargs, headers=headers))
+        return response
+
+    def _request(self, method, url, *args, **kwargs):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            response = super().request(method, url, *args, **kwargs)
+            for listener in listeners:
+                listener(method.upper(), str(response.request.url), response.status_code,
+                         time.perf_counter() - start, len(response.content))
+            if (
+                attempt >= self.retries
+                or method.upper() not in RETRY_METHODS
+                or response.status_code not in RETRY_STATUS_CODES
+            ):
+                return response
+            attempt += 1
+            time.sleep(RETRY_BACKOFF * attempt)
+
+
+class ObservedAsyncTransport(httpx.AsyncBaseTransport):
+    """Reports each request's start, end and outcome (time to response headers) to observers"""
+
+    def __init__(self, wrapped, observers):
+        self.wrapped = wrapped
+        self.observers = observers
+
+    async def handle_async_request(self, request):
+        for observer in self.observers:
+            observer.started(request)
+        start = time.perf_counter()
+        try:
+            response = await self.wrapped.handle_async_request(request)
+        except Exception as e:
+            for observer in self.observers:
+                observer.finished(request, None, time.perf_counter() - start, e)
+            raise
+        for observer in self.observers:
+            observer.finished(request, response.status_code, time.perf_counter() - start, None)
+        return response
+
+    async def aclose(self):
+        await self.wrapped.aclose()
+
+
+def create_client(timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, pool_size=DEFAULT_POOL_SIZE):
+    """New pooled sync client; most callers want the shared get_client()"""
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    return PooledClient(
+        timeout=timeout,
+        retries=retries,
+        follow_redirects=True,
+        transport=cassette.wrap_transport(
+            httpx.HTTPTransport(http2=HTTP2_AVAILABLE, retries=retries, limits=limits)),
+        event_hooks={"request": [_on_request]},
+    )
+
+
+def create_async_client(timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, pool_size=DEFAULT_POOL_SIZE,
+                        observe=True):
+    """Pooled async client with the same settings, for the load tools"""
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    transport = httpx.AsyncHTTPTransport(http2=HTTP2_AVAILABLE, retries=retries, limits=limits)
+    if observe and observers:
+        transport = ObservedAsyncTransport(transport, list(observers))
+    return httpx.AsyncClient(
+        timeout=timeout,
+        follow_redirects=True,
+        transport=transport,
+        event_hooks={"request": [_on_async_request]},
+    )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide shared client; reports connection savings at exit"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = create_client()
+            atexit.register(close_client)
+        return _client
+
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+        stats.report()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Query-plan and index audit for the collections route.js hits
+
+Replays the filter/sort shapes route.js sends to Mongo (calculateOrderRisk
+counts, checkEmailSent, the audit-log page + distinct calls, stock
+assignment, reviews, dashboards...) against a seeded database, captures
+explain("executionStats") for each, flags COLLSCANs and in-memory sorts,
+proposes compound indexes (equality, sort, range order) and, with
+--apply, creates them and reports before/after docsExamined and latency.
+
+Usage (from the repository root, after python -m tests.seed):
+    python -m tests.index_audit            # report + proposals only
+    python -m tests.index_audit --apply    # create indexes, show before/after
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from tests.db import get_db
+from tests.seed import STOCK_COLLECTION
+
+RANGE_OPERATORS = {'$gt', '$gte', '$lt', '$lte', '$ne', '$nin', '$exists'}
+EQUALITY_OPERATORS = {'$eq', '$in'}
+
+
+class QueryShape:
+    """One query route.js runs; `build(sample)` returns its parameters"""
+
+    def __init__(self, name, collection, op, build):
+        self.name = name
+        self.collection = collection
+        self.op = op
+        self.build = build
+
+
+def _hours_ago(hours):
+    return datetime.now(timezone.utc) - timedelta(hours=hours)
+
+
+QUERY_SHAPES = [
+    # calculateOrderRisk
+    QueryShape("risk: paid orders by user", "orders", "count",
+               lambda s: {"filter": {"userId": s["userId"], "status": {"$in": ["paid", "completed"]}}}),
+    QueryShape("risk: recent orders by IP", "orders", "count",
+               lambda s: {"filter": {"meta.ip": s["ip"], "createdAt": {"$gte": _hours_ago(1)}}}),
+    QueryShape("risk: distinct playerId by user", "orders", "distinct",
+               lambda s: {"key": "playerId", "filter": {"userId": s["userId"]}}),
+    QueryShape("risk: failed orders by user", "orders", "count",
+               lambda s: {"filter": {"userId": s["userId"], "status": "failed", "createdAt": {"$gte": _hours_ago(24)}}}),
+    # order lookups
+    QueryShape("order by id", "orders", "find",
+               lambda s: {"filter": {"id": s["orderId"]}, "limit": 1}),
+    QueryShape("account orders", "orders", "find",
+               lambda s: {"filter": {"userId": s["userId"]}, "sort": {"createdAt": -1}}),
+    QueryShape("admin orders by status", "orders", "find",
+               lambda s: {"filter": {"status": "paid"}, "sort": {"createdAt": -1}, "limit": 100}),
+    QueryShape("admin flagged badge", "orders", "count",
+               lambda s: {"filter": {"risk.status": "FLAGGED", "delivery.status": "hold"}}),
+    QueryShape("dashboard pending count", "orders", "count",
+               lambda s: {"filter": {"status": "pending"}}),
+    QueryShape("dashboard revenue", "orders", "aggregate",
+               lambda s: {"pipeline": [{"$match": {"status": "paid"}},
+                                       {"$group": {"_id": None, "total": {"$sum": "$amount"}}}]}),
+    QueryShape("dashboard recent orders", "orders", "find",
+               lambda s: {"filter": {}, "sort": {"createdAt": -1}, "limit": 5}),
+    # checkEmailSent / admin email logs
+    QueryShape("email dedupe check", "email_logs", "find",
+               lambda s: {"filter": {"type": "paid", "userId": s["userId"], "orderId": s["orderId"]}, "limit": 1}),
+    QueryShape("admin email logs", "email_logs", "find",
+               lambda s: {"filter": {}, "sort": {"createdAt": -1}, "limit": 100}),
+    # audit logs page
+    QueryShape("audit logs page", "audit_logs", "find",
+               lambda s: {"filter": {"action": s["action"]}, "sort": {"createdAt": -1}, "skip": 500, "limit": 50}),
+    QueryShape("audit logs count", "audit_logs", "count",
+               lambda s: {"filter": {"action": s["action"]}}),
+    QueryShape("audit distinct action", "audit_logs", "distinct",
+               lambda s: {"key": "action", "filter": {}}),
+    QueryShape("audit distinct entityType", "audit_logs", "distinct",
+               lambda s: {"key": "entityType", "filter": {}}),
+    # stock
+    QueryShape("stock assignment (FIFO)", STOCK_COLLECTION, "findAndModify",
+               lambda s: {"filter": {"productId": s["productId"], "status": "available"}, "sort": {"createdAt": 1},
+                          "update": {"$set": {"status": "assigned"}}}),
+    QueryShape("available stock count", STOCK_COLLECTION, "count",
+               lambda s: {"filter": {"status": "available"}}),
+    # callback / auth / support / reviews
+    QueryShape("payment by txn id", "payments", "find",
+               lambda s: {"filter": {"providerTxnId": s["txnId"]}, "limit": 1}),
+    QueryShape("payment by order", "payments", "find",
+               lambda s: {"filter": {"orderId": s["orderId"]}, "limit": 1}),
+    QueryShape("user by email", "users", "find",
+               lambda s: {"filter": {"email": s["email"]}, "limit": 1}),
+    QueryShape("user by id", "users", "find",
+               lambda s: {"filter": {"id": s["userId"]}, "limit": 1}),
+    QueryShape("ticket rate limit", "tickets", "count",
+               lambda s: {"filter": {"userId": s["userId"], "createdAt": {"$gte": _hours_ago(1 / 6)}}}),
+    QueryShape("user tickets", "tickets", "find",
+               lambda s: {"filter": {"userId": s["userId"]}, "sort": {"updatedAt": -1}}),
+    QueryShape("reviews page", "reviews", "find",
+               lambda s: {"filter": {"game": "pubg", "approved": True}, "sort": {"createdAt": -1}, "limit": 5}),
+    QueryShape("reviews count", "reviews", "count",
+               lambda s: {"filter": {"game": "pubg", "approved": True}}),
+]
+
+
+def sample_values(db):
+    """Realistic filter values taken from existing documents"""
+    order = db.orders.find_one({"meta.ip": {"$exists": True}}) or db.orders.find_one() or {}
+    user = db.users.find_one({"id": order.get("userId")}) or db.users.find_one() or {}
+    audit = db.audit_logs.find_one() or {}
+    payment = db.payments.find_one() or {}
+    product = db.products.find_one() or {}
+    return {
+        "userId": order.get("userId", user.get("id", "missing")),
+        "orderId": order.get("id", "missing"),
+        "ip": order.get("meta", {}).get("ip", "127.0.0.1"),
+        "email": user.get("email", "missing@example.com"),
+        "action": audit.get("action", "order.status_change"),
+        "txnId": payment.get("providerTxnId", "missing"),
+        "productId": order.get("productId", product.get("id", "missing")),
+    }
+
+
+def explain(db, shape, params):
+    coll = shape.collection
+    if shape.op == "find":
+        command = {"find": coll, "filter": params["filter"]}
+        for key in ("sort", "skip", "limit"):
+            if key in params:
+                command[key] = params[key]
+    elif shape.op == "count":
+        command = {"count": coll, "query": params["filter"]}
+    elif shape.op == "distinct":
+        command = {"distinct": coll, "key": params["key"], "query": params["filter"]}
+    elif shape.op == "aggregate":
+        command = {"aggregate": coll, "pipeline": params["pipeline"], "cursor": {}}
+    elif shape.op == "findAndModify":
+        command = {"findAndModify": coll, "query": params["filter"], "sort": params["sort"],
+                   "update": params["update"]}
+    else:
+        raise ValueError(f"Unknown op {shape.op}")
+    # explain never applies the findAndModify update
+    return db.command({"explain": command, "verbosity": "executionStats"})
+
+
+def run_query(db, shape, params):
+    """Execute a read shape once (findAndModify is only explained, never run)"""
+    coll = db[shape.collection]
+    if shape.op == "find":
+        cursor = coll.find(params["filter"])
+        if "sort" in params:
+            cursor = cursor.sort(list(params["sort"].items()))
+        cursor = cursor.skip(params.get("skip", 0)).limit(params.get("limit", 0))
+        return list(cursor)
+    if shape.op == "count":
+        return coll.count_documents(params["filter"])
+    if shape.op == "distinct":
+        return coll.distinct(params["key"], params["filter"])
+    if shape.op == "aggregate":
+        return list(coll.aggregate(params["pipeline"]))
+    return None
+
+
+def _walk(node, skip=("rejectedPlans", "allPlansExecution")):
+    if isinstance(node, dict):
+        yield node
+        for key, value in node.items():
+            if key not in skip:
+                yield from _walk(value, skip)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk(item, skip)
+
+
+def plan_summary(explain_output):
+    """Stages, docs/keys examined and server time from an explain document"""
+    stages = set()
+    summary = {"docsExamined": 0, "keysExamined": 0, "serverMillis": 0}
+    for node in _walk(explain_output):
+        if "stage" in node:
+            stages.add(node["stage"])
+        stats = node.get("executionStats")
+        if isinstance(stats, dict) and "totalDocsExamined" in stats:
+            summary["docsExamined"] += stats.get("totalDocsExamined", 0)
+            summary["keysExamined"] += stats.get("totalKeysExamined", 0)
+            summary["serverMillis"] += stats.get("executionTimeMillis", 0)
+    summary["stages"] = sorted(stages)
+    summary["collscan"] = "COLLSCAN" in stages
+    summary["memorySort"] = "SORT" in stages
+    return summary
+
+
+def measure(db, shape, params, repeat):
+    if shape.op == "findAndModify":
+        return None
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_query(db, shape, params)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def propose_index(shape, params):
+    """Equality -> Sort -> Range key order for one query shape"""
+    if shape.op == "aggregate":
+        match = next((stage["$match"] for stage in params["pipeline"] if "$match" in stage), {})
+        query, sort = match, {}
+    else:
+        query, sort = params.get("filter", {}), params.get("sort", {})
+
+    equality, ranges = [], []
+    for field, condition in query.items():
+        if field.startswith("$"):
+            continue
+        if isinstance(condition, dict) and set(condition) & RANGE_OPERATORS:
+            ranges.append(field)
+        elif not isinstance(condition, dict) or set(condition) <= EQUALITY_OPERATORS:
+            equality.append(field)
+
+    keys = [(field, 1) for field in equality]
+    keys += [(field, direction) for field, direction in sort.items() if field not in equality]
+    keys += [(field, 1) for field in ranges if field not in dict(keys)]
+    if shape.op == "distinct" and params["key"] not in dict(keys):
+        keys.append((params["key"], 1))
+    return keys or None
+
+
+def is_prefix(keys, other):
+    return len(keys) <= len(other) and list(other[:len(keys)]) == list(keys)
+
+
+def existing_indexes(db, collection):
+    return [list(info["key"]) for info in db[collection].index_information().values()]
+
+
+def plan_indexes(db, audits):
+    """Deduplicated index proposals not already covered by an existing index"""
+    proposals = {}
+    for audit in audits:
+        if not (audit["before"]["collscan"] or audit["before"]["memorySort"]):
+            continue
+        keys = audit["proposal"]
+        if not keys:
+            continue
+        proposals.setdefault(audit["collection"], [])
+        proposals[audit["collection"]].append([tuple(k) for k in keys])
+
+    planned = []
+    for collection, candidates in proposals.items():
+        existing = [[tuple(k) for k in keys] for keys in existing_indexes(db, collection)]
+        candidates = sorted(set(map(tuple, candidates)), key=len, reverse=True)
+        chosen = []
+        for keys in candidates:
+            if any(is_prefix(keys, other) for other in chosen + existing):
+                continue
+            chosen.append(keys)
+        planned.extend((collection, list(keys)) for keys in chosen)
+    return planned
+
+
+def audit_all(db, samples, repeat):
+    audits = []
+    for shape in QUERY_SHAPES:
+        params = shape.build(samples)
+        audits.append({
+            "name": shape.name,
+            "collection": shape.collection,
+            "op": shape.op,
+            "shape": shape,
+            "params": params,
+            "before": plan_summary(explain(db, shape, params)),
+            "beforeMillis": measure(db, shape, params, repeat),
+            "proposal": propose_index(shape, params),
+        })
+    return audits
+
+
+def _millis(value):
+    return "   n/a" if value is None else f"{value:6.1f}"
+
+
+def print_audit(audits):
+    print("\n" + "=" * 100)
+    print("🔍 QUERY PLAN AUDIT")
+    print("=" * 100)
+    for audit in audits:
+        before = audit["before"]
+        flag = "❌ COLLSCAN" if before["collscan"] else "⚠️  SORT" if before["memorySort"] else "✅"
+        print(f"{flag:<11} {audit['collection'] + '.' + audit['op']:<24} {audit['name']:<34} "
+              f"docs={before['docsExamined']:<9} keys={before['keysExamined']:<9} "
+              f"{_millis(audit['beforeMillis'])}ms")
+
+
+def print_comparison(audits):
+    print("\n" + "=" * 100)
+    print("📊 BEFORE / AFTER")
+    print("=" * 100)
+    for audit in audits:
+        before, after = audit["before"], audit["after"]
+        print(f"{audit['name']:<34} docsExamined {before['docsExamined']:>9} -> {after['docsExamined']:<9} "
+              f"latency {_millis(audit['beforeMillis'])} -> {_millis(audit['afterMillis'])}ms  "
+              f"{','.join(after['stages'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Explain route.js query shapes and propose indexes")
+    parser.add_argument("--apply", action="store_true", help="create the proposed indexes")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query shape")
+    parser.add_argument("--db", default=None, help="database name (default DB_NAME env / pubg_uc_store)")
+    parser.add_argument("--json", dest="json_path", default=None, help="write the full report to this file")
+    args = parser.parse_args(argv)
+
+    db = get_db(args.db)
+    samples = sample_values(db)
+    audits = audit_all(db, samples, args.repeat)
+    print_audit(audits)
+
+    planned = plan_indexes(db, audits)
+    print("\n💡 Proposed indexes:" if planned else "\n✅ No missing indexes found")
+    for collection, keys in planned:
+        print(f"   db.{collection}.createIndex({json.dumps(dict(keys))})")
+
+    if args.apply and planned:
+        for collection, keys in planned:
+            name = db[collection].create_index(keys)
+            print(f"✅ Created {collection}.{name}")
+        for audit in audits:
+            audit["after"] = plan_summary(explain(db, audit["shape"], audit["params"]))
+            audit["afterMillis"] = measure(db, audit["shape"], audit["params"], args.repeat)
+        print_comparison(audits)
+
+    if args.json_path:
+        report = [{k: v for k, v in audit.items() if k not in ("shape", "params")} for audit in audits]
+        with open(args.json_path, "w") as f:
+            json.dump({"indexes": planned, "queries": report}, f, indent=2, default=str)
+        print(f"\n📝 Report written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
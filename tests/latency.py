@@ -0,0 +1,39 @@
+"""
+Latency statistics helpers shared by the load and benchmark tools
+"""
+
+import math
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    rank = max(0, min(rank, len(sorted_values) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples):
+    """Summarize latency samples (seconds) into a dict of milliseconds"""
+    values = sorted(samples)
+    if not values:
+        return {"count": 0, "min": 0.0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "min": values[0] * 1000,
+        "mean": sum(values) / len(values) * 1000,
+        "p50": percentile(values, 50) * 1000,
+        "p95": percentile(values, 95) * 1000,
+        "p99": percentile(values, 99) * 1000,
+        "max": values[-1] * 1000,
+    }
+
+
+def format_summary(name, summary):
+    """One report line for a summarize() result"""
+    return (
+        f"{name:<28} n={summary['count']:<7} "
+        f"p50={summary['p50']:8.1f}ms  p95={summary['p95']:8.1f}ms  "
+        f"p99={summary['p99']:8.1f}ms  max={summary['max']:8.1f}ms"
+    )
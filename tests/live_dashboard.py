@@ -0,0 +1,236 @@
+"""
+Live terminal view for the async load tools
+
+Registered as an observer of tests/http_client.py's async clients, it
+redraws every --live-interval seconds while a run is going:
+
+    - requests in flight, totals, and throughput over the last --live-window
+      seconds
+    - per endpoint (ids collapsed like tests/results_store.py): req/s,
+      p50/p99 to response headers, error rate (5xx and transport errors)
+      and 429 rate over the same window
+    - server side, polled every --live-poll seconds on a separate client:
+      GET /api/health latency and uptime, GET /api/admin/system-status
+      counts (pending orders, orders today, available stock, open tickets)
+      and, when Mongo is reachable, available rows in the `stock`
+      collection orders are actually served from (system-status counts
+      `stocks`)
+
+On a terminal the block is redrawn in place; otherwise one summary line
+is printed per refresh. Ctrl+C stops the run.
+
+Used by `python -m tests.callback_load --live` and
+`python -m tests.scenario <file> --live`.
+"""
+
+import asyncio
+import sys
+import time
+from collections import defaultdict, deque
+
+import httpx
+
+from tests import http_client
+from tests.latency import percentile
+from tests.results_store import normalize_endpoint
+
+CLEAR = "\x1b[H\x1b[2J"
+STOCK_TIMEOUT_MS = 500
+
+
+class EndpointWindow:
+    __slots__ = ('samples', 'total', 'errors', 'limited')
+
+    def __init__(self):
+        self.samples = deque()
+        self.total = 0
+        self.errors = 0
+        self.limited = 0
+
+
+class LiveDashboard:
+    def __init__(self, title, api_base, admin_token=None, interval=1.0, window=10.0, poll=5.0,
+                 out=sys.stdout):
+        self.title = title
+        self.api_base = api_base
+        self.admin_token = admin_token
+        self.interval = interval
+        self.window = window
+        self.poll = poll
+        self.out = out
+        self.tty = out.isatty()
+        self.endpoints = defaultdict(EndpointWindow)
+        self.in_flight = 0
+        self.total = 0
+        self.began = time.monotonic()
+        self.server = {}
+        self.server_at = None
+        self.available_stock = StockCounter()
+
+    # http_client observer interface
+    def started(self, request):
+        self.in_flight += 1
+
+    def finished(self, request, status_code, seconds, error):
+        self.in_flight -= 1
+        self.total += 1
+        endpoint = self.endpoints[f"{request.method} {normalize_endpoint(str(request.url))}"]
+        endpoint.samples.append((time.monotonic(), seconds, status_code))
+        endpoint.total += 1
+        if status_code is None or status_code >= 500:
+            endpoint.errors += 1
+        elif status_code == 429:
+            endpoint.limited += 1
+
+    def __enter__(self):
+        http_client.add_observer(self)
+        return self
+
+    def __exit__(self, *exc):
+        http_client.remove_observer(self)
+
+    async def poll_server(self):
+        async with http_client.create_async_client(timeout=10, retries=0, pool_size=2, observe=False) as client:
+            while True:
+                server = {}
+                started = time.perf_counter()
+                try:
+                    response = await client.get(f"{self.api_base}/health")
+                    server['health_ms'] = (time.perf_counter() - started) * 1000
+                    if response.status_code == 200:
+                        server.update(uptime=response.json().get('uptime'), version=response.json().get('version'))
+                    else:
+                        server['health_status'] = response.status_code
+                    if self.admin_token:
+                        response = await client.get(f"{self.api_base}/admin/system-status",
+                                                    headers={"Authorization": f"Bearer {self.admin_token}"})
+                        if response.status_code == 200:
+                            server.update(response.json()['data']['metrics'])
+                except (httpx.HTTPError, ValueError, KeyError):
+                    server['health_status'] = 'unreachable'
+                stock = await asyncio.to_thread(self.available_stock)
+                if stock is not None:
+                    server['stock_available'] = stock
+                self.server, self.server_at = server, time.monotonic()
+                await asyncio.sleep(self.poll)
+
+    def rows(self, now):
+        rows = []
+        for name, endpoint in self.endpoints.items():
+            while endpoint.samples and endpoint.samples[0][0] < now - self.window:
+                endpoint.samples.popleft()
+            samples = endpoint.samples
+            span = min(self.window, now - self.began) or 1
+            latencies = sorted(s[1] for s in samples)
+            errors = sum(1 for s in samples if s[2] is None or s[2] >= 500)
+            limited = sum(1 for s in samples if s[2] == 429)
+            count = len(samples) or 1
+            rows.append((name, len(samples) / span, percentile(latencies, 50) * 1000,
+                         percentile(latencies, 99) * 1000, errors / count, limited / count, endpoint.total))
+        return sorted(rows, key=lambda r: -r[6])
+
+    def render(self):
+        now = time.monotonic()
+        rows = self.rows(now)
+        elapsed = int(now - self.began)
+        rate = sum(r[1] for r in rows)
+        errors = sum(e.errors for e in self.endpoints.values())
+        limited = sum(e.limited for e in self.endpoints.values())
+        total = self.total or 1
+        if not self.tty:
+            worst = max(rows, key=lambda r: r[3], default=None)
+            print(f"📺 {elapsed:>5}s  {rate:7.1f} req/s  in flight {self.in_flight:>4}  "
+                  f"errors {errors / total:5.1%}  429 {limited / total:5.1%}"
+                  + (f"  slowest p99 {worst[0]} {worst[3]:.0f}ms" if worst else "")
+                  + (f"  pending {self.server['pendingOrders']}" if 'pendingOrders' in self.server else ""),
+                  file=self.out, flush=True)
+            return
+        lines = [
+            f"LIVE {self.title}  {elapsed // 3600:02d}:{elapsed // 60 % 60:02d}:{elapsed % 60:02d}  "
+            f"in flight {self.in_flight}  total {self.total:,}  errors {errors / total:.1%}  "
+            f"429 {limited / total:.1%}   (Ctrl+C stops)",
+            f"throughput (last {self.window:g}s): {rate:,.1f} req/s",
+            "",
+            f"{'endpoint':<44} {'req/s':>7} {'p50':>9} {'p99':>9} {'err':>6} {'429':>6}",
+        ]
+        for name, per_second, p50, p99, error_rate, limit_rate, _ in rows:
+            lines.append(f"{name[:44]:<44} {per_second:7.1f} {p50:7.1f}ms {p99:7.1f}ms "
+                         f"{error_rate:6.1%} {limit_rate:6.1%}")
+        lines.append("")
+        lines.append(self.server_line(now))
+        self.out.write(CLEAR + "\n".join(lines) + "\n")
+        self.out.flush()
+
+    def server_line(self, now):
+        s = self.server
+        if self.server_at is None:
+            return "server: waiting for the first poll"
+        if 'health_status' in s:
+            head = f"server: health {s['health_status']}"
+        else:
+            head = f"server: health {s.get('health_ms', 0):.0f}ms (v{s.get('version')}, up {s.get('uptime', 0) / 60:.0f}min)"
+        counts = [f"{label} {s[key]:,}" for key, label in (
+            ('pendingOrders', 'pending orders'), ('ordersToday', 'orders today'),
+            ('availableStock', 'available `stocks`'), ('stock_available', 'available `stock`'),
+            ('openTickets', 'open tickets')) if key in s]
+        return f"{head}  {'  '.join(counts)}  ({now - self.server_at:.0f}s ago)"
+
+    async def run(self):
+        """Redraw until cancelled"""
+        poller = asyncio.create_task(self.poll_server())
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                self.render()
+        finally:
+            poller.cancel()
+
+    async def watch(self, coro):
+        """Await `coro` with the dashboard running next to it"""
+        ui = asyncio.create_task(self.run())
+        try:
+            return await coro
+        finally:
+            ui.cancel()
+            self.render()
+
+
+class StockCounter:
+    """Available rows in the `stock` collection, or None without Mongo
+
+    Uses its own client with short timeouts (tests.db's shared one waits 30s
+    for server selection) and stops trying after the first failure, so an
+    unreachable Mongo never holds up the poll loop or the exit.
+    """
+
+    def __init__(self, timeout_ms=STOCK_TIMEOUT_MS):
+        self.timeout_ms = timeout_ms
+        self.collection = None
+        self.failed = False
+
+    def __call__(self):
+        if self.failed:
+            return None
+        try:
+            if self.collection is None:
+                from pymongo import MongoClient
+                from tests.db import DB_NAME, MONGO_URL
+                from tests.seed import STOCK_COLLECTION
+                client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=self.timeout_ms,
+                                     connectTimeoutMS=self.timeout_ms, socketTimeoutMS=3000)
+                self.collection = client[DB_NAME][STOCK_COLLECTION]
+            return self.collection.count_documents({'status': 'available'}, maxTimeMS=2000)
+        except Exception:
+            self.failed = True
+            return None
+
+
+def add_live_arguments(parser):
+    parser.add_argument('--live', action='store_true', help="live terminal dashboard while running")
+    parser.add_argument('--live-interval', type=float, default=1.0, help="dashboard refresh (s)")
+    parser.add_argument('--live-window', type=float, default=10.0, help="rolling window for rates (s)")
+    parser.add_argument('--live-poll', type=float, default=5.0, help="health/system-status poll (s)")
+
+
+def dashboard_from_args(args, title, api_base, admin_token=None):
+    return LiveDashboard(title, api_base, admin_token, args.live_interval, args.live_window, args.live_poll)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Nightly archival of audit_logs, email_logs and payment_security_logs
+
+route.js only ever inserts into these collections (logAuditAction,
+logEmail / the test email, the callback's hash_mismatch log), so
+checkEmailSent's findOne and the admin log views get slower every month.
+This moves every complete UTC day older than --older-than-days out of
+Mongo, one day at a time:
+
+    1. stream the day with a batched cursor (sorted on the time field,
+       then _id) into <out>/<collection>/YYYY/MM/<collection>-YYYY-MM-DD
+       .jsonl.gz (MongoDB extended JSON, one document per line - gunzip
+       and `mongoimport` restores it) or .parquet with --format parquet
+       (needs pyarrow; columns _id, time, document)
+    2. verify: the rows read back from the file must equal the rows
+       written and the day's count_documents()
+    3. delete the day in --delete-batch sized delete_many calls on _id,
+       sleeping --pause between them so no single delete holds the
+       collection for long
+
+Past days are frozen (every writer stamps new Date()), so a verified day
+can be deleted by range. Progress goes to a JSON checkpoint after every
+step; an interrupted run picks up where it stopped (rewriting a day that
+was not verified, finishing the deletes of one that was).
+
+Usage (from the repository root):
+    python -m tests.log_archive --older-than-days 90 --out archive/ --dry-run
+    python -m tests.log_archive --older-than-days 90 --out archive/
+    python -m tests.log_archive --collections email_logs --format parquet --out archive/
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import json_util
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from tests.db import get_db
+
+# Collection -> the field route.js stamps with new Date()
+TIME_FIELDS = {
+    'audit_logs': 'createdAt',
+    'email_logs': 'createdAt',
+    'payment_security_logs': 'timestamp',
+}
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_DELETE_BATCH = 1000
+CHECKPOINT_NAME = 'checkpoint.json'
+
+
+def day_start(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class Checkpoint:
+    """Per-collection progress, rewritten atomically after every step"""
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def get(self, collection):
+        return self.state.setdefault(collection, {'doneThrough': None, 'day': None, 'stage': None})
+
+    def update(self, collection, **fields):
+        self.get(collection).update(fields)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class DayWriter:
+    """Writes one day of one collection to a .part file, renamed on close"""
+
+    def __init__(self, path, fmt, time_field):
+        self.path = path
+        self.part = f"{path}.part"
+        self.fmt = fmt
+        self.time_field = time_field
+        self.rows = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if fmt == 'parquet':
+            self.schema = pa.schema([('_id', pa.string()), ('time', pa.timestamp('ms', tz='UTC')),
+                                     ('document', pa.string())])
+            self.writer = pq.ParquetWriter(self.part, self.schema, compression='zstd')
+        else:
+            self.file = gzip.open(self.part, 'wt', encoding='utf-8')
+
+    def write(self, docs):
+        if self.fmt == 'parquet':
+            self.writer.write_table(pa.Table.from_pydict({
+                '_id': [str(doc['_id']) for doc in docs],
+                'time': [doc.get(self.time_field) for doc in docs],
+                'document': [json_util.dumps(doc) for doc in docs],
+            }, schema=self.schema))
+        else:
+            for doc in docs:
+                self.file.write(json_util.dumps(doc))
+                self.file.write('\n')
+        self.rows += len(docs)
+
+    def close(self):
+        if self.fmt == 'parquet':
+            self.writer.close()
+        else:
+            self.file.close()
+        os.replace(self.part, self.path)
+
+
+def count_file_rows(path):
+    if path.endswith('.parquet'):
+        return pq.ParquetFile(path).metadata.num_rows
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return sum(1 for line in f if line.strip())
+
+
+class Archiver:
+    def __init__(self, db, args):
+        self.db = db
+        self.args = args
+        self.checkpoint = Checkpoint(os.path.join(args.out, CHECKPOINT_NAME))
+        self.cutoff = day_start(datetime.now(timezone.utc) - timedelta(days=args.older_than_days))
+        self.stats = {}
+
+    def day_path(self, collection, day):
+        ext = 'parquet' if self.args.format == 'parquet' else 'jsonl.gz'
+        return os.path.join(self.args.out, collection, f"{day:%Y}", f"{day:%m}",
+                            f"{collection}-{day:%Y-%m-%d}.{ext}")
+
+    def next_day(self, collection, field, floor=None):
+        """Oldest archivable day still in Mongo, at or after `floor`"""
+        query = {field: {'$lt': self.cutoff, **({'$gte': floor} if floor else {})}}
+        oldest = self.db[collection].find_one(query, {field: 1}, sort=[(field, 1)])
+        return day_start(oldest[field]) if oldest else None
+
+    def export_day(self, collection, field, day, query):
+        path = self.day_path(collection, day)
+        writer = DayWriter(path, self.args.format, field)
+        cursor = self.db[collection].find(query, sort=[(field, 1), ('_id', 1)],
+                                          batch_size=self.args.batch_size)
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= self.args.batch_size:
+                writer.write(batch)
+                batch = []
+        if batch:
+            writer.write(batch)
+        writer.close()
+        return path, writer.rows
+
+    def delete_day(self, collection, query, stats):
+        """delete_many in bounded _id batches; returns rows deleted"""
+        deleted = 0
+        while True:
+            ids = [doc['_id'] for doc in self.db[collection].find(query, {'_id': 1}).limit(self.args.delete_batch)]
+            if not ids:
+                return deleted
+            started = time.perf_counter()
+            deleted += self.db[collection].delete_many({'_id': {'$in': ids}}).deleted_count
+            stats['maxDeleteMs'] = max(stats['maxDeleteMs'], (time.perf_counter() - started) * 1000)
+            if self.args.pause:
+                time.sleep(self.args.pause)
+
+    def archive(self, collection):
+        field = TIME_FIELDS[collection]
+        stats = self.stats[collection] = {'days': 0, 'rows': 0, 'bytes': 0, 'deleted': 0, 'maxDeleteMs': 0.0}
+        state = self.checkpoint.get(collection)
+        days_left = self.args.max_days or float('inf')
+
+        # Days that stay in Mongo (--dry-run, --no-delete) are skipped by moving the floor
+        floor = None
+        while days_left > 0:
+            if state['stage'] in ('written', 'verified') and state['day']:
+                day = datetime.fromisoformat(state['day'])
+            else:
+                day = self.next_day(collection, field, floor)
+                if day is None:
+                    break
+            query = {field: {'$gte': day, '$lt': day + timedelta(days=1)}}
+            floor = day + timedelta(days=1)
+            days_left -= 1
+            stats['days'] += 1
+
+            if self.args.dry_run:
+                rows = self.db[collection].count_documents(query)
+                stats['rows'] += rows
+                print(f"   {collection} {day:%Y-%m-%d}: {rows:,} rows would be archived")
+                state = {'stage': None}
+                continue
+
+            if state['stage'] != 'verified':
+                # Never verified: (re)write the whole day
+                path, rows = self.export_day(collection, field, day, query)
+                self.checkpoint.update(collection, day=day.isoformat(), stage='written', file=path, rows=rows)
+                in_db = self.db[collection].count_documents(query)
+                in_file = count_file_rows(path)
+                if not rows == in_file == in_db:
+                    print(f"❌ {collection} {day:%Y-%m-%d}: wrote {rows}, file has {in_file}, Mongo has {in_db}; "
+                          f"stopping (file kept at {path})")
+                    stats['failed'] = True
+                    return
+                self.checkpoint.update(collection, stage='verified')
+                stats['rows'] += rows
+                stats['bytes'] += os.path.getsize(path)
+                print(f"📦 {collection} {day:%Y-%m-%d}: {rows:,} rows -> {path} "
+                      f"({os.path.getsize(path) / 2**20:.1f}MB)")
+            else:
+                print(f"↪️  {collection} {day:%Y-%m-%d}: verified earlier, finishing deletes")
+
+            if self.args.no_delete:
+                self.checkpoint.update(collection, day=None, stage=None)
+            else:
+                stats['deleted'] += self.delete_day(collection, query, stats)
+                self.checkpoint.update(collection, doneThrough=day.isoformat(), day=None, stage=None)
+            state = self.checkpoint.get(collection)
+
+
+def print_report(archiver, elapsed):
+    print("\n" + "=" * 80)
+    print(f"LOG ARCHIVE {'(dry run) ' if archiver.args.dry_run else ''}- days before {archiver.cutoff:%Y-%m-%d}")
+    print("=" * 80)
+    for collection, s in archiver.stats.items():
+        icon = "❌" if s.get('failed') else "✅"
+        print(f"{icon} {collection:<24} {s['days']:>5} days  {s['rows']:>12,} rows  "
+              f"{s['bytes'] / 2**20:>9.1f}MB  deleted {s['deleted']:,} "
+              f"(slowest delete batch {s['maxDeleteMs']:.0f}ms)")
+    print(f"\n⏱️  {elapsed:.1f}s; checkpoint {archiver.checkpoint.path}")
+    print("=" * 80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old log documents to day-partitioned files")
+    parser.add_argument('--collections', default=','.join(TIME_FIELDS), help="comma-separated subset")
+    parser.add_argument('--older-than-days', type=int, default=90)
+    parser.add_argument('--out', default='archive', help="archive directory (holds the checkpoint too)")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="cursor/write batch")
+    parser.add_argument('--delete-batch', type=int, default=DEFAULT_DELETE_BATCH, help="documents per delete_many")
+    parser.add_argument('--pause', type=float, default=0.05, help="seconds between delete batches")
+    parser.add_argument('--max-days', type=int, default=0, help="stop after this many days per collection")
+    parser.add_argument('--no-delete', action='store_true', help="export and verify, keep the data")
+    parser.add_argument('--dry-run', action='store_true', help="only count what would be archived")
+    parser.add_argument('--db', default=None, help="database name (default DB_NAME)")
+    args = parser.parse_args(argv)
+
+    if args.format == 'parquet' and pa is None:
+        parser.error("--format parquet needs pyarrow")
+    collections = [c.strip() for c in args.collections.split(',') if c.strip()]
+    unknown = [c for c in collections if c not in TIME_FIELDS]
+    if unknown:
+        parser.error(f"unknown collections: {', '.join(unknown)}")
+
+    os.makedirs(args.out, exist_ok=True)
+    archiver = Archiver(get_db(args.db), args)
+    started = time.perf_counter()
+    try:
+        for collection in collections:
+            archiver.archive(collection)
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrupted - rerun to resume from the checkpoint")
+    print_report(archiver, time.perf_counter() - started)
+    return 1 if any(s.get('failed') for s in archiver.stats.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
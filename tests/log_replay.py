@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Replay a production access log against a local Next.js + Mongo instance
+
+Reads an access log of /api requests - nginx/Apache combined format or
+JSON lines with method, path, status, timestamp and client IP fields -
+and replays it open-loop at --speed 1, 10 or 100 times the original pace,
+keeping the recorded inter-arrival gaps. Access logs carry no bodies or
+tokens, so each line is rebuilt on the fly:
+
+    auth      /api/admin/* uses one admin token from /api/admin/login;
+              /api/account/*, /api/support/* and POST /api/orders use a
+              buyer registered per original client IP (before the clock
+              starts), sent with that IP's synthetic X-Forwarded-For
+    ids       order and ticket ids in paths map to ones created during
+              the replay (POST /api/orders, POST /api/support/tickets),
+              first the same buyer's, then any; product ids map onto the
+              local catalogue
+    bodies    login, register, order, ticket, message and Shopier callback
+              bodies are synthesized; lines that failed in the log
+              (4xx) are sent with invalid bodies so the failure path is
+              replayed too. Callbacks pay the oldest unpaid replayed order
+              (bad signature when the original was a 403)
+
+Settings writes and uploads are skipped. The report compares each route's
+status class with the original and gives its latency twice: service time
+(request sent -> response) and time from when the line was due on the
+compressed clock, which also includes waiting for a --concurrency slot. It
+also shows how late requests were actually sent (a lagging client means
+the numbers are the client's, not the server's).
+
+Usage (from the repository root, app on NEXT_PUBLIC_BASE_URL):
+    python -m tests.log_replay access.log --speed 10
+    python -m tests.log_replay access.jsonl --speed 100 --limit 50000 --window 3600
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+import httpx
+
+from callback_test import ADMIN_PASSWORD, ADMIN_USERNAME, TEST_SHOPIER_API_SECRET, generate_shopier_hash
+from tests.callback_load import fake_ip
+from tests.http_client import create_async_client
+from tests.latency import summarize, format_summary
+
+BASE_URL = os.getenv('NEXT_PUBLIC_BASE_URL', 'http://localhost:3000')
+API_BASE = f"{BASE_URL}/api"
+
+COMBINED_LOG = re.compile(
+    r'^(?P<ip>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3})')
+JSON_FIELDS = {
+    'method': ('method', 'request_method', 'verb'),
+    'path': ('path', 'url', 'request_uri', 'uri'),
+    'status': ('status', 'status_code', 'statusCode'),
+    'time': ('timestamp', 'time', 'ts', '@timestamp'),
+    'ip': ('ip', 'client_ip', 'clientIp', 'remote_addr'),
+}
+
+# Path id segments rewritten to replay-created ids: (pattern, kind)
+ID_PATTERNS = [
+    (re.compile(r'^/api/account/orders/(?!recent$)([^/]+)$'), 'order'),
+    (re.compile(r'^/api/admin/orders/([^/]+)(?:/approve|/refund)?$'), 'order'),
+    (re.compile(r'^/api/support/tickets/([^/]+)(?:/messages)?$'), 'ticket'),
+    (re.compile(r'^/api/admin/support/tickets/([^/]+)(?:/messages|/close)?$'), 'ticket'),
+    (re.compile(r'^/api/admin/products/([^/]+)(?:/stock)?$'), 'product'),
+]
+# Mutating routes not replayed: they would overwrite the local configuration
+SKIPPED_WRITES = re.compile(r'^/api/admin/(settings|email/settings|email/test|upload|create-admin-user|'
+                            r'footer-settings|legal-pages|content|products)')
+TICKET_CATEGORIES = ['odeme', 'teslimat', 'hesap', 'diger']
+BUYER_PASSWORD = "replay12345"
+
+
+class LogEntry:
+    __slots__ = ('at', 'method', 'path', 'status', 'ip')
+
+    def __init__(self, at, method, path, status, ip):
+        self.at = at
+        self.method = method
+        self.path = path
+        self.status = status
+        self.ip = ip
+
+
+def _parse_time(value):
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)
+    try:
+        return datetime.strptime(value, '%d/%b/%Y:%H:%M:%S %z').timestamp()
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def _field(record, name):
+    for key in JSON_FIELDS[name]:
+        if record.get(key) is not None:
+            return record[key]
+    return None
+
+
+def parse_line(line):
+    """LogEntry for one /api request line, or None"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        if line.startswith('{'):
+            record = json.loads(line)
+            method, path = _field(record, 'method'), _field(record, 'path')
+            entry = LogEntry(_parse_time(_field(record, 'time')), str(method).upper(), path,
+                             int(_field(record, 'status') or 0), _field(record, 'ip') or '0.0.0.0')
+        else:
+            match = COMBINED_LOG.match(line)
+            if not match:
+                return None
+            entry = LogEntry(_parse_time(match['time']), match['method'], match['path'],
+                             int(match['status']), match['ip'])
+    except (ValueError, TypeError):
+        return None
+    if not entry.path or not entry.path.startswith('/api'):
+        return None
+    return entry
+
+
+def read_log(path, limit=0, window=0):
+    opener = gzip.open if path.endswith('.gz') else open
+    entries, bad = [], 0
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            entry = parse_line(line)
+            if entry is None:
+                bad += 1
+                continue
+            entries.append(entry)
+    entries.sort(key=lambda e: e.at)
+    if window and entries:
+        entries = [e for e in entries if e.at - entries[0].at <= window]
+    if limit:
+        entries = entries[:limit]
+    return entries, bad
+
+
+def route_of(path):
+    """Path template for reporting: ids collapsed to {id}"""
+    bare = path.split('?', 1)[0]
+    for pattern, kind in ID_PATTERNS:
+        match = pattern.match(bare)
+        if match:
+            return bare[:match.start(1)] + '{' + kind + '}' + bare[match.end(1):]
+    return bare
+
+
+def needs_user(method, path):
+    return path.startswith(('/api/account', '/api/support')) or (method == 'POST' and path == '/api/orders')
+
+
+class Buyer:
+    __slots__ = ('email', 'token', 'ip', 'orders', 'tickets')
+
+    def __init__(self, email, token, ip):
+        self.email = email
+        self.token = token
+        self.ip = ip
+        self.orders = []
+        self.tickets = []
+
+
+class World:
+    """Everything the rewritten requests refer to"""
+
+    def __init__(self, client, rng):
+        self.client = client
+        self.rng = rng
+        self.admin_token = None
+        self.products = []
+        self.ips = {}
+        self.buyers = {}
+        self.unpaid = deque()
+        self.ids = {'order': {}, 'ticket': {}, 'product': {}}
+        self.created = {'order': [], 'ticket': []}
+        self.setup_requests = 0
+
+    def ip_for(self, original):
+        if original not in self.ips:
+            self.ips[original] = fake_ip(len(self.ips) + 1)
+        return self.ips[original]
+
+    async def prepare(self):
+        response = await self.client.post(f"{API_BASE}/admin/login",
+                                          json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+        if response.status_code != 200:
+            raise RuntimeError(f"admin login failed: {response.status_code}")
+        self.admin_token = response.json()['data']['token']
+        response = await self.client.post(
+            f"{API_BASE}/admin/settings/payments",
+            json={"merchantId": "test_merchant_12345", "apiKey": "test_api_key_67890",
+                  "apiSecret": TEST_SHOPIER_API_SECRET, "mode": "production"},
+            headers={"Authorization": f"Bearer {self.admin_token}"})
+        if response.status_code != 200:
+            raise RuntimeError(f"configuring Shopier settings failed: {response.status_code}")
+        response = await self.client.get(f"{API_BASE}/products")
+        self.products = response.json().get('data', []) if response.status_code == 200 else []
+        if not self.products:
+            raise RuntimeError("no products on the local instance (python -m tests.seed)")
+
+    async def register(self, original_ip):
+        ip = self.ip_for(original_ip)
+        email = f"replay.{uuid.uuid4().hex[:12]}@example.com"
+        response = await self.client.post(f"{API_BASE}/auth/register", json={
+            "firstName": "Replay", "lastName": "Buyer", "email": email,
+            "phone": "5551234567", "password": BUYER_PASSWORD,
+        }, headers={"X-Forwarded-For": ip})
+        self.setup_requests += 1
+        if response.status_code != 200:
+            return None
+        return Buyer(email, response.json()['data']['token'], ip)
+
+    async def register_buyers(self, entries, concurrency):
+        """One buyer per original IP that logs in or makes authenticated user requests"""
+        ips = list(dict.fromkeys(e.ip for e in entries if needs_user(e.method, e.path.split('?')[0])
+                                 or (e.path == '/api/auth/login' and e.status == 200)))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(original_ip):
+            async with semaphore:
+                buyer = await self.register(original_ip)
+                if buyer:
+                    self.buyers[original_ip] = buyer
+
+        await asyncio.gather(*(one(ip) for ip in ips))
+        return len(ips)
+
+    async def order_for(self, buyer):
+        """Create an order for `buyer` outside the measured requests"""
+        response = await self.client.post(f"{API_BASE}/orders", json=self.order_body(),
+                                          headers={"Authorization": f"Bearer {buyer.token}",
+                                                   "X-Forwarded-For": buyer.ip})
+        self.setup_requests += 1
+        if response.status_code == 200:
+            return self.note_order(buyer, response.json()['data']['order'])
+        return None
+
+    def order_body(self):
+        player = self.rng.randrange(5_000_000_000, 5_999_999_999)
+        return {"productId": self.rng.choice(self.products)['id'], "playerId": str(player),
+                "playerName": f"Replay#{player % 10000:04d}"}
+
+    def note_order(self, buyer, order):
+        buyer.orders.append(order['id'])
+        self.created['order'].append(order['id'])
+        self.unpaid.append(order)
+        return order['id']
+
+    async def map_id(self, kind, original, buyer):
+        """Replay-side id for an id seen in the log"""
+        mapping = self.ids[kind]
+        if original in mapping:
+            return mapping[original]
+        if kind == 'product':
+            mapping[original] = self.products[len(mapping) % len(self.products)]['id']
+            return mapping[original]
+        used = set(mapping.values())
+        own = buyer.orders if (buyer and kind == 'order') else (buyer.tickets if buyer else [])
+        candidates = [i for i in own if i not in used] or [i for i in self.created[kind] if i not in used]
+        if candidates:
+            mapping[original] = candidates[0]
+        elif kind == 'order' and buyer:
+            mapping[original] = await self.order_for(buyer)
+        else:
+            mapping[original] = None
+        return mapping[original]
+
+
+class ReplayStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.due_latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.matched = defaultdict(int)
+        self.sent = defaultdict(int)
+        self.skipped = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.lags = []
+        self.wall = 0.0
+        self.setup_requests = 0
+
+
+async def build_request(world, entry):
+    """(method, url, kwargs) for a log line, or a skip reason string"""
+    path, _, query = entry.path.partition('?')
+    method = entry.method
+    failed = 400 <= entry.status < 500
+    if method not in ('GET', 'HEAD') and SKIPPED_WRITES.match(path):
+        return "settings write"
+
+    headers = {"X-Forwarded-For": world.ip_for(entry.ip)}
+    buyer = world.buyers.get(entry.ip)
+    if path.startswith('/api/admin') and path != '/api/admin/login':
+        headers["Authorization"] = f"Bearer {world.admin_token}"
+    elif needs_user(method, path):
+        if buyer is None:
+            return "no buyer"
+        if entry.status != 401:
+            headers["Authorization"] = f"Bearer {buyer.token}"
+
+    for pattern, kind in ID_PATTERNS:
+        match = pattern.match(path)
+        if match:
+            new_id = await world.map_id(kind, match.group(1), buyer)
+            if new_id is None:
+                return f"no {kind} to map"
+            path = path[:match.start(1)] + new_id + path[match.end(1):]
+            break
+
+    kwargs = {"headers": headers}
+    body = None
+    if method == 'POST':
+        if path == '/api/auth/login':
+            body = {"email": buyer.email if buyer else "nobody@example.com",
+                    "password": BUYER_PASSWORD if (buyer and not failed) else "wrong-password"}
+        elif path == '/api/auth/register':
+            body = {} if failed else {"firstName": "Replay", "lastName": "Visitor",
+                                      "email": f"replay.{uuid.uuid4().hex[:12]}@example.com",
+                                      "phone": "5551234567", "password": BUYER_PASSWORD}
+        elif path == '/api/admin/login':
+            body = {"username": ADMIN_USERNAME, "password": "wrong-password" if failed else ADMIN_PASSWORD}
+        elif path == '/api/orders':
+            body = {} if failed else world.order_body()
+        elif path == '/api/payments/shopier/callback':
+            if not world.unpaid:
+                return "no unpaid order"
+            order = world.unpaid.popleft()
+            signature = generate_shopier_hash(order['id'], order['amount'], TEST_SHOPIER_API_SECRET)
+            body = {"orderId": order['id'], "platform_order_id": order['id'], "status": "success",
+                    "transactionId": f"TXN_REPLAY_{uuid.uuid4().hex}", "random_nr": uuid.uuid4().hex[:16],
+                    "total_order_value": str(order['amount']),
+                    "hash": "0" * 64 if entry.status == 403 else signature}
+        elif path == '/api/support/tickets':
+            body = {} if failed else {"subject": "Replayed support request",
+                                      "category": world.rng.choice(TICKET_CATEGORIES),
+                                      "message": "Replayed from the production access log."}
+        elif path.endswith('/messages'):
+            body = {"message": "" if failed else "Replayed message"}
+        elif path.endswith('/refund'):
+            body = {"reason": "Replay"}
+        else:
+            body = {}
+    elif method in ('PUT', 'PATCH', 'DELETE'):
+        return "unsupported write"
+    if body is not None:
+        kwargs["json"] = body
+    url = f"{BASE_URL}{path}" + (f"?{query}" if query else "")
+    return method, url, kwargs
+
+
+async def replay_one(world, stats, semaphore, entry, route, due):
+    async with semaphore:
+        built = await build_request(world, entry)
+        if isinstance(built, str):
+            stats.skipped[built] += 1
+            return
+        method, url, kwargs = built
+        # Lag at the actual send, so time queued on --concurrency counts too
+        stats.lags.append(max(0.0, time.monotonic() - due))
+        started = time.perf_counter()
+        try:
+            response = await world.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            stats.errors[route] += 1
+            return
+        stats.latencies[route].append(time.perf_counter() - started)
+        stats.due_latencies[route].append(time.monotonic() - due)
+        stats.sent[route] += 1
+        stats.statuses[route][response.status_code] += 1
+        if response.status_code // 100 == entry.status // 100:
+            stats.matched[route] += 1
+        if response.status_code == 200:
+            await note_created(world, entry, url, response)
+
+
+async def note_created(world, entry, url, response):
+    """Remember ids the replay created so later lines can refer to them"""
+    path = httpx.URL(url).path
+    try:
+        data = response.json().get('data') or {}
+    except ValueError:
+        return
+    buyer = world.buyers.get(entry.ip)
+    if entry.method != 'POST' or not buyer:
+        return
+    if path == '/api/orders' and 'order' in data:
+        world.note_order(buyer, data['order'])
+    elif path == '/api/support/tickets' and data.get('id'):
+        buyer.tickets.append(data['id'])
+        world.created['ticket'].append(data['id'])
+
+
+async def replay(entries, args):
+    rng = random.Random(args.seed)
+    stats = ReplayStats()
+    async with create_async_client(timeout=args.timeout, retries=0, pool_size=args.concurrency) as client:
+        world = World(client, rng)
+        await world.prepare()
+        wanted = await world.register_buyers(entries, min(args.concurrency, 20))
+        print(f"👥 {len(world.buyers)}/{wanted} buyers registered, {len(world.products)} products")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        pending = set()
+        origin = entries[0].at
+        started = time.monotonic()
+        for entry in entries:
+            due = started + (entry.at - origin) / args.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(replay_one(world, stats, semaphore, entry, route_of(entry.path), due))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+        stats.wall = time.monotonic() - started
+        stats.setup_requests = world.setup_requests
+    return stats
+
+
+def print_report(entries, stats, args, top):
+    span = entries[-1].at - entries[0].at
+    print("\n" + "=" * 80)
+    print(f"ACCESS LOG REPLAY at {args.speed:g}x: {len(entries):,} lines over {span:,.0f}s "
+          f"-> {stats.wall:,.1f}s")
+    print("=" * 80)
+    original = defaultdict(int)
+    for entry in entries:
+        original[route_of(entry.path)] += 1
+    routes = sorted(original, key=original.get, reverse=True)[:top]
+    print(f"{'route':<46} {'log':>7} {'sent':>7} {'status ok':>9}")
+    for route in routes:
+        sent = stats.sent.get(route, 0)
+        match = f"{stats.matched[route] / sent:.0%}" if sent else "-"
+        print(f"{route[:46]:<46} {original[route]:>7} {sent:>7} {match:>9}")
+        if sent:
+            print("   " + format_summary("service", summarize(stats.latencies[route])))
+            print("   " + format_summary("from due", summarize(stats.due_latencies[route])))
+            codes = ", ".join(f"{code}={n}" for code, n in sorted(stats.statuses[route].items()))
+            print(f"      statuses: {codes}")
+    lag = summarize(stats.lags)
+    print(f"\nSend lag behind the {args.speed:g}x clock: p50 {lag['p50']:.1f}ms, p99 {lag['p99']:.1f}ms, "
+          f"max {lag['max']:.1f}ms")
+    if lag['p99'] > 100:
+        print("⚠️  The replayer fell behind; raise --concurrency or lower --speed")
+    if stats.skipped:
+        print("Skipped: " + ", ".join(f"{reason}={n}" for reason, n in sorted(stats.skipped.items())))
+    if stats.errors:
+        print("Client errors: " + ", ".join(f"{route}={n}" for route, n in sorted(stats.errors.items())))
+    print(f"Setup requests outside the timeline: {stats.setup_requests}")
+    print("=" * 80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay an access log against a local instance")
+    parser.add_argument('log', help="combined-format or JSON-lines access log (.gz ok)")
+    parser.add_argument('--speed', type=float, default=1.0, help="time compression (1, 10, 100...)")
+    parser.add_argument('--limit', type=int, default=0, help="replay only the first N lines")
+    parser.add_argument('--window', type=float, default=0, help="replay only the first N seconds of the log")
+    parser.add_argument('--concurrency', type=int, default=500, help="max requests in flight")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--top', type=int, default=25, help="routes shown in the report")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    entries, bad = read_log(args.log, args.limit, args.window)
+    if not entries:
+        print(f"❌ No /api lines found in {args.log}")
+        return 1
+    print(f"📜 {len(entries):,} /api lines ({bad:,} other lines ignored); replaying against {BASE_URL} "
+          f"at {args.speed:g}x")
+    try:
+        stats = asyncio.run(replay(entries, args))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    print_report(entries, stats, args, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
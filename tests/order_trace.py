@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Order lifecycle tracer
+
+Follows every order through the timestamps route.js leaves behind:
+
+    created          orders.createdAt (status pending)
+    order email      email_logs type order_created
+    paid             payments.createdAt with status paid (callback)
+    stock assigned   stock.assignedAt for the order (FIFO findOneAndUpdate)
+    delivered email  email_logs type delivered
+    audit            first audit_logs row for the order (risk flag,
+                     manual approve/refund)
+
+plus the number of payment_security_logs (hash mismatches) per order, and
+reports a latency histogram for each stage transition and the orders stuck
+between stages for longer than --stuck-after:
+
+    paid, no stock            paid but no code assigned (out of stock or
+                              assignment error), not on risk hold
+    held for review           delivery.status hold (risk FLAGGED)
+    stock, no delivered email code assigned but no delivered email_logs
+                              row (only checked while email is enabled)
+
+Batch mode walks the orders collection in --batch-size chunks and joins
+the other collections with $in lookups. --live follows a change stream
+instead (the local mongod must run as a replica set, e.g.
+`mongod --replSet rs0` + `rs.initiate()`), printing each stage as it lands.
+
+Usage (from the repository root):
+    python -m tests.order_trace --since 2024-01-01
+    python -m tests.order_trace --stuck-after 600 --show 20
+    python -m tests.order_trace --live
+"""
+
+import argparse
+import math
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import OperationFailure
+
+from tests.db import get_db
+from tests.latency import summarize, format_summary
+
+DEFAULT_BATCH_SIZE = 2000
+STAGES = ("created", "order_email", "paid", "stock_assigned", "delivered_email", "audit")
+TRANSITIONS = [
+    ("created", "order_email"),
+    ("created", "paid"),
+    ("paid", "stock_assigned"),
+    ("stock_assigned", "delivered_email"),
+    ("paid", "audit"),
+    ("created", "delivered_email"),
+]
+EMAIL_STAGES = {"order_created": "order_email", "delivered": "delivered_email"}
+# Histogram bucket upper bounds in seconds
+BUCKETS = [0.01, 0.1, 1, 10, 60, 600, 3600, 86400]
+
+
+def _utc(value):
+    """pymongo returns naive UTC datetimes"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return None
+
+
+class OrderTrace:
+    __slots__ = ('order_id', 'status', 'delivery_status', 'risk_status', 'times', 'email_failed', 'security_events')
+
+    def __init__(self, order_id):
+        self.order_id = order_id
+        self.status = None
+        self.delivery_status = None
+        self.risk_status = None
+        self.times = {}
+        self.email_failed = set()
+        self.security_events = 0
+
+    def mark(self, stage, when):
+        when = _utc(when)
+        if when and (stage not in self.times or when < self.times[stage]):
+            self.times[stage] = when
+
+    def apply_order(self, order):
+        self.status = order.get('status')
+        self.delivery_status = (order.get('delivery') or {}).get('status')
+        self.risk_status = (order.get('risk') or {}).get('status')
+        self.mark('created', order.get('createdAt'))
+
+    def apply_email(self, log):
+        stage = EMAIL_STAGES.get(log.get('type'))
+        if not stage:
+            return
+        if log.get('status') == 'failed':
+            self.email_failed.add(stage)
+        self.mark(stage, log.get('createdAt'))
+
+    def stuck_reason(self, now, stuck_after, email_enabled):
+        paid = self.times.get('paid')
+        if not paid or now - paid < stuck_after:
+            return None
+        if self.delivery_status == 'hold':
+            return 'held for review'
+        if 'stock_assigned' not in self.times:
+            return f"paid, no stock ({self.delivery_status or 'no delivery'})"
+        if email_enabled and 'delivered_email' not in self.times:
+            return 'stock, no delivered email'
+        if 'delivered_email' in self.email_failed:
+            return 'delivered email failed'
+        return None
+
+
+ORDER_PROJECTION = {'_id': 0, 'id': 1, 'status': 1, 'createdAt': 1, 'delivery.status': 1, 'risk.status': 1}
+
+
+def join_batch(db, orders):
+    """OrderTrace per order with the other collections' timestamps attached"""
+    traces = {}
+    for order in orders:
+        trace = traces[order['id']] = OrderTrace(order['id'])
+        trace.apply_order(order)
+    ids = list(traces)
+
+    for payment in db.payments.find({'orderId': {'$in': ids}, 'status': 'paid'},
+                                    {'_id': 0, 'orderId': 1, 'createdAt': 1}):
+        traces[payment['orderId']].mark('paid', payment.get('createdAt'))
+    for stock in db.stock.find({'orderId': {'$in': ids}}, {'_id': 0, 'orderId': 1, 'assignedAt': 1}):
+        traces[stock['orderId']].mark('stock_assigned', stock.get('assignedAt'))
+    for log in db.email_logs.find({'orderId': {'$in': ids}, 'type': {'$in': list(EMAIL_STAGES)}},
+                                  {'_id': 0, 'orderId': 1, 'type': 1, 'status': 1, 'createdAt': 1}):
+        traces[log['orderId']].apply_email(log)
+    for log in db.audit_logs.find({'entityType': 'order', 'entityId': {'$in': ids}},
+                                  {'_id': 0, 'entityId': 1, 'createdAt': 1}):
+        traces[log['entityId']].mark('audit', log.get('createdAt'))
+    for row in db.payment_security_logs.aggregate([
+        {'$match': {'orderId': {'$in': ids}}},
+        {'$group': {'_id': '$orderId', 'count': {'$sum': 1}}},
+    ]):
+        traces[row['_id']].security_events = row['count']
+    return traces.values()
+
+
+class Report:
+    def __init__(self, stuck_after, email_enabled, show):
+        self.stuck_after = stuck_after
+        self.email_enabled = email_enabled
+        self.show = show
+        self.orders = 0
+        self.statuses = Counter()
+        self.durations = defaultdict(list)
+        self.stuck = Counter()
+        self.stuck_examples = defaultdict(list)
+        self.unpaid_old = 0
+        self.with_security_events = 0
+
+    def add(self, trace, now):
+        self.orders += 1
+        self.statuses[trace.status] += 1
+        for start, end in TRANSITIONS:
+            if start in trace.times and end in trace.times:
+                self.durations[(start, end)].append(
+                    max(0.0, (trace.times[end] - trace.times[start]).total_seconds()))
+        if trace.security_events:
+            self.with_security_events += 1
+        reason = trace.stuck_reason(now, self.stuck_after, self.email_enabled)
+        if reason:
+            self.stuck[reason] += 1
+            if len(self.stuck_examples[reason]) < self.show:
+                self.stuck_examples[reason].append(trace)
+        elif trace.status == 'pending' and 'created' in trace.times and now - trace.times['created'] > self.stuck_after:
+            self.unpaid_old += 1
+
+
+def histogram(values):
+    """Counts per BUCKETS bound, one text line per non-empty bucket"""
+    counts = Counter()
+    for value in values:
+        index = next((i for i, bound in enumerate(BUCKETS) if value <= bound), len(BUCKETS))
+        counts[index] += 1
+    lines = []
+    peak = max(counts.values()) if counts else 1
+    for index in sorted(counts):
+        label = f"<= {_fmt_seconds(BUCKETS[index])}" if index < len(BUCKETS) else f"> {_fmt_seconds(BUCKETS[-1])}"
+        bar = "█" * max(1, math.ceil(counts[index] / peak * 40))
+        lines.append(f"      {label:>9} {counts[index]:>8}  {bar}")
+    return lines
+
+
+def _fmt_seconds(seconds):
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    if seconds < 86400:
+        return f"{seconds / 3600:.0f}h"
+    return f"{seconds / 86400:.0f}d"
+
+
+def print_report(report, elapsed=None):
+    print("\n" + "=" * 80)
+    print("ORDER LIFECYCLE")
+    print("=" * 80)
+    print(f"Orders: {report.orders}  " + "  ".join(f"{k}={v}" for k, v in sorted(report.statuses.items(), key=str)))
+    for start, end in TRANSITIONS:
+        values = report.durations.get((start, end), [])
+        if not values:
+            continue
+        print(format_summary(f"{start} -> {end}", summarize(values)))
+        for line in histogram(values):
+            print(line)
+
+    print(f"\nStuck for more than {_fmt_seconds(report.stuck_after.total_seconds())}:")
+    if not report.stuck:
+        print("   ✅ none")
+    for reason, count in report.stuck.most_common():
+        print(f"   ⚠️  {reason:<32} {count}")
+        for trace in report.stuck_examples[reason]:
+            stages = ", ".join(f"{s}={trace.times[s]:%Y-%m-%d %H:%M:%S}" for s in STAGES if s in trace.times)
+            print(f"        {trace.order_id}  {stages}")
+    if not report.email_enabled:
+        print("   (email disabled in email_settings: missing delivered emails not counted)")
+    print(f"Unpaid orders older than that (abandoned checkouts): {report.unpaid_old}")
+    print(f"Orders with payment_security_logs: {report.with_security_events}")
+    if elapsed:
+        print(f"\n⏱️  {report.orders / elapsed:,.0f} orders/s traced")
+    print("=" * 80)
+
+
+def email_enabled(db):
+    settings = db.email_settings.find_one({'id': 'main'}, {'enableEmail': 1})
+    return bool(settings and settings.get('enableEmail'))
+
+
+def trace_batch(db, args):
+    query = {}
+    if args.since or args.until:
+        query['createdAt'] = {}
+        if args.since:
+            query['createdAt']['$gte'] = args.since
+        if args.until:
+            query['createdAt']['$lt'] = args.until
+    report = Report(timedelta(seconds=args.stuck_after), email_enabled(db), args.show)
+    now = datetime.now(timezone.utc)
+    cursor = db.orders.find(query, ORDER_PROJECTION, batch_size=args.batch_size)
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+
+    batch = []
+    for order in cursor:
+        batch.append(order)
+        if len(batch) >= args.batch_size:
+            for trace in join_batch(db, batch):
+                report.add(trace, now)
+            batch.clear()
+    if batch:
+        for trace in join_batch(db, batch):
+            report.add(trace, now)
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Live mode
+# ---------------------------------------------------------------------------
+
+WATCHED = ['orders', 'payments', 'stock', 'email_logs', 'audit_logs', 'payment_security_logs']
+
+
+def live_event(change):
+    """-> (order_id, stage or 'security' or None, when, full document) for a change event"""
+    coll = change['ns']['coll']
+    doc = change.get('fullDocument') or {}
+    if coll == 'orders':
+        return doc.get('id'), 'created' if change['operationType'] == 'insert' else None, doc.get('createdAt'), doc
+    if coll == 'payments' and doc.get('status') == 'paid':
+        return doc.get('orderId'), 'paid', doc.get('createdAt'), doc
+    if coll == 'stock' and doc.get('status') == 'assigned' and doc.get('orderId'):
+        return doc['orderId'], 'stock_assigned', doc.get('assignedAt'), doc
+    if coll == 'email_logs' and doc.get('orderId'):
+        return doc['orderId'], EMAIL_STAGES.get(doc.get('type')), doc.get('createdAt'), doc
+    if coll == 'audit_logs' and doc.get('entityType') == 'order':
+        return doc.get('entityId'), 'audit', doc.get('createdAt'), doc
+    if coll == 'payment_security_logs':
+        return doc.get('orderId'), 'security', doc.get('timestamp'), doc
+    return None, None, None, doc
+
+
+def trace_live(db, args):
+    pipeline = [{'$match': {'ns.coll': {'$in': WATCHED}, 'operationType': {'$in': ['insert', 'update', 'replace']}}}]
+    traces = {}
+    report_every = args.report_interval
+    last_report = time.monotonic()
+    print(f"👀 Watching {', '.join(WATCHED)} (Ctrl+C to stop)")
+    try:
+        with db.watch(pipeline, full_document='updateLookup') as stream:
+            while stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    if time.monotonic() - last_report >= report_every:
+                        report = Report(timedelta(seconds=args.stuck_after), email_enabled(db), args.show)
+                        now = datetime.now(timezone.utc)
+                        for trace in traces.values():
+                            report.add(trace, now)
+                        print_report(report)
+                        last_report = time.monotonic()
+                    time.sleep(0.1)
+                    continue
+                order_id, stage, when, doc = live_event(change)
+                if not order_id:
+                    continue
+                trace = traces.get(order_id) or traces.setdefault(order_id, OrderTrace(order_id))
+                new_stage = stage not in trace.times
+                if change['ns']['coll'] == 'orders':
+                    trace.apply_order(doc)
+                if stage == 'security':
+                    trace.security_events += 1
+                    print(f"🔐 {order_id[:8]} payment_security_log {doc.get('event')}")
+                elif stage and new_stage:
+                    trace.mark(stage, when or datetime.now(timezone.utc))
+                    created = trace.times.get('created')
+                    offset = f"+{(trace.times[stage] - created).total_seconds():.3f}s" if created else ""
+                    print(f"📦 {order_id[:8]} {stage:<16} {offset}")
+    except OperationFailure as e:
+        print(f"❌ Change stream not available ({e}); start mongod as a replica set")
+        return None
+    except KeyboardInterrupt:
+        pass
+    report = Report(timedelta(seconds=args.stuck_after), email_enabled(db), args.show)
+    now = datetime.now(timezone.utc)
+    for trace in traces.values():
+        report.add(trace, now)
+    return report
+
+
+def _date(value):
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trace orders through payment, stock, email and audit")
+    parser.add_argument('--since', type=_date, default=None, help="orders created at/after (ISO date, UTC)")
+    parser.add_argument('--until', type=_date, default=None, help="orders created before (ISO date, UTC)")
+    parser.add_argument('--limit', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--stuck-after', type=float, default=900.0, help="seconds before an order counts as stuck")
+    parser.add_argument('--show', type=int, default=5, help="example order ids per stuck reason")
+    parser.add_argument('--live', action='store_true', help="follow a change stream instead of history")
+    parser.add_argument('--report-interval', type=float, default=60.0, help="live mode report period, seconds")
+    parser.add_argument('--db', default=None, help="database name (default DB_NAME)")
+    args = parser.parse_args(argv)
+
+    db = get_db(args.db)
+    started = time.perf_counter()
+    if args.live:
+        report = trace_live(db, args)
+        if report is None:
+            return 1
+        print_report(report)
+    else:
+        report = trace_batch(db, args)
+        print_report(report, time.perf_counter() - started)
+    return 1 if report.stuck else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
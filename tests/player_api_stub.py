@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the id-game-checker RapidAPI upstream
+
+Serves GET /pubgm-global/{playerId} in the same JSON shape route.js
+expects ({"error": false, "msg": "id_found", "data": {"username", "is_ban"}})
+with a configurable latency distribution, 5xx error rate, hang rate
+(requests that outlive route.js's 10 s AbortSignal), not-found and banned
+rates, and a global requests-per-second quota answered with 429.
+Point the app at it with
+
+    RAPIDAPI_BASE_URL=http://127.0.0.1:8765 RAPIDAPI_KEY=stub yarn dev
+
+GET /__stats returns the counters as JSON. tests/resolve_load.py runs the
+stub in-process instead so it can match upstream calls to app requests.
+
+Usage (from the repository root):
+    python -m tests.player_api_stub --latency lognormal --median-ms 400 --error-rate 0.02
+    python -m tests.player_api_stub --latency fixed --median-ms 50 --quota 5
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal', 'pareto')
+HANG_SECONDS = 15  # longer than route.js's 10 s timeout
+
+USERNAMES = ['Ghost', 'Sniper', 'Viper', 'Falcon', 'Reaper', 'Shadow', 'Titan', 'Nova', 'Blaze', 'Wolf']
+
+
+class StubConfig:
+    def __init__(self, latency='lognormal', median_ms=300.0, spread=0.5, error_rate=0.0,
+                 hang_rate=0.0, not_found_rate=0.0, ban_rate=0.0, quota=0.0, seed=None):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self.latency = latency
+        self.median_ms = median_ms
+        self.spread = spread
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.not_found_rate = not_found_rate
+        self.ban_rate = ban_rate
+        self.quota = quota
+        self.seed = seed
+
+
+class UpstreamCall:
+    __slots__ = ('player_id', 'started', 'delay', 'status')
+
+    def __init__(self, player_id, started, delay, status):
+        self.player_id = player_id
+        self.started = started
+        self.delay = delay
+        self.status = status
+
+
+class PlayerApiStub:
+    """asyncio HTTP/1.1 server imitating id-game-checker"""
+
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.calls = []
+        self.status_counts = Counter()
+        self.server = None
+        # Token bucket for the per-second quota
+        self.tokens = config.quota
+        self.refilled = time.monotonic()
+
+    def sample_delay(self):
+        c = self.config
+        median = c.median_ms / 1000
+        if c.latency == 'fixed':
+            return median
+        if c.latency == 'uniform':
+            return max(0.0, self.rng.uniform(median * (1 - c.spread), median * (1 + c.spread)))
+        if c.latency == 'lognormal':
+            return self.rng.lognormvariate(math.log(median), c.spread)
+        # pareto: heavy tail with the given median; spread is the shape's inverse
+        alpha = 1 / max(c.spread, 0.05)
+        scale = median / 2 ** (1 / alpha)
+        return scale * self.rng.paretovariate(alpha)
+
+    def take_token(self):
+        if not self.config.quota:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.config.quota, self.tokens + (now - self.refilled) * self.config.quota)
+        self.refilled = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def player_body(self, player_id):
+        # Same id -> same answer, so repeated lookups are cacheable
+        digest = int(hashlib.sha256(player_id.encode()).hexdigest()[:8], 16)
+        fraction = digest / 0xFFFFFFFF
+        if fraction < self.config.not_found_rate:
+            return {"error": True, "msg": "id_not_found"}
+        banned = fraction < self.config.not_found_rate + self.config.ban_rate
+        name = f"{USERNAMES[digest % len(USERNAMES)]}{digest % 10000:04d}"
+        return {"error": False, "msg": "id_found", "data": {"username": name, "is_ban": 1 if banned else 0}}
+
+    async def respond(self, path):
+        """-> (status, body dict, extra headers)"""
+        if path == '/__stats':
+            return 200, self.stats(), {}
+        if not path.startswith('/pubgm-global/'):
+            return 404, {"message": "Endpoint does not exist"}, {}
+
+        player_id = path.rsplit('/', 1)[1]
+        started = time.perf_counter()
+        if not self.take_token():
+            delay, status, body, headers = 0.0, 429, {"message": "Too many requests"}, {"Retry-After": "1"}
+        else:
+            roll = self.rng.random()
+            if roll < self.config.hang_rate:
+                delay, status, body, headers = HANG_SECONDS, 504, {"message": "Upstream timeout"}, {}
+            elif roll < self.config.hang_rate + self.config.error_rate:
+                delay, status, body, headers = self.sample_delay(), 500, {"message": "Internal error"}, {}
+            else:
+                delay, status, body, headers = self.sample_delay(), 200, self.player_body(player_id), {}
+        # Logged before sleeping so hung calls are counted even if the client gives up
+        self.calls.append(UpstreamCall(player_id, started, delay, status))
+        self.status_counts[status] += 1
+        await asyncio.sleep(delay)
+        return status, body, headers
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0) or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                parts = request_line.decode('latin-1').split()
+                path = parts[1].split('?', 1)[0] if len(parts) > 1 else '/'
+                status, body, extra = await self.respond(path)
+                payload = json.dumps(body).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                head = [f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(payload)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head += [f"{k}: {v}" for k, v in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def stats(self):
+        delays = sorted(call.delay for call in self.calls if call.status != 429)
+        return {
+            "calls": len(self.calls),
+            "statusCounts": {str(k): v for k, v in sorted(self.status_counts.items())},
+            "medianDelayMs": delays[len(delays) // 2] * 1000 if delays else 0.0,
+        }
+
+
+def add_stub_arguments(parser):
+    group = parser.add_argument_group("upstream stub")
+    group.add_argument('--latency', choices=LATENCY_DISTRIBUTIONS, default='lognormal')
+    group.add_argument('--median-ms', type=float, default=300.0, help="median upstream latency")
+    group.add_argument('--spread', type=float, default=0.5,
+                       help="lognormal sigma / uniform +-fraction / pareto 1/alpha")
+    group.add_argument('--error-rate', type=float, default=0.0, help="fraction answered with 500")
+    group.add_argument('--hang-rate', type=float, default=0.0, help="fraction that outlive the 10 s timeout")
+    group.add_argument('--not-found-rate', type=float, default=0.0, help="fraction of ids that do not exist")
+    group.add_argument('--ban-rate', type=float, default=0.0, help="fraction of ids that are banned")
+    group.add_argument('--quota', type=float, default=0.0, help="requests/second before 429 (0 = unlimited)")
+    group.add_argument('--stub-seed', type=int, default=None)
+
+
+def config_from_args(args):
+    return StubConfig(args.latency, args.median_ms, args.spread, args.error_rate, args.hang_rate,
+                      args.not_found_rate, args.ban_rate, args.quota, args.stub_seed)
+
+
+async def serve(stub, host, port):
+    await stub.start(host, port)
+    print(f"🎮 id-game-checker stub on http://{host}:{port} "
+          f"({stub.config.latency}, median {stub.config.median_ms:.0f}ms)")
+    print(f"   RAPIDAPI_BASE_URL=http://{host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stub.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local id-game-checker stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stub = PlayerApiStub(config_from_args(args))
+    try:
+        asyncio.run(serve(stub, args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"\n📊 {json.dumps(stub.stats())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the public GET endpoints the storefront hits on
+every page load
+
+Warms each endpoint up, takes --samples timed requests (endpoints are
+interleaved round-robin so server-side drift hits all of them equally),
+and reports the latency distribution plus response size. --save writes
+the run as a JSON baseline; later runs compare against it and exit 1 when
+an endpoint's --metric latency grows by more than --threshold (and by at
+least --min-delta ms, so tiny endpoints don't flap).
+
+Usage (from the repository root):
+    python -m tests.public_bench --save          # record a baseline
+    python -m tests.public_bench                 # compare against it
+    python -m tests.public_bench --samples 200 --threshold 0.1 --metric p99
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from tests.http_client import create_client, RequestError
+from tests.latency import summarize, format_summary
+
+BASE_URL = os.getenv('NEXT_PUBLIC_BASE_URL', 'https://cpanel-db-setup.preview.emergentagent.com')
+API_BASE = f"{BASE_URL}/api"
+
+ENDPOINTS = [
+    ("products", "/products"),
+    ("site settings", "/site/settings"),
+    ("site banner", "/site/banner"),
+    ("regions", "/regions"),
+    ("reviews", "/reviews?game=pubg&page=1&limit=5"),
+    ("content pubg", "/content/pubg"),
+    ("seo settings", "/seo/settings"),
+    ("footer settings", "/footer-settings"),
+]
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'public_get.json')
+
+
+def git_sha():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class EndpointRun:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.samples = []
+        self.sizes = []
+        self.errors = 0
+
+    def result(self):
+        summary = summarize(self.samples)
+        summary["bytes"] = max(self.sizes) if self.sizes else 0
+        summary["errors"] = self.errors
+        return summary
+
+
+def fetch(client, run):
+    start = time.perf_counter()
+    try:
+        response = client.get(f"{API_BASE}{run.path}")
+        body = response.content
+    except RequestError:
+        run.errors += 1
+        return None
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        run.errors += 1
+        return None
+    run.sizes.append(len(body))
+    return elapsed
+
+
+def benchmark(samples, warmup, timeout):
+    runs = [EndpointRun(name, path) for name, path in ENDPOINTS]
+    with create_client(timeout=timeout, retries=0, pool_size=1) as client:
+        for run in runs:
+            for _ in range(warmup):
+                fetch(client, run)
+            run.errors = 0
+            run.sizes.clear()
+        for _ in range(samples):
+            for run in runs:
+                elapsed = fetch(client, run)
+                if elapsed is not None:
+                    run.samples.append(elapsed)
+    return {run.name: run.result() for run in runs}
+
+
+def print_results(results):
+    print("\n" + "=" * 100)
+    print("📊 PUBLIC GET LATENCY")
+    print("=" * 100)
+    for name, summary in results.items():
+        errors = f"  ❌ {summary['errors']} errors" if summary['errors'] else ""
+        print(f"{format_summary(name, summary)}  {summary['bytes'] / 1024:7.1f}KB{errors}")
+
+
+def compare(results, baseline, metric, threshold, min_delta):
+    """List of (name, before_ms, after_ms) regressions"""
+    regressions = []
+    for name, summary in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        after = summary[metric]
+        if after > before[metric] * (1 + threshold) and after - before[metric] >= min_delta:
+            regressions.append((name, before[metric], after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the public GET endpoints")
+    parser.add_argument('--samples', type=int, default=50, help="timed requests per endpoint")
+    parser.add_argument('--warmup', type=int, default=5, help="untimed requests per endpoint first")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--save', action='store_true', help="write this run as the new baseline")
+    parser.add_argument('--metric', choices=['p50', 'p95', 'p99', 'mean'], default='p95')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed relative growth of --metric (0.25 = +25%%)")
+    parser.add_argument('--min-delta', type=float, default=5.0,
+                        help="ignore regressions smaller than this many ms")
+    args = parser.parse_args(argv)
+
+    print(f"🧪 Benchmarking {len(ENDPOINTS)} public endpoints on {BASE_URL} "
+          f"({args.warmup} warmup + {args.samples} samples each)")
+    results = benchmark(args.samples, args.warmup, args.timeout)
+    print_results(results)
+
+    failed = any(summary['errors'] for summary in results.values())
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\n📏 Comparing {args.metric} against baseline from {baseline.get('createdAt')} "
+              f"({baseline.get('gitSha') or 'unknown sha'}), threshold +{args.threshold:.0%}")
+        regressions = compare(results, baseline['endpoints'], args.metric, args.threshold, args.min_delta)
+        for name, before, after in regressions:
+            change = f"{after / before - 1:+.0%}" if before else f"{after - before:+.1f}ms"
+            print(f"❌ {name}: {before:.1f}ms -> {after:.1f}ms ({change})")
+        if regressions:
+            failed = True
+        else:
+            print("✅ No regressions")
+    elif not args.save:
+        print(f"\nℹ️  No baseline at {args.baseline}; run with --save to record one")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                "baseUrl": BASE_URL,
+                "createdAt": datetime.now(timezone.utc).isoformat(),
+                "gitSha": git_sha(),
+                "samples": args.samples,
+                "endpoints": results,
+            }, f, indent=2)
+        print(f"\n📝 Baseline saved to {args.baseline}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Rate limiter probe and limits table for the load generators
+
+checkRateLimit in route.js keeps a fixed window per key: the first request
+opens the window, requests past `limit` get 429 with Retry-After until
+`windowMs` after that first request. Keys are built from the full pathname
+plus the client IP (X-Forwarded-For) or the user id, so every fresh
+synthetic IP or user - and every distinct pathname - is a fresh bucket.
+
+For each rate-limited path this probe:
+
+    - finds the limit: requests on a fresh key until the first 429 (exact
+      for a fixed window, and cheaper than bisecting burst sizes)
+    - finds the window by bisection on the wait after exhausting a key;
+      --probes-per-round fresh keys are tried in parallel per round, so
+      1 is a plain binary search and 8 needs ~3 rounds for 0.5 s resolution
+    - checks Retry-After against the measured window
+    - compares the latency of rejected (429) and accepted requests
+
+Probes send invalid bodies so accepted requests stop at validation (400)
+and create nothing. The admin bucket is per admin id, so admin keys are
+made fresh with a unique pathname under /api/admin (404 after the check).
+
+The result is written as JSON (--out, default tests/baselines/rate_limits.json);
+load_limits() and Pacer below let the load tools stay under the limits.
+
+Usage (from the repository root):
+    python -m tests.rate_limits
+    python -m tests.rate_limits --only /api/auth/register --probes-per-round 4
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+# Table rows mirror route.js RATE_LIMITS; used when no probed table exists
+ROUTE_LIMITS = {
+    '/api/auth/login': {"limit": 5, "windowSeconds": 60.0, "keyType": "ip"},
+    '/api/auth/register': {"limit": 3, "windowSeconds": 60.0, "keyType": "ip"},
+    '/api/orders': {"limit": 10, "windowSeconds": 60.0, "keyType": "ip+user"},
+    '/api/player/resolve': {"limit": 30, "windowSeconds": 60.0, "keyType": "ip"},
+    '/api/support': {"limit": 10, "windowSeconds": 60.0, "keyType": "user"},
+    '/api/admin': {"limit": 60, "windowSeconds": 60.0, "keyType": "user"},
+}
+
+DEFAULT_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'rate_limits.json')
+
+
+def load_limits(path=DEFAULT_TABLE):
+    """{route prefix: {"limit", "windowSeconds", "keyType", ...}} from the table, else route.js values"""
+    limits = {prefix: dict(row) for prefix, row in ROUTE_LIMITS.items()}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for prefix, row in json.load(f).get('limits', {}).items():
+                if row.get('limit') is not None and row.get('windowSeconds') is not None:
+                    limits.setdefault(prefix, {}).update(row)
+    return limits
+
+
+def limit_for(pathname, limits):
+    """Row for an /api/... pathname, matched by prefix in table order like getRateLimitKey"""
+    for prefix, row in limits.items():
+        if pathname.startswith(prefix):
+            return row
+    return None
+
+
+def required_keys(rate_per_second, row, margin=0.8):
+    """Distinct keys (IPs/users) needed to sustain a rate under one limit row"""
+    per_key = row['limit'] / row['windowSeconds'] * margin
+    return max(1, math.ceil(rate_per_second / per_key))
+
+
+class Pacer:
+    """Client-side copy of the fixed window: waits instead of drawing a 429"""
+
+    def __init__(self, limits, margin=0.25):
+        self.limits = limits
+        self.margin = margin
+        self.windows = {}
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    async def acquire(self, pathname, key):
+        row = limit_for(pathname, self.limits)
+        if not row:
+            return
+        bucket = (pathname, key)
+        while True:
+            now = time.monotonic()
+            started, count = self.windows.get(bucket, (None, 0))
+            if started is None or now - started >= row['windowSeconds'] + self.margin:
+                self.windows[bucket] = (now, 1)
+                return
+            if count < row['limit']:
+                self.windows[bucket] = (started, count + 1)
+                return
+            delay = started + row['windowSeconds'] + self.margin - now
+            self.waits += 1
+            self.waited_seconds += delay
+            await asyncio.sleep(delay)
+
+
+# ---------------------------------------------------------------------------
+# Probe
+# ---------------------------------------------------------------------------
+
+class Probe:
+    def __init__(self, prefix, method, path, body=None):
+        self.prefix = prefix
+        self.method = method
+        self.path = path
+        self.body = body
+        self.key_type = ROUTE_LIMITS[prefix]['keyType']
+
+
+# Invalid bodies/params: the rate check runs first, then validation answers 400
+PROBES = [
+    Probe('/api/auth/login', 'POST', '/auth/login', {}),
+    Probe('/api/auth/register', 'POST', '/auth/register', {}),
+    Probe('/api/orders', 'POST', '/orders', {}),
+    Probe('/api/player/resolve', 'GET', '/player/resolve'),
+    Probe('/api/support', 'POST', '/support/tickets', {}),
+    Probe('/api/admin', 'GET', '/admin/__rate_probe'),
+]
+
+
+class ProbeKey:
+    """One fresh rate-limit bucket: a path plus the headers that pick the key"""
+
+    def __init__(self, path, headers):
+        self.path = path
+        self.headers = headers
+
+
+class Prober:
+    def __init__(self, client, base_url, admin_token):
+        self.client = client
+        self.base_url = base_url
+        self.admin_token = admin_token
+        self.next_ip = random.randrange(1 << 20)
+        self.accepted = []
+        self.rejected = []
+        self.retry_after = []
+
+    def fresh_ip(self):
+        from tests.callback_load import fake_ip
+        self.next_ip += 1
+        return fake_ip(self.next_ip)
+
+    async def fresh_key(self, probe):
+        headers = {"X-Forwarded-For": self.fresh_ip()}
+        if probe.prefix == '/api/admin':
+            headers["Authorization"] = f"Bearer {self.admin_token}"
+            return ProbeKey(f"{probe.path}/{uuid.uuid4().hex[:8]}", headers)
+        if probe.key_type in ('user', 'ip+user'):
+            response = await self.client.post(f"{self.base_url}/auth/register", json={
+                "firstName": "Rate", "lastName": "Probe", "email": f"rate.{uuid.uuid4().hex[:12]}@example.com",
+                "phone": "5551234567", "password": "rateprobe123"
+            }, headers={"X-Forwarded-For": self.fresh_ip()})
+            response.raise_for_status()
+            headers["Authorization"] = f"Bearer {response.json()['data']['token']}"
+        return ProbeKey(probe.path, headers)
+
+    async def send(self, probe, key, record=True):
+        params = {"id": "x"} if probe.method == 'GET' and probe.prefix == '/api/player/resolve' else None
+        started = time.perf_counter()
+        response = await self.client.request(probe.method, f"{self.base_url}{key.path}", params=params,
+                                             json=probe.body, headers=key.headers)
+        seconds = time.perf_counter() - started
+        if record:
+            if response.status_code == 429:
+                self.rejected.append(seconds)
+                if response.headers.get('retry-after'):
+                    self.retry_after.append(int(response.headers['retry-after']))
+            else:
+                self.accepted.append(seconds)
+        return response.status_code
+
+    async def find_limit(self, probe, max_requests):
+        """-> (limit or None, time the window opened)"""
+        key = await self.fresh_key(probe)
+        opened = time.monotonic()
+        for sent in range(1, max_requests + 1):
+            if await self.send(probe, key) == 429:
+                return sent - 1, opened
+        return None, opened
+
+    async def window_trial(self, probe, limit, wait):
+        """Exhaust a fresh key, wait until `wait` s after it opened; True if allowed again"""
+        key = await self.fresh_key(probe)
+        opened = time.monotonic()
+        for _ in range(limit + 1):
+            await self.send(probe, key)
+        await asyncio.sleep(max(0.0, opened + wait - time.monotonic()))
+        return await self.send(probe, key) != 429
+
+    async def find_window(self, probe, limit, hint, per_round, resolution, max_window):
+        lo, hi = 0.0, min(max_window, hint + 2.0)
+        while not await self.window_trial(probe, limit, hi):
+            if hi >= max_window:
+                return None
+            lo, hi = hi, min(max_window, hi * 2)
+        while hi - lo > resolution:
+            waits = [lo + (hi - lo) * (i + 1) / (per_round + 1) for i in range(per_round)]
+            outcomes = await asyncio.gather(*(self.window_trial(probe, limit, w) for w in waits))
+            allowed = [w for w, ok in zip(waits, outcomes) if ok]
+            hi = min(allowed + [hi])
+            lo = max([w for w, ok in zip(waits, outcomes) if not ok and w < hi] + [lo])
+            print(f"   window in ({lo:.2f}s, {hi:.2f}s]")
+        return hi
+
+    async def rejected_cost(self, probe, limit, samples):
+        """Latency of `samples` requests on an already exhausted key"""
+        key = await self.fresh_key(probe)
+        for _ in range(limit + 1):
+            await self.send(probe, key, record=False)
+        for _ in range(samples):
+            await self.send(probe, key)
+
+
+async def probe_all(probes, args, admin_token):
+    from tests.http_client import create_async_client
+    from tests.latency import summarize
+    from callback_test import BASE_URL
+
+    table = {}
+    async with create_async_client(retries=0, pool_size=max(args.probes_per_round * 2, 4)) as client:
+        for probe in probes:
+            print(f"\n🔎 {probe.method} {probe.prefix} (keyed by {probe.key_type})")
+            prober = Prober(client, BASE_URL, admin_token)
+            limit, _ = await prober.find_limit(probe, args.max_requests)
+            if limit is None:
+                print(f"   no 429 within {args.max_requests} requests")
+                table[probe.prefix] = {"limit": None, "windowSeconds": None, "keyType": probe.key_type}
+                continue
+            print(f"   limit: {limit} requests")
+            hint = max(prober.retry_after) if prober.retry_after else args.max_window / 2
+            await prober.rejected_cost(probe, limit, args.cost_samples)
+            window = await prober.find_window(probe, limit, hint, args.probes_per_round,
+                                              args.resolution, args.max_window)
+            print(f"   window: {window:.2f}s, Retry-After on first 429: {hint}s" if window
+                  else f"   window longer than {args.max_window}s")
+            accepted, rejected = summarize(prober.accepted), summarize(prober.rejected)
+            table[probe.prefix] = {
+                "limit": limit,
+                "windowSeconds": round(window, 2) if window else None,
+                "keyType": probe.key_type,
+                "retryAfterSeconds": hint,
+                # Retry-After is a ceiling of the remaining window, never more than 1 s over
+                "retryAfterConsistent": bool(window) and window <= hint + 1 + args.resolution,
+                "acceptedP50Ms": round(accepted['p50'], 2),
+                "rejectedP50Ms": round(rejected['p50'], 2),
+                "rejectedP99Ms": round(rejected['p99'], 2),
+            }
+    return table
+
+
+def print_table(table):
+    print("\n" + "=" * 80)
+    print("RATE LIMITS")
+    print("=" * 80)
+    print(f"{'path':<22} {'limit':>6} {'window':>8} {'key':>8} {'Retry-After':>12} "
+          f"{'accepted p50':>13} {'429 p50':>9}")
+    for prefix, row in table.items():
+        if row['limit'] is None:
+            print(f"{prefix:<22} {'none':>6}")
+            continue
+        window = f"{row['windowSeconds']:.1f}s" if row['windowSeconds'] else "?"
+        print(f"{prefix:<22} {row['limit']:>6} {window:>8} {row['keyType']:>8} "
+              f"{row['retryAfterSeconds']:>11}s {row['acceptedP50Ms']:>11.1f}ms {row['rejectedP50Ms']:>7.1f}ms")
+        expected = ROUTE_LIMITS.get(prefix)
+        if expected and (row['limit'] != expected['limit']
+                         or (row['windowSeconds'] and abs(row['windowSeconds'] - expected['windowSeconds']) > 2)):
+            print(f"   ⚠️  differs from route.js RATE_LIMITS ({expected['limit']}/{expected['windowSeconds']:.0f}s)")
+        if not row['retryAfterConsistent']:
+            print("   ⚠️  Retry-After does not match the measured window")
+    print("=" * 80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probe route.js rate limits and write the limits table")
+    parser.add_argument('--only', action='append', default=[], help="probe only this prefix (repeatable)")
+    parser.add_argument('--max-requests', type=int, default=200, help="give up finding a limit after this many")
+    parser.add_argument('--max-window', type=float, default=600.0, help="longest window searched, seconds")
+    parser.add_argument('--resolution', type=float, default=0.5, help="window precision in seconds")
+    parser.add_argument('--probes-per-round', type=int, default=8, help="parallel fresh keys per bisection round")
+    parser.add_argument('--cost-samples', type=int, default=50, help="extra 429s timed per path")
+    parser.add_argument('--out', default=DEFAULT_TABLE, help="limits table JSON")
+    args = parser.parse_args(argv)
+
+    import callback_test
+    from callback_test import BASE_URL
+
+    probes = [p for p in PROBES if not args.only or p.prefix in args.only]
+    admin_token = None
+    if any(p.prefix == '/api/admin' for p in probes):
+        if not callback_test.setup():
+            return 1
+        admin_token = callback_test.admin_token
+
+    table = asyncio.run(probe_all(probes, args, admin_token))
+    print_table(table)
+
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        sha = None
+    existing = {}
+    if os.path.exists(args.out):
+        with open(args.out) as f:
+            existing = json.load(f).get('limits', {})
+    existing.update(table)
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump({
+            "baseUrl": BASE_URL,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "gitSha": sha,
+            "limits": existing,
+        }, f, indent=2)
+    print(f"💾 Limits table written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Load scenario for GET /api/player/resolve against the local upstream stub
+
+Starts tests/player_api_stub.py in-process, then drives
+/api/player/resolve at --rate requests/second. Player ids repeat the way
+checkout traffic does: with probability --repeat-ratio a request reuses one
+of the recently looked-up ids (the buyer retyping or reloading), otherwise
+it is a new id. Each app request is matched to the upstream call it made,
+which gives:
+
+    - app latency vs. upstream latency and the share that leaks through
+    - app overhead on top of upstream
+    - silent fallbacks (route.js answers "Player#1234" on upstream errors)
+    - a what-if for a resolve cache with --cache-ttl: hits, upstream calls
+      avoided and the latency distribution with the cache in front
+
+The app must be started with the stub as its upstream:
+
+    RAPIDAPI_BASE_URL=http://127.0.0.1:8765 RAPIDAPI_KEY=stub yarn dev
+
+Usage (from the repository root):
+    python -m tests.resolve_load --requests 600 --rate 10 --repeat-ratio 0.6
+    python -m tests.resolve_load --latency pareto --median-ms 500 --error-rate 0.05 --quota 5
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from tests.callback_load import fake_ip
+from tests.http_client import create_async_client
+from tests.latency import summarize, format_summary
+from tests.player_api_stub import PlayerApiStub, add_stub_arguments, config_from_args
+from tests.rate_limits import DEFAULT_TABLE, limit_for, load_limits, required_keys
+
+BASE_URL = os.getenv('NEXT_PUBLIC_BASE_URL', 'http://localhost:3000')
+API_BASE = f"{BASE_URL}/api"
+
+RESOLVE_PATH = "/api/player/resolve"
+RECENT_IDS = 50
+
+
+class IdPicker:
+    """New ids, or with `repeat_ratio` probability a recently used one"""
+
+    def __init__(self, repeat_ratio, rng):
+        self.repeat_ratio = repeat_ratio
+        self.rng = rng
+        self.recent = []
+
+    def next(self):
+        if self.recent and self.rng.random() < self.repeat_ratio:
+            return self.rng.choice(self.recent), True
+        player_id = str(self.rng.randrange(5_000_000_000, 5_999_999_999))
+        self.recent.append(player_id)
+        if len(self.recent) > RECENT_IDS:
+            self.recent.pop(0)
+        return player_id, False
+
+
+class ResolveRequest:
+    __slots__ = ('player_id', 'repeat', 'started', 'finished', 'status', 'fallback', 'upstream')
+
+    def __init__(self, player_id, repeat):
+        self.player_id = player_id
+        self.repeat = repeat
+        self.started = None
+        self.finished = None
+        self.status = None
+        self.fallback = False
+        self.upstream = None
+
+    @property
+    def latency(self):
+        return self.finished - self.started
+
+
+async def resolve(client, semaphore, request, ip):
+    async with semaphore:
+        request.started = time.perf_counter()
+        try:
+            response = await client.get(f"{API_BASE}/player/resolve", params={"id": request.player_id},
+                                        headers={"X-Forwarded-For": ip})
+            request.status = response.status_code
+            if response.status_code == 200:
+                name = response.json().get('data', {}).get('playerName', '')
+                request.fallback = name == f"Player#{request.player_id[-4:]}"
+        except (httpx.HTTPError, ValueError):
+            request.status = 'error'
+        request.finished = time.perf_counter()
+
+
+def match_upstream(requests, calls):
+    """Attach each app request to the upstream call made while it was in flight"""
+    by_id = defaultdict(list)
+    for call in calls:
+        by_id[call.player_id].append(call)
+    for request in sorted(requests, key=lambda r: r.started):
+        candidates = by_id.get(request.player_id, [])
+        for i, call in enumerate(candidates):
+            if request.started <= call.started <= request.finished:
+                request.upstream = candidates.pop(i)
+                break
+
+
+def cache_what_if(requests, ttl):
+    """Latencies if a resolve cache with `ttl` seconds sat in front of upstream"""
+    expires = {}
+    latencies, hits, avoided_errors = [], 0, 0
+    for request in sorted(requests, key=lambda r: r.started):
+        cached = expires.get(request.player_id, 0) > request.started
+        upstream = request.upstream
+        if cached:
+            hits += 1
+            if upstream and upstream.status != 200:
+                avoided_errors += 1
+            latencies.append(max(0.0, request.latency - (upstream.delay if upstream else 0.0)))
+            continue
+        latencies.append(request.latency)
+        if upstream and upstream.status == 200 and request.status == 200 and not request.fallback:
+            expires[request.player_id] = request.finished + ttl
+    return latencies, hits, avoided_errors
+
+
+async def run(args):
+    stub = PlayerApiStub(config_from_args(args))
+    await stub.start(args.stub_host, args.stub_port)
+    rng = random.Random(args.seed)
+    picker = IdPicker(args.repeat_ratio, rng)
+    requests = []
+    try:
+        async with create_async_client(timeout=args.timeout, retries=0, pool_size=args.concurrency) as client:
+            semaphore = asyncio.Semaphore(args.concurrency)
+            tasks = []
+            for i in range(args.requests):
+                player_id, repeat = picker.next()
+                request = ResolveRequest(player_id, repeat)
+                requests.append(request)
+                tasks.append(asyncio.create_task(resolve(client, semaphore, request, fake_ip(i % args.users + 1))))
+                await asyncio.sleep(rng.expovariate(args.rate))
+            await asyncio.gather(*tasks)
+    finally:
+        await stub.stop()
+    match_upstream(requests, stub.calls)
+    return requests, stub
+
+
+def print_report(requests, stub, ttl):
+    matched = [r for r in requests if r.upstream]
+    app = [r.latency for r in requests if r.finished]
+    upstream = [r.upstream.delay for r in matched]
+    overhead = [r.latency - r.upstream.delay for r in matched]
+
+    print("\n" + "=" * 80)
+    print("PLAYER RESOLVE LOAD RESULTS")
+    print("=" * 80)
+    repeats = sum(r.repeat for r in requests)
+    print(f"Requests: {len(requests)}, repeated ids: {repeats} ({repeats / max(len(requests), 1):.0%}), "
+          f"matched to upstream calls: {len(matched)}")
+    if not matched:
+        print("⚠️  No upstream calls reached the stub - is the app running with "
+              "RAPIDAPI_BASE_URL pointing at it and RAPIDAPI_KEY set?")
+
+    print(format_summary("GET /api/player/resolve", summarize(app)))
+    print(format_summary("upstream (stub)", summarize(upstream)))
+    print(format_summary("app overhead", summarize(overhead)))
+    if matched:
+        share = sum(upstream) / sum(r.latency for r in matched)
+        print(f"Upstream share of resolve latency: {share:.0%}")
+
+    statuses = Counter(r.status for r in requests)
+    print(f"\nApp status codes: {dict(statuses)}  (429 = route.js rate limit)")
+    print(f"Upstream status codes: {dict(sorted(stub.status_counts.items()))}")
+    fallbacks = sum(r.fallback for r in requests)
+    print(f"Silent fallbacks (Player#xxxx names): {fallbacks}")
+
+    cached, hits, avoided_errors = cache_what_if(requests, ttl)
+    print(f"\n💡 With a {ttl:.0f}s resolve cache: {hits} hits ({hits / max(len(requests), 1):.0%}), "
+          f"{hits} fewer upstream calls, {avoided_errors} upstream errors avoided")
+    print(format_summary("resolve with cache", summarize(cached)))
+    saved = sum(app) - sum(cached)
+    print(f"Upstream wait saved: {saved:.1f}s total, {saved / max(len(requests), 1) * 1000:.0f}ms per request")
+    print("=" * 80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load /api/player/resolve through the local upstream stub")
+    parser.add_argument('--requests', type=int, default=600)
+    parser.add_argument('--rate', type=float, default=10.0, help="arrivals per second (Poisson)")
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--users', type=int, default=50, help="distinct client IPs")
+    parser.add_argument('--repeat-ratio', type=float, default=0.5, help="share of lookups for a recent id")
+    parser.add_argument('--cache-ttl', type=float, default=3600.0, help="what-if cache TTL in seconds")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--stub-host', default='127.0.0.1')
+    parser.add_argument('--stub-port', type=int, default=8765)
+    parser.add_argument('--limits', default=DEFAULT_TABLE, help="rate limits table from tests/rate_limits.py")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    row = limit_for(RESOLVE_PATH, load_limits(args.limits))
+    if row and args.users < required_keys(args.rate, row, margin=1.0):
+        print(f"⚠️  {args.rate / args.users:.2f} requests/s per IP exceeds the "
+              f"{row['limit']}/{row['windowSeconds']:.0f}s limit; expect 429s "
+              f"(use --users {required_keys(args.rate, row)})")
+
+    print(f"🧪 {args.requests} resolves at {args.rate}/s against {BASE_URL}, "
+          f"upstream stub on {args.stub_host}:{args.stub_port}")
+    requests, stub = asyncio.run(run(args))
+    print_report(requests, stub, args.cache_ttl)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+SQLite store for API test outcomes
+
+log_test (email_test.py), print_result (callback_test.py),
+print_test_result (test_close_and_flow.py) and the backend_test.py step
+loop call record(), which writes one row per outcome together with the
+HTTP exchanges the shared client made since the previous record (method,
+endpoint, status code, latency, payload bytes). Each process is one run,
+tagged with its start time, git sha and base URL.
+
+The CLI reads the store back:
+    python -m tests.results_store runs                   # recent runs
+    python -m tests.results_store trend [--endpoint /api/products]
+    python -m tests.results_store update-md              # refresh test_result.md
+
+update-md rewrites `working`, `stuck_count`, `needs_retesting` and appends a
+status_history entry for every test_result.md task the latest run touched
+(scripts map their test ids to task names in RESULT_TASKS).
+
+Environment:
+    API_RESULTS_DB      store path (default tests/.results.sqlite)
+    API_RESULTS_DB=off  disable recording
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from tests import http_client
+from tests.latency import percentile
+
+STORE_PATH = os.getenv(
+    'API_RESULTS_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.results.sqlite')
+)
+ENABLED = STORE_PATH.lower() != 'off'
+
+TEST_RESULT_MD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_result.md')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    git_sha TEXT,
+    base_url TEXT,
+    script TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL REFERENCES runs(id),
+    test_id TEXT NOT NULL,
+    task TEXT,
+    status TEXT NOT NULL,
+    endpoint TEXT,
+    status_code INTEGER,
+    latency_ms REAL,
+    payload_bytes INTEGER,
+    details TEXT,
+    recorded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exchanges (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result_id INTEGER NOT NULL REFERENCES results(id),
+    method TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    status_code INTEGER,
+    latency_ms REAL,
+    payload_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS results_task ON results(task, run_id);
+CREATE INDEX IF NOT EXISTS exchanges_endpoint ON exchanges(endpoint);
+"""
+
+# UUIDs, ObjectIds and long numbers in paths collapse to {id} so trends group
+_ID_SEGMENT = re.compile(r'/([0-9a-f]{8}-[0-9a-f-]{27}|[0-9a-f]{24}|\d{5,})(?=/|$)', re.I)
+
+_lock = threading.Lock()
+_local = threading.local()
+_run_id = None
+
+
+def normalize_endpoint(url):
+    return _ID_SEGMENT.sub('/{id}', urlsplit(url).path) or '/'
+
+
+def _on_exchange(method, url, status_code, seconds, payload_bytes):
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = []
+    pending.append((method, normalize_endpoint(url), status_code, seconds * 1000, payload_bytes))
+
+
+if ENABLED:
+    http_client.add_listener(_on_exchange)
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or STORE_PATH, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def git_sha():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(TEST_RESULT_MD)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _current_run(conn):
+    global _run_id
+    if _run_id is None:
+        _run_id = uuid.uuid4().hex[:12]
+        conn.execute(
+            "INSERT INTO runs (id, started_at, git_sha, base_url, script) VALUES (?, ?, ?, ?, ?)",
+            (_run_id, datetime.now(timezone.utc).isoformat(), git_sha(),
+             os.getenv('NEXT_PUBLIC_BASE_URL'), os.path.basename(sys.argv[0]) or None)
+        )
+    return _run_id
+
+
+def _status(status):
+    if status is True:
+        return 'PASS'
+    if status is False:
+        return 'FAIL'
+    return str(status).upper()
+
+
+def record(test_id, status, details="", task=None):
+    """Store one outcome plus the HTTP exchanges made since the last record"""
+    exchanges = getattr(_local, 'pending', None) or []
+    _local.pending = []
+    if not ENABLED:
+        return
+
+    last = exchanges[-1] if exchanges else None
+    with _lock:
+        conn = connect()
+        try:
+            with conn:
+                run_id = _current_run(conn)
+                cursor = conn.execute(
+                    "INSERT INTO results (run_id, test_id, task, status, endpoint, status_code, latency_ms,"
+                    " payload_bytes, details, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, test_id, task, _status(status),
+                     f"{last[0]} {last[1]}" if last else None,
+                     last[2] if last else None,
+                     sum(e[3] for e in exchanges) if exchanges else None,
+                     sum(e[4] for e in exchanges) if exchanges else None,
+                     str(details)[:2000], datetime.now(timezone.utc).isoformat())
+                )
+                conn.executemany(
+                    "INSERT INTO exchanges (result_id, method, endpoint, status_code, latency_ms, payload_bytes)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid,) + exchange for exchange in exchanges]
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not record result in {STORE_PATH}: {e}")
+        finally:
+            conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Reports
+# ---------------------------------------------------------------------------
+
+def print_runs(conn, limit):
+    rows = conn.execute(
+        "SELECT r.id, r.started_at, r.git_sha, r.script,"
+        " SUM(x.status = 'PASS'), COUNT(x.id), AVG(x.latency_ms)"
+        " FROM runs r LEFT JOIN results x ON x.run_id = r.id"
+        " GROUP BY r.id ORDER BY r.started_at DESC LIMIT ?", (limit,)
+    ).fetchall()
+    print("\n" + "=" * 80)
+    print("📋 RECENT TEST RUNS")
+    print("=" * 80)
+    for run_id, started, sha, script, passed, total, avg in rows:
+        icon = "✅" if total and passed == total else "❌"
+        print(f"{icon} {run_id}  {started[:19]}  {sha or '-':<8} {script or '-':<24} "
+              f"{passed or 0}/{total} passed  avg {avg or 0:.0f}ms")
+
+
+def print_trend(conn, endpoint, limit):
+    query = (
+        "SELECT r.id, r.started_at, e.method || ' ' || e.endpoint, e.latency_ms"
+        " FROM exchanges e JOIN results x ON x.id = e.result_id JOIN runs r ON r.id = x.run_id"
+        " WHERE r.id IN (SELECT id FROM runs ORDER BY started_at DESC LIMIT ?)"
+    )
+    params = [limit]
+    if endpoint:
+        query += " AND e.endpoint = ?"
+        params.append(endpoint)
+    samples = defaultdict(lambda: defaultdict(list))
+    started = {}
+    for run_id, started_at, name, latency in conn.execute(query, params):
+        samples[name][run_id].append(latency)
+        started[run_id] = started_at
+
+    print("\n" + "=" * 80)
+    print("📈 LATENCY TREND (p50 / p95 per run, oldest first)")
+    print("=" * 80)
+    for name in sorted(samples):
+        print(f"\n{name}")
+        for run_id in sorted(samples[name], key=started.get):
+            values = sorted(samples[name][run_id])
+            print(f"   {started[run_id][:19]}  {run_id}  n={len(values):<4} "
+                  f"p50={percentile(values, 50):7.1f}ms  p95={percentile(values, 95):7.1f}ms")
+
+
+# ---------------------------------------------------------------------------
+# test_result.md
+# ---------------------------------------------------------------------------
+
+def task_outcomes(conn, run_id):
+    """{task: {'passed': n, 'total': n, 'failures': [...], 'endpoints': {...}}} for one run"""
+    outcomes = {}
+    rows = conn.execute(
+        "SELECT id, task, test_id, status, details FROM results WHERE run_id = ? AND task IS NOT NULL ORDER BY id",
+        (run_id,)
+    ).fetchall()
+    for result_id, task, test_id, status, details in rows:
+        outcome = outcomes.setdefault(task, {'passed': 0, 'total': 0, 'failures': [], 'endpoints': defaultdict(list)})
+        outcome['total'] += 1
+        if status == 'PASS':
+            outcome['passed'] += 1
+        elif status == 'FAIL':
+            outcome['failures'].append(f"{test_id}: {details}" if details else test_id)
+        for method, endpoint, latency in conn.execute(
+                "SELECT method, endpoint, latency_ms FROM exchanges WHERE result_id = ?", (result_id,)):
+            outcome['endpoints'][f"{method} {endpoint}"].append(latency)
+    return outcomes
+
+
+def _history_comment(run, outcome):
+    run_id, started_at, sha = run
+    parts = [f"Automated run {run_id} ({sha or 'no git sha'}, {started_at[:16].replace('T', ' ')} UTC): "
+             f"{outcome['passed']}/{outcome['total']} checks passed."]
+    if outcome['endpoints']:
+        latencies = ", ".join(
+            f"{name} p50 {percentile(sorted(values), 50):.0f}ms"
+            for name, values in sorted(outcome['endpoints'].items())
+        )
+        parts.append(f"Latency: {latencies}.")
+    if outcome['failures']:
+        parts.append("Failures: " + "; ".join(outcome['failures'][:5]) + ".")
+    return " ".join(parts)
+
+
+def _task_blocks(lines):
+    """(name, start, end) for every `  - task:` block in the data section"""
+    blocks = []
+    current = None
+    for i, line in enumerate(lines):
+        match = re.match(r'^  - task: "(.*)"\s*$', line)
+        if match or (current and re.match(r'^\S', line)):
+            if current:
+                blocks.append((current[0], current[1], i))
+                current = None
+        if match and not line.startswith('#'):
+            current = (match.group(1), i)
+    if current:
+        blocks.append((current[0], current[1], len(lines)))
+    return blocks
+
+
+def _update_block(block, working, comment):
+    was_working = None
+    for i, line in enumerate(block):
+        if line.startswith('    working:'):
+            was_working = line.split(':', 1)[1].strip()
+            block[i] = f"    working: {working}"
+        elif line.startswith('    needs_retesting:'):
+            block[i] = "    needs_retesting: false"
+    for i, line in enumerate(block):
+        if line.startswith('    stuck_count:') and working == 'false' and was_working == 'false':
+            block[i] = f"    stuck_count: {int(line.split(':', 1)[1]) + 1}"
+
+    end = len(block)
+    while end > 0 and not block[end - 1].strip():
+        end -= 1
+    entry = [
+        f"      - working: {working}",
+        '        agent: "testing"',
+        f"        comment: {json.dumps(comment, ensure_ascii=False)}",
+    ]
+    return block[:end] + entry + block[end:]
+
+
+def update_markdown(conn, path, run_id=None):
+    if run_id is None:
+        row = conn.execute(
+            "SELECT r.id FROM runs r WHERE EXISTS (SELECT 1 FROM results x WHERE x.run_id = r.id AND x.task IS NOT NULL)"
+            " ORDER BY r.started_at DESC LIMIT 1"
+        ).fetchone()
+        if not row:
+            print("❌ No recorded runs with mapped tasks")
+            return False
+        run_id = row[0]
+    run = conn.execute("SELECT id, started_at, git_sha FROM runs WHERE id = ?", (run_id,)).fetchone()
+    if not run:
+        print(f"❌ Unknown run {run_id}")
+        return False
+    outcomes = task_outcomes(conn, run_id)
+
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().split('\n')
+
+    updated = set()
+    for name, start, end in reversed(_task_blocks(lines)):
+        outcome = outcomes.get(name)
+        if not outcome:
+            continue
+        working = 'true' if outcome['passed'] == outcome['total'] else 'false'
+        lines[start:end] = _update_block(lines[start:end], working, _history_comment(run, outcome))
+        updated.add(name)
+
+    for i, line in enumerate(lines):
+        if line.startswith('  test_sequence:') and updated:
+            lines[i] = f"  test_sequence: {int(line.split(':', 1)[1]) + 1}"
+        elif line.startswith('  last_updated:') and updated:
+            lines[i] = f'  last_updated: "{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}"'
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+    print(f"✅ Updated {len(updated)} task(s) in {path} from run {run_id}")
+    for name in sorted(set(outcomes) - updated):
+        print(f"⚠️  Task not found in {os.path.basename(path)}: {name}")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the API test results store")
+    parser.add_argument('--db', default=None, help="store path (default API_RESULTS_DB)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    runs = commands.add_parser('runs', help="list recent runs")
+    runs.add_argument('--limit', type=int, default=20)
+    trend = commands.add_parser('trend', help="per-endpoint latency across runs")
+    trend.add_argument('--endpoint', default=None, help="e.g. /api/site/settings")
+    trend.add_argument('--limit', type=int, default=50, help="number of recent runs")
+    md = commands.add_parser('update-md', help="refresh task status in test_result.md")
+    md.add_argument('--run', default=None, help="run id (default: latest run with mapped tasks)")
+    md.add_argument('--file', default=TEST_RESULT_MD)
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        if args.command == 'runs':
+            print_runs(conn, args.limit)
+        elif args.command == 'trend':
+            print_trend(conn, args.endpoint, args.limit)
+        elif args.command == 'update-md':
+            return 0 if update_markdown(conn, args.file, args.run) else 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
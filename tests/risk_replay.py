@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Offline replay of calculateOrderRisk over every scored order (NumPy/pandas)
+
+route.js scores an order inside the Shopier callback with five queries
+against `orders` per order. This pulls `orders` and `users` once into
+columns and recomputes every signal for all scored orders at once, as of
+each order's risk.calculatedAt:
+
+    account age        users.createdAt
+    first order        paid/completed orders of the user (the callback sets
+                       status paid *before* scoring, so the order itself
+                       counts and this rule only fires if it was not paid)
+    amount             orders.amount
+    same IP, last hour orders already scored from meta.ip (meta.ip is set
+                       right after scoring) created in the window
+    player ids         distinct playerId over the user's orders so far
+    google unverified  users.authProvider / phoneVerified
+    temp mail          users.email domain
+    failed orders      the user's orders created in the last 24 h that had
+                       failed by then (updatedAt, set by the failing callback)
+
+Running counts "as of" a time are pd.merge_asof lookups into per-key
+cumulative counts, so the whole replay is a handful of sorts and joins.
+
+The report compares the replayed score, status and reasons with the
+stored `risk` subdocument, then shows how the score distribution and the
+flagged share move under other thresholds (--thresholds) and rule
+parameters (--set name=value, see DEFAULT_PARAMS).
+
+Usage (from the repository root):
+    python -m tests.risk_replay
+    python -m tests.risk_replay --thresholds 30,40,50 --set ip_orders=5 --set new_account_points=15
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from tests.db import get_db
+
+# Mirrors route.js; RISK_THRESHOLD is 'threshold'
+DEFAULT_PARAMS = {
+    'threshold': 40,
+    'new_account_hours': 1, 'new_account_points': 25,
+    'young_account_hours': 24, 'young_account_points': 10,
+    'first_order_points': 10,
+    'high_amount': 500, 'high_amount_points': 15,
+    'mid_amount': 250, 'mid_amount_points': 5,
+    'ip_window_minutes': 60, 'ip_orders': 3, 'ip_points': 20,
+    'player_ids': 3, 'player_ids_points': 15,
+    'google_unverified_points': 5,
+    'temp_mail_points': 30,
+    'failed_window_hours': 24, 'failed_orders': 2, 'failed_points': 15,
+}
+TEMP_MAIL_PROVIDERS = ('tempmail', 'guerrilla', '10minute', 'throwaway', 'mailinator')
+
+# Substrings of the reasons route.js (and tests/seed.py) store per rule
+REASON_KEYWORDS = {
+    'new_account': 'Yeni hesap',
+    'young_account': 'Hesap 24 saatten',
+    'first_order': 'İlk sipariş',
+    'high_amount': 'Yüksek değerli',
+    'mid_amount': 'Orta-yüksek',
+    'ip_orders': "Aynı IP'den",
+    'player_ids': 'oyuncu ID',
+    'google_unverified': 'Google ile giriş',
+    'temp_mail': 'Geçici e-posta',
+    'failed_orders': 'başarısız sipariş',
+}
+RULES = list(REASON_KEYWORDS)
+
+ORDER_COLUMNS = ['id', 'userId', 'playerId', 'amount', 'status', 'createdAt', 'updatedAt', 'ip',
+                 'storedScore', 'storedStatus', 'storedReasons', 'scoredAt']
+USER_COLUMNS = ['userId', 'userCreatedAt', 'authProvider', 'phoneVerified', 'email']
+
+
+def load_frames(db, batch_size=10000, limit=0):
+    """orders and users as DataFrames, built column by column from one pass each"""
+    columns = {name: [] for name in ORDER_COLUMNS}
+    projection = {'_id': 0, 'id': 1, 'userId': 1, 'playerId': 1, 'amount': 1, 'status': 1,
+                  'createdAt': 1, 'updatedAt': 1, 'meta.ip': 1, 'risk': 1}
+    cursor = db.orders.find({}, projection, batch_size=batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+    for order in cursor:
+        risk = order.get('risk') or {}
+        columns['id'].append(order.get('id'))
+        columns['userId'].append(order.get('userId'))
+        columns['playerId'].append(order.get('playerId'))
+        columns['amount'].append(order.get('amount'))
+        columns['status'].append(order.get('status'))
+        columns['createdAt'].append(order.get('createdAt'))
+        columns['updatedAt'].append(order.get('updatedAt'))
+        columns['ip'].append((order.get('meta') or {}).get('ip'))
+        columns['storedScore'].append(risk.get('score'))
+        columns['storedStatus'].append(risk.get('status'))
+        columns['storedReasons'].append('|'.join(risk.get('reasons') or []))
+        columns['scoredAt'].append(risk.get('calculatedAt'))
+    orders = pd.DataFrame(columns)
+
+    columns = {name: [] for name in USER_COLUMNS}
+    for user in db.users.find({}, {'_id': 0, 'id': 1, 'createdAt': 1, 'authProvider': 1,
+                                   'phoneVerified': 1, 'email': 1}, batch_size=batch_size):
+        columns['userId'].append(user.get('id'))
+        columns['userCreatedAt'].append(user.get('createdAt'))
+        columns['authProvider'].append(user.get('authProvider'))
+        columns['phoneVerified'].append(bool(user.get('phoneVerified')))
+        columns['email'].append(user.get('email') or '')
+    users = pd.DataFrame(columns)
+
+    for frame, names in ((orders, ['createdAt', 'updatedAt', 'scoredAt']), (users, ['userCreatedAt'])):
+        for name in names:
+            frame[name] = pd.to_datetime(frame[name], errors='coerce', utc=True).dt.tz_localize(None)
+    orders['amount'] = pd.to_numeric(orders['amount'], errors='coerce')
+    orders['storedScore'] = pd.to_numeric(orders['storedScore'], errors='coerce')
+    return orders, users
+
+
+def running_count(keys, at, event_keys, event_times, inclusive=True, weights=None):
+    """For each (key, at): sum of `weights` (default 1) over events with that key at/before `at`
+
+    `inclusive=False` counts only events strictly before `at`. Rows with a
+    missing key or time get 0.
+    """
+    right = pd.DataFrame({
+        'key': event_keys.to_numpy(),
+        'time': event_times.to_numpy(),
+        'weight': np.ones(len(event_keys), dtype=np.int64) if weights is None else weights.to_numpy(),
+    }).dropna(subset=['key', 'time'])
+    right = right.sort_values('time', kind='mergesort')
+    right['count'] = right.groupby('key')['weight'].cumsum()
+
+    left = pd.DataFrame({'key': keys.to_numpy(), 'time': at.to_numpy(), 'row': np.arange(len(keys))})
+    left = left.dropna(subset=['key', 'time']).sort_values('time', kind='mergesort')
+    merged = pd.merge_asof(left, right[['key', 'time', 'count']], on='time', by='key',
+                           direction='backward', allow_exact_matches=inclusive)
+
+    result = np.zeros(len(keys), dtype=np.int64)
+    result[merged['row'].to_numpy()] = merged['count'].fillna(0).to_numpy(dtype=np.int64)
+    return pd.Series(result, index=keys.index)
+
+
+def window_counts(keys, at, event_keys, created, happened, window, inclusive=True):
+    """For each (key, at): events with that key that happened at/before `at`
+    (strictly before with `inclusive=False`) and were created within `window` of `at`"""
+    # happened by T, minus those created before T - window ...
+    counts = (running_count(keys, at, event_keys, happened, inclusive=inclusive)
+              - running_count(keys, at - window, event_keys, created, inclusive=False))
+
+    # ... plus the too-old ones that only happened after T (more than `window` after creation)
+    slow = (happened - created > window) & event_keys.notna()
+    for key, group in pd.DataFrame({'key': event_keys[slow], 'created': created[slow],
+                                    'happened': happened[slow]}).groupby('key'):
+        targets = keys.index[keys == key]
+        created_at = group['created'].to_numpy()[None, :]
+        happened_at = group['happened'].to_numpy()[None, :]
+        step = max(1, 20_000_000 // len(group))  # bound the comparison matrix to ~20M cells
+        for start in range(0, len(targets), step):
+            chunk = targets[start:start + step]
+            t = at.loc[chunk].to_numpy()[:, None]
+            later = happened_at > t if inclusive else happened_at >= t
+            counts.loc[chunk] += ((created_at < t - window) & later).sum(axis=1)
+    return counts
+
+
+def _ip_counts(scored, window):
+    """Orders from the same meta.ip scored before T and created within `window` of T"""
+    return window_counts(scored['ip'], scored['scoredAt'], scored['ip'], scored['createdAt'],
+                         scored['scoredAt'], window, inclusive=False)
+
+
+def replay_signals(orders, users, params):
+    """Raw risk inputs for every scored order, as of its risk.calculatedAt"""
+    scored = orders[orders['scoredAt'].notna()].merge(users, on='userId', how='left')
+    at = scored['scoredAt']
+    signals = pd.DataFrame(index=scored.index)
+    signals['id'] = scored['id']
+    signals['amount'] = scored['amount']
+    signals['account_age_hours'] = (at - scored['userCreatedAt']) / pd.Timedelta(hours=1)
+
+    # Paid time of other orders: their own scoring time, else last update
+    paid = orders[orders['status'].isin(['paid', 'completed'])]
+    signals['previous_paid'] = running_count(scored['userId'], at, paid['userId'],
+                                             paid['scoredAt'].fillna(paid['updatedAt']))
+
+    signals['ip_orders'] = _ip_counts(scored, pd.Timedelta(minutes=params['ip_window_minutes']))
+
+    by_created = orders.dropna(subset=['createdAt']).sort_values('createdAt', kind='mergesort')
+    first_use = (~by_created.duplicated(['userId', 'playerId'])).astype(np.int64)
+    signals['player_ids'] = running_count(scored['userId'], at, by_created['userId'], by_created['createdAt'],
+                                          weights=first_use)
+
+    # Failed by T: the callback that fails an order sets its updatedAt
+    failed = orders[orders['status'] == 'failed']
+    failed_at = failed['updatedAt'].where(failed['updatedAt'] >= failed['createdAt'], failed['createdAt'])
+    signals['failed_orders'] = window_counts(scored['userId'], at, failed['userId'], failed['createdAt'],
+                                             failed_at, pd.Timedelta(hours=params['failed_window_hours']))
+
+    signals['google_unverified'] = (scored['authProvider'] == 'google') & ~scored['phoneVerified'].fillna(False).astype(bool)
+    domain = scored['email'].fillna('').str.split('@').str[1].fillna('')
+    signals['temp_mail'] = domain.str.contains('|'.join(TEMP_MAIL_PROVIDERS), regex=True)
+
+    signals['storedScore'] = scored['storedScore']
+    signals['storedStatus'] = scored['storedStatus']
+    signals['storedReasons'] = scored['storedReasons'].fillna('')
+    return signals
+
+
+def score(signals, params):
+    """-> (points per rule DataFrame, capped score Series, flagged Series)"""
+    p = params
+    age = signals['account_age_hours']
+    amount = signals['amount']
+    points = pd.DataFrame({
+        'new_account': np.where(age < p['new_account_hours'], p['new_account_points'], 0),
+        'young_account': np.where((age >= p['new_account_hours']) & (age < p['young_account_hours']),
+                                  p['young_account_points'], 0),
+        'first_order': np.where(signals['previous_paid'] == 0, p['first_order_points'], 0),
+        'high_amount': np.where(amount > p['high_amount'], p['high_amount_points'], 0),
+        'mid_amount': np.where((amount > p['mid_amount']) & ~(amount > p['high_amount']), p['mid_amount_points'], 0),
+        'ip_orders': np.where(signals['ip_orders'] > p['ip_orders'], p['ip_points'], 0),
+        'player_ids': np.where(signals['player_ids'] > p['player_ids'], p['player_ids_points'], 0),
+        'google_unverified': np.where(signals['google_unverified'], p['google_unverified_points'], 0),
+        'temp_mail': np.where(signals['temp_mail'], p['temp_mail_points'], 0),
+        'failed_orders': np.where(signals['failed_orders'] >= p['failed_orders'], p['failed_points'], 0),
+    }, index=signals.index)
+    raw = points.sum(axis=1)
+    # route.js compares the uncapped score with the threshold and stores min(score, 100)
+    return points, raw.clip(upper=100), raw >= p['threshold']
+
+
+def compare_with_stored(signals, points, replayed, flagged):
+    stored = signals['storedScore']
+    has_stored = stored.notna()
+    print(f"Scored orders: {len(signals)} ({has_stored.sum()} with a stored score)")
+    if not has_stored.any():
+        return
+    diff = (replayed[has_stored] - stored[has_stored]).abs()
+    print(f"Score matches stored: {(diff == 0).mean():.1%}   mean |diff| {diff.mean():.1f}   max {diff.max():.0f}")
+    status = np.where(flagged, 'FLAGGED', 'CLEAR')
+    agree = (status == signals['storedStatus'].to_numpy())[has_stored.to_numpy()]
+    print(f"Status matches stored: {agree.mean():.1%}")
+
+    print(f"\n{'rule':<20} {'both':>9} {'replay only':>12} {'stored only':>12}")
+    for rule in RULES:
+        replay_hit = points[rule] > 0
+        stored_hit = signals['storedReasons'].str.contains(REASON_KEYWORDS[rule], regex=False)
+        both = (replay_hit & stored_hit).sum()
+        print(f"{rule:<20} {both:>9} {(replay_hit & ~stored_hit).sum():>12} {(~replay_hit & stored_hit).sum():>12}")
+
+
+def score_histogram(baseline, what_if=None):
+    bins = list(range(0, 101, 10)) + [101]
+    labels = [f"{b}-{b + 9}" for b in bins[:-2]] + ["100"]
+    base = pd.cut(baseline, bins=bins, right=False, labels=labels).value_counts().reindex(labels, fill_value=0)
+    other = None
+    if what_if is not None:
+        other = pd.cut(what_if, bins=bins, right=False, labels=labels).value_counts().reindex(labels, fill_value=0)
+    print(f"\n{'score':<8} {'current':>10}" + (f" {'what-if':>10}" if other is not None else ""))
+    for label in labels:
+        line = f"{label:<8} {base[label]:>10}"
+        if other is not None:
+            line += f" {other[label]:>10} ({other[label] - base[label]:+d})"
+        print(line)
+
+
+def parse_set(values):
+    params = dict(DEFAULT_PARAMS)
+    for item in values:
+        name, _, value = item.partition('=')
+        if name not in DEFAULT_PARAMS:
+            raise SystemExit(f"Unknown parameter {name!r}; one of: {', '.join(DEFAULT_PARAMS)}")
+        params[name] = float(value)
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay calculateOrderRisk over stored orders")
+    parser.add_argument('--thresholds', default="30,35,40,45,50", help="comma-separated RISK_THRESHOLD values")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="what-if rule parameter (repeatable)")
+    parser.add_argument('--limit', type=int, default=0)
+    parser.add_argument('--db', default=None, help="database name (default DB_NAME)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    orders, users = load_frames(get_db(args.db), limit=args.limit)
+    loaded = time.perf_counter()
+    signals = replay_signals(orders, users, DEFAULT_PARAMS)
+    points, replayed, flagged = score(signals, DEFAULT_PARAMS)
+    replay_seconds = time.perf_counter() - loaded
+
+    print("\n" + "=" * 80)
+    print("RISK REPLAY")
+    print("=" * 80)
+    print(f"Loaded {len(orders)} orders / {len(users)} users in {loaded - started:.1f}s, "
+          f"replayed in {replay_seconds:.2f}s ({len(signals) / max(replay_seconds, 1e-9):,.0f} orders/s)")
+    compare_with_stored(signals, points, replayed, flagged)
+
+    what_if = None
+    if args.set:
+        params = parse_set(args.set)
+        if params['ip_window_minutes'] != DEFAULT_PARAMS['ip_window_minutes'] or \
+                params['failed_window_hours'] != DEFAULT_PARAMS['failed_window_hours']:
+            what_if_signals = replay_signals(orders, users, params)
+        else:
+            what_if_signals = signals
+        _, what_if, what_if_flagged = score(what_if_signals, params)
+        print(f"\nWhat-if: {', '.join(args.set)}")
+        changed = flagged != what_if_flagged
+        print(f"   CLEAR -> FLAGGED: {(changed & what_if_flagged).sum()}   "
+              f"FLAGGED -> CLEAR: {(changed & flagged).sum()}")
+    score_histogram(replayed, what_if)
+
+    print(f"\n{'threshold':<10} {'flagged':>10} {'share':>8}" + (f" {'what-if':>10} {'share':>8}" if args.set else ""))
+    raw = points.sum(axis=1)
+    what_if_raw = None
+    if args.set:
+        what_if_points, _, _ = score(what_if_signals, params)
+        what_if_raw = what_if_points.sum(axis=1)
+    for threshold in [float(t) for t in args.thresholds.split(',') if t.strip()]:
+        count = (raw >= threshold).sum()
+        line = f"{threshold:<10g} {count:>10} {count / max(len(raw), 1):>8.1%}"
+        if what_if_raw is not None:
+            other = (what_if_raw >= threshold).sum()
+            line += f" {other:>10} {other / max(len(raw), 1):>8.1%}"
+        print(line)
+    print("=" * 80)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
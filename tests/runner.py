@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Parallel suite runner for the API test scripts
+
+Discovers the `test_*` functions in the root test scripts, works out which
+of them share state and runs independent groups concurrently in a thread
+pool. Prints one merged pass/fail report with per-test timing.
+
+State sharing is worked out from:
+  * module globals - a module's argument-less non-test functions that
+    assign globals (`setup()`, `setup_user()`, ...) run once before its
+    tests, and tests that assign a global another test reads end up in
+    the same group;
+  * fixtures - parameters named admin_token / user_token / user_id /
+    user_email are filled in from one login per server, made by the
+    script's own admin_login() / user_register_and_login() so the tokens
+    match its BASE_URL; tests sharing the registered user run in the same
+    group since they change that account;
+  * TEST_GROUPS - a script may map test names to a group name to serialize
+    tests that write the same server-side document.
+
+Tests that call other tests of their module (sequential drivers such as
+backend_test.test_site_settings_api) are skipped, their steps run instead.
+
+Usage (from the repository root):
+    python -m tests.runner [--workers 8] [-k email] [module ...]
+"""
+
+import argparse
+import concurrent.futures
+import dis
+import importlib
+import inspect
+import io
+import sys
+import threading
+import time
+import traceback
+
+from tests import token_cache
+
+SUITE_MODULES = ["backend_test", "email_test", "callback_test", "test_close_and_flow"]
+
+# Fixture parameter -> (provider, index into the provider's result)
+FIXTURE_PARAMS = {
+    "admin_token": ("admin", None),
+    "user_token": ("user", 0),
+    "user_id": ("user", 1),
+    "user_email": ("user", 2),
+}
+STATEFUL_FIXTURES = {"user"}
+
+# Provider -> login helper of the requesting module, so tokens come from the
+# server in that module's BASE_URL; modules without one borrow FALLBACK_MODULE's
+# helper when it targets the same server
+FIXTURE_PROVIDERS = {"admin": "admin_login", "user": "user_register_and_login"}
+FALLBACK_MODULE = "email_test"
+
+
+def fixture_key(provider, module):
+    """One fixture value per provider and server (host with or without /api)"""
+    return token_cache.cache_key(getattr(module, "BASE_URL", ""), provider)
+
+
+def provide(provider, module):
+    helper = getattr(module, FIXTURE_PROVIDERS[provider], None)
+    if helper is None:
+        fallback = importlib.import_module(FALLBACK_MODULE)
+        if fixture_key(provider, fallback) != fixture_key(provider, module):
+            raise RuntimeError(f"{module.__name__} has no {FIXTURE_PROVIDERS[provider]}() for its BASE_URL")
+        helper = getattr(fallback, FIXTURE_PROVIDERS[provider])
+    return helper()
+
+
+class ThreadLocalStdout(io.TextIOBase):
+    """Routes print() from worker threads into per-test buffers"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def capture(self, buffer):
+        self.local.buffer = buffer
+
+    def release(self):
+        self.local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class TestCase:
+    def __init__(self, module, func):
+        self.module = module
+        self.func = func
+        self.name = f"{module.__name__}::{func.__name__}"
+        self.params = list(inspect.signature(func).parameters)
+        self.loads, self.stores = global_access(func)
+        self.status = "SKIP"
+        self.duration = 0.0
+        self.output = ""
+
+
+class Fixtures:
+    """Lazily computed, process-wide fixture values per server"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def get(self, param, module):
+        provider, index = FIXTURE_PARAMS[param]
+        key = fixture_key(provider, module)
+        with self.lock:
+            if key not in self.values:
+                self.values[key] = provide(provider, module)
+            value = self.values[key]
+        return value if index is None else value[index]
+
+
+def iter_code(code):
+    yield code
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            yield from iter_code(const)
+
+
+def global_access(func):
+    """(loaded, stored) global names, including nested lambdas/closures"""
+    loads, stores = set(), set()
+    for code in iter_code(func.__code__):
+        for instruction in dis.get_instructions(code):
+            if instruction.opname == "LOAD_GLOBAL":
+                loads.add(instruction.argval)
+            elif instruction.opname == "STORE_GLOBAL":
+                stores.add(instruction.argval)
+    return loads, stores
+
+
+def required_params(func):
+    """Parameters without defaults; a setup must be callable with none"""
+    return [
+        p for p in inspect.signature(func).parameters.values()
+        if p.default is p.empty and p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)
+    ]
+
+
+def module_functions(module):
+    funcs = [
+        obj for _, obj in inspect.getmembers(module, inspect.isfunction)
+        if obj.__module__ == module.__name__
+    ]
+    return sorted(funcs, key=lambda f: f.__code__.co_firstlineno)
+
+
+def discover(module_names, keyword=None):
+    """Return (setups by module, test cases) for the given script modules"""
+    setups, cases = {}, []
+    for module_name in module_names:
+        module = importlib.import_module(module_name)
+        funcs = module_functions(module)
+        test_names = {f.__name__ for f in funcs if f.__name__.startswith("test_")}
+
+        setups[module_name] = [
+            f for f in funcs
+            if not f.__name__.startswith("test_") and f.__name__ != "main"
+            and global_access(f)[1] and not required_params(f)
+        ]
+
+        for func in funcs:
+            if func.__name__ not in test_names:
+                continue
+            case = TestCase(module, func)
+            if case.loads & (test_names - {func.__name__}):
+                continue  # sequential driver
+            if keyword and keyword not in case.name:
+                continue
+            cases.append(case)
+    return setups, cases
+
+
+def group_cases(cases):
+    """Union-find over shared globals, stateful fixtures and TEST_GROUPS"""
+    parent = list(range(len(cases)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        parent[find(i)] = find(j)
+
+    owners = {}
+    for i, case in enumerate(cases):
+        keys = set()
+        for name in case.stores:
+            keys.add(("global", case.module.__name__, name))
+        for other in cases:
+            if other is not case and other.module is case.module:
+                for name in other.stores & case.loads:
+                    keys.add(("global", case.module.__name__, name))
+        for param in case.params:
+            provider = FIXTURE_PARAMS.get(param, (None, None))[0]
+            if provider in STATEFUL_FIXTURES:
+                keys.add(("fixture", fixture_key(provider, case.module)))
+        declared = getattr(case.module, "TEST_GROUPS", {}).get(case.func.__name__)
+        if declared:
+            keys.add(("declared", case.module.__name__, declared))
+        for key in keys:
+            if key in owners:
+                union(i, owners[key])
+            else:
+                owners[key] = i
+
+    groups = {}
+    for i, case in enumerate(cases):
+        groups.setdefault(find(i), []).append(case)
+    return list(groups.values())
+
+
+def run_case(case, fixtures, stdout):
+    buffer = io.StringIO()
+    stdout.capture(buffer)
+    start = time.perf_counter()
+    try:
+        kwargs = {param: fixtures.get(param, case.module) for param in case.params if param in FIXTURE_PARAMS}
+        result = case.func(**kwargs)
+        if isinstance(result, tuple):
+            result = result[0]
+        failed = result is False or "❌" in buffer.getvalue()
+        case.status = "FAIL" if failed else "PASS"
+    except Exception:
+        traceback.print_exc(file=buffer)
+        case.status = "ERROR"
+    finally:
+        case.duration = time.perf_counter() - start
+        case.output = buffer.getvalue()
+        stdout.release()
+
+
+def run_group(group, fixtures, stdout):
+    for case in group:
+        run_case(case, fixtures, stdout)
+
+
+def run_setups(funcs, stdout):
+    buffer = io.StringIO()
+    stdout.capture(buffer)
+    try:
+        for func in funcs:
+            if func() is False:
+                return False, buffer.getvalue()
+        return True, buffer.getvalue()
+    except Exception:
+        traceback.print_exc(file=buffer)
+        return False, buffer.getvalue()
+    finally:
+        stdout.release()
+
+
+def run_suite(module_names, workers, keyword=None):
+    stdout = ThreadLocalStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        setups, cases = discover(module_names, keyword)
+        wanted = {case.module.__name__ for case in cases}
+        fixtures = Fixtures()
+        wall_start = time.perf_counter()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            setup_futures = {
+                name: pool.submit(run_setups, funcs, stdout)
+                for name, funcs in setups.items() if funcs and name in wanted
+            }
+            failed_setups = {}
+            for name, future in setup_futures.items():
+                ok, output = future.result()
+                if not ok:
+                    failed_setups[name] = output
+
+            runnable = [case for case in cases if case.module.__name__ not in failed_setups]
+            groups = group_cases(runnable)
+            futures = [pool.submit(run_group, group, fixtures, stdout) for group in groups]
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+
+        wall = time.perf_counter() - wall_start
+    finally:
+        sys.stdout = stdout.stream
+
+    return cases, groups, failed_setups, wall
+
+
+def print_report(cases, groups, failed_setups, wall, verbose=False):
+    symbols = {"PASS": "✅", "FAIL": "❌", "ERROR": "💥", "SKIP": "⏭️"}
+
+    print("\n" + "=" * 80)
+    print("📊 MERGED TEST REPORT")
+    print("=" * 80)
+    for name, output in failed_setups.items():
+        print(f"❌ Setup failed for {name} - its tests were skipped")
+        print(output)
+
+    for case in cases:
+        print(f"{symbols[case.status]} {case.status:<5} {case.duration:7.2f}s  {case.name}")
+        if verbose or case.status in ("FAIL", "ERROR"):
+            for line in case.output.rstrip().splitlines():
+                print(f"      {line}")
+
+    counts = {status: sum(1 for c in cases if c.status == status) for status in symbols}
+    serial = sum(case.duration for case in cases)
+    print("=" * 80)
+    print(f"Passed: {counts['PASS']}  Failed: {counts['FAIL']}  Errors: {counts['ERROR']}  Skipped: {counts['SKIP']}")
+    print(f"Groups: {len(groups)}  Wall-clock: {wall:.2f}s  Sum of test time: {serial:.2f}s "
+          f"(x{serial / wall if wall > 0 else 0:.1f})")
+    return counts['FAIL'] == 0 and counts['ERROR'] == 0 and not failed_setups
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API test scripts in parallel")
+    parser.add_argument("modules", nargs="*", default=SUITE_MODULES, help="script modules to run")
+    parser.add_argument("--workers", type=int, default=8, help="thread pool size")
+    parser.add_argument("-k", dest="keyword", default=None, help="only run tests whose name contains this")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show output of passing tests too")
+    args = parser.parse_args(argv)
+
+    cases, groups, failed_setups, wall = run_suite(args.modules, args.workers, args.keyword)
+    success = print_report(cases, groups, failed_setups, wall, args.verbose)
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+Declarative user-journey scenarios run by an asyncio virtual-user engine
+
+A scenario file (YAML, or JSON without PyYAML) describes weighted
+journeys; every virtual user (VU) loops picking a journey by weight and
+running its steps, with think time between them, until --duration runs
+out. Example (tests/scenarios/ has complete ones):
+
+    name: storefront
+    users: 500              # concurrent VUs (--users overrides)
+    ramp_up: 60             # seconds until all VUs are running
+    duration: 600
+    think_time: 1-3         # default pause after each step: seconds or "min-max"
+    pace: true              # wait out route.js rate limits client-side (tests/rate_limits.py)
+    setup: [admin]          # admin login + Shopier test secret before the VUs start
+    journeys:
+      - name: buy
+        weight: 15
+        steps:
+          - register: {}                      # once per VU: sets {token} {email} {password}
+          - get: /products
+            save: {product_id: data.0.id}     # dotted path into the JSON response
+          - get: /player/resolve?id={player_id}
+          - post: /orders
+            auth: user                        # user | admin
+            json: {productId: "{product_id}", playerId: "{player_id}", playerName: "VU#{vu}"}
+            save: {order_id: data.order.id, amount: data.order.amount}
+          - callback: {}                      # signed Shopier callback for {order_id}
+          - think: 5-10
+
+HTTP steps (get, post, put, delete) take a path under /api and optional
+name, auth, params, json, expect (status or list, default any 2xx), save
+and think. Strings are templated with {var} from the VU's variables:
+vu, ip, iteration, player_id (new each iteration), uuid (new each use),
+admin_token and whatever earlier steps saved. A step that fails ends the
+journey; the VU starts the next one.
+
+Latencies go into tests/histogram.py histograms, once as measured and
+once corrected for coordinated omission with each step's mean think time
+as the interval the VU meant to keep (--co-interval overrides). For more
+load than one process can generate, see tests/distributed_load.py.
+
+Usage (from the repository root):
+    python -m tests.scenario tests/scenarios/storefront.yaml
+    python -m tests.scenario tests/scenarios/support.yaml --users 2000 --duration 300
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+import callback_test
+from callback_test import BASE_URL, TEST_SHOPIER_API_SECRET, generate_shopier_hash
+from tests.callback_load import CALLBACK_PATH, fake_ip
+from tests.histogram import LatencyHistogram
+from tests.http_client import create_async_client
+from tests.latency import format_summary
+from tests.live_dashboard import add_live_arguments, dashboard_from_args
+from tests.rate_limits import Pacer, load_limits
+
+HTTP_METHODS = ('get', 'post', 'put', 'delete')
+ACTIONS = ('register', 'login', 'callback', 'think')
+STEP_OPTIONS = {'name', 'auth', 'params', 'json', 'expect', 'save', 'think', 'once'}
+TEMPLATE = re.compile(r'\{(\w+)\}')
+DEFAULT_PASSWORD = "scenario123"
+
+
+class ScenarioError(ValueError):
+    """Invalid scenario file"""
+
+
+def parse_range(value, where):
+    """'2-5', 3 or [2, 5] -> (low, high) seconds"""
+    if value is None:
+        return 0.0, 0.0
+    try:
+        if isinstance(value, (int, float)):
+            return float(value), float(value)
+        if isinstance(value, (list, tuple)):
+            low, high = value
+        else:
+            low, _, high = str(value).partition('-')
+            high = high or low
+        low, high = float(low), float(high)
+    except (TypeError, ValueError):
+        raise ScenarioError(f"{where}: think time must be seconds or 'min-max', got {value!r}")
+    if low < 0 or high < low:
+        raise ScenarioError(f"{where}: bad think time range {value!r}")
+    return low, high
+
+
+class Step:
+    __slots__ = ('kind', 'method', 'path', 'name', 'options', 'think', 'once')
+
+    def __init__(self, raw, where, default_think):
+        if not isinstance(raw, dict):
+            raise ScenarioError(f"{where}: a step is a mapping, got {raw!r}")
+        # `think` is a step of its own, or an option of any other step
+        kinds = [key for key in raw if key in HTTP_METHODS or key in ACTIONS and key != 'think']
+        if not kinds and 'think' in raw:
+            kinds = ['think']
+        if len(kinds) != 1:
+            raise ScenarioError(f"{where}: a step needs exactly one of {', '.join(HTTP_METHODS + ACTIONS)}")
+        self.kind = kinds[0]
+        unknown = set(raw) - STEP_OPTIONS - {self.kind}
+        if unknown:
+            raise ScenarioError(f"{where}: unknown step options {', '.join(sorted(unknown))}")
+        self.options = dict(raw)
+        value = self.options.pop(self.kind)
+        self.method = self.kind.upper() if self.kind in HTTP_METHODS else None
+        self.path = None
+        if self.method:
+            if not isinstance(value, str) or not value.startswith('/'):
+                raise ScenarioError(f"{where}: {self.kind} needs a path under /api such as /products")
+            self.path = value
+            self.name = raw.get('name') or f"{self.method} {value.split('?')[0]}"
+        else:
+            if isinstance(value, dict):
+                self.options.update(value)
+            self.name = raw.get('name') or self.kind
+        if self.kind == 'think':
+            self.think = parse_range(value, where)
+        else:
+            self.think = parse_range(raw['think'], where) if 'think' in raw else default_think
+        self.once = raw.get('once', self.kind == 'register')
+        if self.options.get('auth') not in (None, 'user', 'admin'):
+            raise ScenarioError(f"{where}: auth must be user or admin")
+
+
+class Journey:
+    __slots__ = ('name', 'weight', 'steps')
+
+    def __init__(self, raw, index, default_think):
+        where = f"journeys[{index}]"
+        if not isinstance(raw, dict) or not raw.get('steps'):
+            raise ScenarioError(f"{where}: a journey needs steps")
+        self.name = raw.get('name') or f"journey {index + 1}"
+        self.weight = float(raw.get('weight', 1))
+        if self.weight <= 0:
+            raise ScenarioError(f"{where}: weight must be positive")
+        self.steps = [Step(step, f"{where}.steps[{i}]", default_think) for i, step in enumerate(raw['steps'])]
+
+
+class Scenario:
+    def __init__(self, raw, source="<scenario>"):
+        if not isinstance(raw, dict) or not raw.get('journeys'):
+            raise ScenarioError(f"{source}: a scenario needs journeys")
+        self.raw = raw
+        self.source = source
+        self.name = raw.get('name', source)
+        self.users = int(raw.get('users', 10))
+        self.ramp_up = float(raw.get('ramp_up', 0))
+        self.duration = float(raw.get('duration', 60))
+        self.pace = bool(raw.get('pace', True))
+        self.setup = list(raw.get('setup', []))
+        think = parse_range(raw.get('think_time'), 'think_time')
+        self.journeys = [Journey(j, i, think) for i, j in enumerate(raw['journeys'])]
+        needs_admin = any(s.kind == 'callback' or s.options.get('auth') == 'admin'
+                          for j in self.journeys for s in j.steps)
+        if needs_admin and 'admin' not in self.setup:
+            raise ScenarioError(f"{source}: callback and admin steps need `setup: [admin]`")
+
+
+def load_scenario(path):
+    with open(path) as f:
+        text = f.read()
+    if path.endswith('.json'):
+        raw = json.loads(text)
+    elif yaml is None:
+        raise ScenarioError(f"{path}: YAML scenarios need PyYAML (pip install pyyaml), or use JSON")
+    else:
+        raw = yaml.safe_load(text)
+    return Scenario(raw, path)
+
+
+def lookup(data, dotted):
+    """Value at a dotted path ('data.order.id', 'data.0.id') or None"""
+    for part in str(dotted).split('.'):
+        if isinstance(data, list) and part.lstrip('-').isdigit() and -len(data) <= int(part) < len(data):
+            data = data[int(part)]
+        elif isinstance(data, dict) and part in data:
+            data = data[part]
+        else:
+            return None
+    return data
+
+
+def render(value, variables):
+    """Fill {var} placeholders; a string that is one placeholder keeps the value's type"""
+    if isinstance(value, str):
+        whole = TEMPLATE.fullmatch(value)
+        if whole:
+            return _variable(whole.group(1), variables)
+        return TEMPLATE.sub(lambda m: str(_variable(m.group(1), variables)), value)
+    if isinstance(value, dict):
+        return {k: render(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [render(v, variables) for v in value]
+    return value
+
+
+def _variable(name, variables):
+    if name == 'uuid':
+        return uuid.uuid4().hex
+    if name not in variables:
+        raise KeyError(name)
+    return variables[name]
+
+
+class StepStats:
+    """Latency histograms as measured and with coordinated omission corrected"""
+    __slots__ = ('histogram', 'corrected', 'statuses', 'failures')
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.corrected = LatencyHistogram()
+        self.statuses = defaultdict(int)
+        self.failures = 0
+
+
+class RunStats:
+    """Live counters and per-step histograms for one engine run; mergeable across workers"""
+
+    def __init__(self):
+        self.steps = defaultdict(StepStats)
+        self.journeys = defaultdict(lambda: {'completed': 0, 'failed': 0})
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.active_users = 0
+        self.pace_waits = 0
+        self.pace_seconds = 0.0
+        self.started = None
+        self.finished = None
+        self.elapsed = 0.0
+
+    def record(self, name, seconds, status, expected_interval=None):
+        step = self.steps[name]
+        step.histogram.record(seconds)
+        step.corrected.record(seconds, expected_interval)
+        step.statuses[status] += 1
+
+    def finish(self, pacer=None):
+        self.finished = time.monotonic()
+        self.elapsed = self.finished - self.started
+        if pacer:
+            self.pace_waits = pacer.waits
+            self.pace_seconds = pacer.waited_seconds
+
+    def to_dict(self):
+        return {
+            "steps": {name: {"histogram": step.histogram.to_dict(), "corrected": step.corrected.to_dict(),
+                             "statuses": {str(code): n for code, n in step.statuses.items()},
+                             "failures": step.failures}
+                      for name, step in self.steps.items()},
+            "journeys": {name: dict(counts) for name, counts in self.journeys.items()},
+            "requests": self.requests, "errors": self.errors, "elapsed": self.elapsed,
+            "paceWaits": self.pace_waits, "paceSeconds": self.pace_seconds,
+        }
+
+    def merge_dict(self, data):
+        """Add another run's to_dict() into this one (elapsed is the longest run)"""
+        for name, row in data["steps"].items():
+            step = self.steps[name]
+            step.histogram.merge(LatencyHistogram.from_dict(row["histogram"]))
+            step.corrected.merge(LatencyHistogram.from_dict(row["corrected"]))
+            for code, n in row["statuses"].items():
+                step.statuses[int(code) if code.isdigit() else code] += n
+            step.failures += row["failures"]
+        for name, counts in data["journeys"].items():
+            for key, n in counts.items():
+                self.journeys[name][key] += n
+        self.requests += data["requests"]
+        self.errors += data["errors"]
+        self.elapsed = max(self.elapsed, data["elapsed"])
+        self.pace_waits += data["paceWaits"]
+        self.pace_seconds += data["paceSeconds"]
+        return self
+
+
+class VirtualUser:
+    def __init__(self, engine, index):
+        self.engine = engine
+        self.index = index
+        self.rng = random.Random(engine.seed * 1_000_003 + index if engine.seed is not None else None)
+        self.variables = {'vu': index, 'ip': fake_ip(index + 1), 'iteration': 0,
+                          'admin_token': engine.admin_token, 'password': DEFAULT_PASSWORD}
+        self.done_once = set()
+
+    async def run(self, deadline):
+        engine = self.engine
+        engine.stats.active_users += 1
+        try:
+            while time.monotonic() < deadline:
+                journey = self.rng.choices(engine.scenario.journeys, weights=engine.weights)[0]
+                self.variables['iteration'] += 1
+                self.variables['player_id'] = str(self.rng.randrange(5_000_000_000, 5_999_999_999))
+                ok = await self.run_journey(journey, deadline)
+                if ok is None:
+                    break
+                engine.stats.journeys[journey.name]['completed' if ok else 'failed'] += 1
+                if not ok:
+                    await asyncio.sleep(self.rng.uniform(1, 3))
+        finally:
+            engine.stats.active_users -= 1
+
+    async def run_journey(self, journey, deadline):
+        for position, step in enumerate(journey.steps):
+            if time.monotonic() >= deadline:
+                # Cut short by the end of the run: neither completed nor failed
+                return None
+            # One buyer per VU whichever journey registers it first
+            key = 'register' if step.kind == 'register' else (journey.name, position)
+            if step.once and key in self.done_once:
+                continue
+            if step.kind != 'think':
+                try:
+                    ok = await self.run_step(step)
+                except KeyError as missing:
+                    print(f"   ⚠️  VU {self.index}: {journey.name}/{step.name} needs variable {missing}")
+                    ok = False
+                if not ok:
+                    self.engine.stats.steps[step.name].failures += 1
+                    return False
+                if step.once:
+                    self.done_once.add(key)
+            low, high = step.think
+            if high:
+                await asyncio.sleep(self.rng.uniform(low, high))
+        return True
+
+    def request_for(self, step):
+        """(method, path, kwargs, expect, save) for an HTTP or built-in step"""
+        v = self.variables
+        options = step.options
+        if step.kind == 'register':
+            v['email'] = f"vu.{uuid.uuid4().hex[:12]}@example.com"
+            body = {"firstName": "Virtual", "lastName": f"User{self.index}", "email": v['email'],
+                    "phone": "5551234567", "password": v['password']}
+            return 'POST', '/auth/register', {'json': body}, None, {'token': 'data.token', 'user_id': 'data.user.id'}
+        if step.kind == 'login':
+            body = {"email": v['email'], "password": v['password']}
+            return 'POST', '/auth/login', {'json': body}, None, {'token': 'data.token'}
+        if step.kind == 'callback':
+            order_id, amount = v['order_id'], v['amount']
+            signature = ("0" * 64 if options.get('bad_hash')
+                         else generate_shopier_hash(order_id, amount, TEST_SHOPIER_API_SECRET))
+            body = {"orderId": order_id, "platform_order_id": order_id, "status": options.get('status', 'success'),
+                    "transactionId": f"TXN_VU_{uuid.uuid4().hex}", "random_nr": uuid.uuid4().hex[:16],
+                    "total_order_value": str(amount), "hash": signature}
+            return 'POST', CALLBACK_PATH, {'json': body}, options.get('expect'), options.get('save', {})
+        kwargs = {}
+        if 'params' in options:
+            kwargs['params'] = render(options['params'], v)
+        if 'json' in options:
+            kwargs['json'] = render(options['json'], v)
+        return step.method, render(step.path, v), kwargs, options.get('expect'), options.get('save', {})
+
+    async def run_step(self, step):
+        engine = self.engine
+        method, path, kwargs, expect, save = self.request_for(step)
+        headers = {"X-Forwarded-For": self.variables['ip']}
+        auth = step.options.get('auth')
+        if auth:
+            headers["Authorization"] = f"Bearer {self.variables['admin_token' if auth == 'admin' else 'token']}"
+        if engine.pacer:
+            await engine.pacer.acquire('/api' + path.split('?')[0],
+                                       headers.get("Authorization") or self.variables['ip'])
+        engine.stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await engine.client.request(method, f"{BASE_URL}{path}", headers=headers, **kwargs)
+        except httpx.HTTPError:
+            engine.stats.errors += 1
+            return False
+        finally:
+            engine.stats.in_flight -= 1
+            engine.stats.requests += 1
+        engine.stats.record(step.name, time.perf_counter() - started, response.status_code,
+                            engine.expected_interval(step))
+
+        expected = expect if isinstance(expect, list) else [expect] if expect else None
+        if expected and response.status_code not in expected:
+            return False
+        if not expected and response.status_code // 100 != 2:
+            return False
+        if save:
+            try:
+                data = response.json()
+            except ValueError:
+                return False
+            for name, dotted in save.items():
+                value = lookup(data, dotted)
+                if value is None:
+                    return False
+                self.variables[name] = value
+        return True
+
+
+class Engine:
+    """Runs `users` VUs (numbered from `first_user`) through a scenario"""
+
+    def __init__(self, scenario, users=None, duration=None, ramp_up=None, first_user=0, seed=None,
+                 timeout=30.0, pool_size=None, stats=None, co_interval=None):
+        self.scenario = scenario
+        self.users = users or scenario.users
+        self.duration = duration or scenario.duration
+        self.ramp_up = scenario.ramp_up if ramp_up is None else ramp_up
+        self.first_user = first_user
+        self.seed = seed
+        self.timeout = timeout
+        self.pool_size = pool_size or min(self.users, 1000)
+        self.weights = [j.weight for j in scenario.journeys]
+        self.pacer = Pacer(load_limits()) if scenario.pace else None
+        self.stats = stats or RunStats()
+        self.co_interval = co_interval
+        self.admin_token = None
+        self.client = None
+
+    def expected_interval(self, step):
+        """Gap a VU means to leave between requests: --co-interval, else the step's mean think time"""
+        if self.co_interval is not None:
+            return self.co_interval or None
+        low, high = step.think
+        return (low + high) / 2 or None
+
+    def setup(self):
+        """Blocking setup steps named in the scenario (run before run())"""
+        if 'admin' in self.scenario.setup:
+            if not callback_test.setup():
+                return False
+            self.admin_token = callback_test.admin_token
+        return True
+
+    async def run(self):
+        deadline = time.monotonic() + self.ramp_up + self.duration
+        self.stats.started = time.monotonic()
+        async with create_async_client(timeout=self.timeout, retries=0, pool_size=self.pool_size) as client:
+            self.client = client
+            tasks = []
+            for offset in range(self.users):
+                if self.ramp_up and self.users > 1:
+                    delay = self.stats.started + self.ramp_up * offset / self.users - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                user = VirtualUser(self, self.first_user + offset)
+                tasks.append(asyncio.create_task(user.run(deadline)))
+            await asyncio.gather(*tasks)
+        self.stats.finish(self.pacer)
+        return self.stats
+
+
+def print_report(scenario, stats, title="SCENARIO RESULTS"):
+    elapsed = stats.elapsed or (time.monotonic() - stats.started)
+    print("\n" + "=" * 80)
+    print(f"{title}: {scenario.name}")
+    print("=" * 80)
+    for name, step in stats.steps.items():
+        print(format_summary(name[:28], step.histogram.summary()))
+        corrected = step.corrected.summary()
+        if corrected['count'] > step.histogram.count:
+            print(f"      corrected for coordinated omission: p50={corrected['p50']:.1f}ms "
+                  f"p95={corrected['p95']:.1f}ms p99={corrected['p99']:.1f}ms")
+        codes = ", ".join(f"{code}={n}" for code, n in sorted(step.statuses.items(), key=str))
+        failed = f"  failed={step.failures}" if step.failures else ""
+        print(f"      statuses: {codes}{failed}")
+    print()
+    for name, counts in stats.journeys.items():
+        total = counts['completed'] + counts['failed']
+        icon = "✅" if not counts['failed'] else "⚠️ "
+        print(f"{icon} {name:<24} {counts['completed']:>7} completed  {counts['failed']:>6} failed "
+              f"({counts['completed'] / total:.0%})")
+    print(f"\n📈 {stats.requests:,} requests in {elapsed:.1f}s ({stats.requests / elapsed if elapsed else 0:,.1f} req/s), "
+          f"{stats.errors} client errors")
+    if stats.pace_waits:
+        print(f"⏳ Paced under rate limits: {stats.pace_waits} waits, {stats.pace_seconds:.1f}s total")
+    print("=" * 80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a YAML user-journey scenario with virtual users")
+    parser.add_argument('scenario', help="scenario file (.yaml, or .json)")
+    parser.add_argument('--users', type=int, default=None, help="override the scenario's users")
+    parser.add_argument('--duration', type=float, default=None, help="override the scenario's duration (s)")
+    parser.add_argument('--ramp-up', type=float, default=None, help="override the scenario's ramp_up (s)")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--co-interval', type=float, default=None,
+                        help="expected seconds between a VU's requests for coordinated omission correction "
+                             "(default: each step's mean think time; 0 disables)")
+    parser.add_argument('--check', action='store_true', help="validate the scenario and exit")
+    add_live_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        scenario = load_scenario(args.scenario)
+    except (OSError, ScenarioError) as e:
+        print(f"❌ {e}")
+        return 1
+    steps = sum(len(j.steps) for j in scenario.journeys)
+    print(f"📋 {scenario.name}: {len(scenario.journeys)} journeys, {steps} steps")
+    if args.check:
+        return 0
+
+    engine = Engine(scenario, args.users, args.duration, args.ramp_up, seed=args.seed, timeout=args.timeout,
+                    co_interval=args.co_interval)
+    if not engine.setup():
+        return 1
+    print(f"🚀 {engine.users} virtual users against {BASE_URL}, ramp-up {engine.ramp_up:g}s, "
+          f"duration {engine.duration:g}s")
+    try:
+        if args.live:
+            with dashboard_from_args(args, scenario.name, BASE_URL, engine.admin_token) as dashboard:
+                asyncio.run(dashboard.watch(engine.run()))
+        else:
+            asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrupted")
+        engine.stats.finish(engine.pacer)
+    print_report(scenario, engine.stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
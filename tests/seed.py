@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Bulk fixture seeder for pubg_uc_store
+
+Inserts realistic users, orders, stock, tickets, email_logs and (with
+--audit-logs) audit_logs directly with insert_many(ordered=False) batches.
+Document shapes follow what route.js writes (register, POST /api/orders,
+the Shopier callback, stock upload, ticket creation, logEmail and
+logAuditAction). Same --seed, same data.
+
+Every seeded document carries `seeded: True` so --purge can remove them
+without touching real data.
+
+Usage (from the repository root):
+    python -m tests.seed --orders 1000000 --seed 42
+"""
+
+import argparse
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import BulkWriteError
+
+from tests.db import get_db
+
+# route.js inserts and assigns codes in `stock` (system-status counts `stocks`)
+STOCK_COLLECTION = 'stock'
+SEEDED_COLLECTIONS = ('users', 'orders', STOCK_COLLECTION, 'tickets', 'email_logs', 'audit_logs')
+
+# Same catalogue initializeDb() creates on an empty database
+DEFAULT_PRODUCTS = [
+    ('60 UC', 60, 25, 19.99, 20),
+    ('325 UC', 325, 100, 89.99, 10),
+    ('660 UC', 660, 200, 179.99, 10),
+    ('1800 UC', 1800, 500, 449.99, 10),
+    ('3850 UC', 3850, 1000, 899.99, 10),
+]
+
+FIRST_NAMES = ['Ahmet', 'Mehmet', 'Ayşe', 'Fatma', 'Mustafa', 'Emre', 'Zeynep', 'Elif', 'Burak', 'Can', 'Deniz', 'Ece']
+LAST_NAMES = ['Yılmaz', 'Kaya', 'Demir', 'Şahin', 'Çelik', 'Yıldız', 'Aydın', 'Öztürk', 'Arslan', 'Doğan']
+EMAIL_DOMAINS = ['gmail.com'] * 12 + ['hotmail.com'] * 5 + ['outlook.com'] * 3 + ['icloud.com', 'mailinator.com']
+TICKET_CATEGORIES = ['odeme', 'teslimat', 'hesap', 'diger']
+ASCII_NAMES = str.maketrans('çğıöşüÇĞİÖŞÜ', 'cgiosuCGIOSU')
+
+# Weighted order outcomes
+ORDER_STATUSES = ['paid'] * 72 + ['pending'] * 15 + ['failed'] * 10 + ['refunded'] * 2 + ['cancelled'] * 1
+RISK_REASONS = [
+    (25, 'Yeni hesap (1 saatten az)'),
+    (10, 'İlk sipariş'),
+    (15, 'Yüksek değerli sipariş'),
+    (20, "Aynı IP'den çok sayıda sipariş (son 1 saat)"),
+    (15, 'Çok sayıda farklı oyuncu ID kullanılmış'),
+    (30, 'Geçici e-posta sağlayıcısı'),
+]
+RISK_THRESHOLD = 40
+
+# Weighted logAuditAction calls: (action, entityType, actor)
+AUDIT_ACTIONS = (
+    [('user.login', 'user', 'user')] * 60
+    + [('user.login_failed', 'user', 'user')] * 15
+    + [('admin.login', 'user', 'admin')] * 8
+    + [('order.risk_flag', 'order', 'system')] * 8
+    + [('order.manual_approve', 'order', 'admin')] * 4
+    + [('order.manual_refund', 'order', 'admin')] * 1
+    + [('product.delete', 'product', 'admin')] * 1
+    + [('admin.login_failed', 'user', 'admin')] * 3
+)
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    'Mozilla/5.0 (Linux; Android 14) AppleWebKit/537.36 Chrome/120.0 Mobile Safari/537.36',
+]
+
+# Not a real bcrypt hash: seeded accounts are for data volume, not for login
+SEED_PASSWORD_HASH = '$2a$10$seededseededseededseedeuSEEDEDxxxxxxxxxxxxxxxxxxxxxxxxx'
+
+
+class Seeder:
+    def __init__(self, db, seed, end, days, batch_size):
+        self.db = db
+        self.rng = random.Random(seed)
+        self.end = end
+        self.start = end - timedelta(days=days)
+        self.batch_size = batch_size
+        self.buffers = defaultdict(list)
+        self.inserted = defaultdict(int)
+        self.users = []
+        self.products = []
+        self.order_ids = []
+
+    def new_id(self):
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def date_between(self, start, end):
+        span = (end - start).total_seconds()
+        return start + timedelta(seconds=self.rng.random() * max(span, 0))
+
+    def add(self, collection, doc):
+        doc['seeded'] = True
+        buffer = self.buffers[collection]
+        buffer.append(doc)
+        if len(buffer) >= self.batch_size:
+            self.flush(collection)
+
+    def flush(self, collection):
+        docs = self.buffers.pop(collection, [])
+        if not docs:
+            return
+        try:
+            result = self.db[collection].insert_many(docs, ordered=False)
+            self.inserted[collection] += len(result.inserted_ids)
+        except BulkWriteError as e:
+            self.inserted[collection] += e.details.get('nInserted', 0)
+
+    def flush_all(self):
+        for collection in list(self.buffers):
+            self.flush(collection)
+
+    def load_products(self):
+        products = list(self.db.products.find({}, {'_id': 0, 'id': 1, 'title': 1, 'discountPrice': 1, 'imageUrl': 1}))
+        if not products:
+            now = datetime.now(timezone.utc)
+            docs = [
+                {
+                    'id': self.new_id(), 'title': title, 'ucAmount': uc, 'price': price,
+                    'discountPrice': discount_price, 'discountPercent': percent,
+                    'active': True, 'sortOrder': i + 1, 'imageUrl': None, 'createdAt': now
+                }
+                for i, (title, uc, price, discount_price, percent) in enumerate(DEFAULT_PRODUCTS)
+            ]
+            self.db.products.insert_many(docs)
+            products = docs
+        self.products = products
+
+    def seed_users(self, count):
+        ip_pool = max(1, count // 3)  # some addresses are shared (families, cafes, bot farms)
+        for i in range(count):
+            first = self.rng.choice(FIRST_NAMES)
+            last = self.rng.choice(LAST_NAMES)
+            local_part = f"{first}.{last}".translate(ASCII_NAMES).lower()
+            email = f"{local_part}.{i}@{self.rng.choice(EMAIL_DOMAINS)}"
+            phone = f"5{self.rng.randrange(10**9):09d}"
+            created_at = self.date_between(self.start, self.end)
+            user = {
+                'id': self.new_id(),
+                'firstName': first,
+                'lastName': last,
+                'email': email,
+                'phone': phone,
+                'passwordHash': SEED_PASSWORD_HASH,
+                'createdAt': created_at,
+                'updatedAt': created_at
+            }
+            if self.rng.random() < 0.2:
+                user['authProvider'] = 'google'
+                user['googleId'] = str(self.rng.getrandbits(64))
+                user['phoneVerified'] = False
+            self.add('users', user)
+            ip = f"85.{(i % ip_pool) >> 16 & 255}.{(i % ip_pool) >> 8 & 255}.{(i % ip_pool) & 255}"
+            self.users.append((user['id'], first, last, email, phone, created_at, ip))
+            self.add('email_logs', self.email_log('welcome', user['id'], email, created_at))
+
+    def pick_user(self):
+        # Skewed: a few heavy buyers, a long tail of one-off customers
+        return self.users[min(len(self.users) - 1, int(len(self.users) * self.rng.random() ** 3))]
+
+    def email_log(self, email_type, user_id, to, created_at, order_id=None, ticket_id=None):
+        failed = self.rng.random() < 0.02
+        return {
+            'id': self.new_id(),
+            'type': email_type,
+            'userId': user_id,
+            'orderId': order_id,
+            'ticketId': ticket_id,
+            'to': to,
+            'status': 'failed' if failed else 'sent',
+            'error': 'Connection timeout' if failed else None,
+            'createdAt': created_at + timedelta(seconds=self.rng.uniform(0.2, 5))
+        }
+
+    def risk(self, order_amount, calculated_at):
+        score, reasons = 0, []
+        for points, reason in RISK_REASONS:
+            if self.rng.random() < 0.12:
+                score += points
+                reasons.append(reason)
+        if order_amount > 500:
+            score += 15
+            reasons.append(f"Yüksek değerli sipariş ({order_amount} TRY)")
+        return {
+            'score': min(score, 100),
+            'status': 'FLAGGED' if score >= RISK_THRESHOLD else 'CLEAR',
+            'reasons': reasons,
+            'calculatedAt': calculated_at
+        }
+
+    def seed_orders(self, count):
+        for i in range(count):
+            user_id, first, last, email, phone, user_created, ip = self.pick_user()
+            product = self.rng.choice(self.products)
+            created_at = self.date_between(user_created, self.end)
+            status = self.rng.choice(ORDER_STATUSES)
+            player_id = f"{self.rng.randrange(5_000_000_000, 5_999_999_999)}"
+            order = {
+                'id': self.new_id(),
+                'userId': user_id,
+                'productId': product['id'],
+                'productTitle': product['title'],
+                'productImageUrl': product.get('imageUrl'),
+                'playerId': player_id,
+                'playerName': f"Player#{player_id[-4:]}",
+                'customer': {'firstName': first, 'lastName': last, 'email': email, 'phone': phone},
+                'status': status,
+                'amount': product['discountPrice'],
+                'currency': 'TRY',
+                'createdAt': created_at,
+                'updatedAt': created_at
+            }
+            self.add('email_logs', self.email_log('order_created', user_id, email, created_at, order['id']))
+
+            if status in ('paid', 'refunded'):
+                paid_at = created_at + timedelta(seconds=self.rng.uniform(20, 600))
+                order['updatedAt'] = paid_at
+                order['risk'] = self.risk(order['amount'], paid_at)
+                order['meta'] = {'ip': ip}
+                self.add('email_logs', self.email_log('paid', user_id, email, paid_at, order['id']))
+                if order['risk']['status'] == 'FLAGGED':
+                    order['delivery'] = {
+                        'status': 'hold', 'message': 'Sipariş kontrol altında',
+                        'holdReason': 'risk_flagged', 'items': []
+                    }
+                elif self.rng.random() < 0.95:
+                    stock_id = self.new_id()
+                    code = f"UC-{self.rng.getrandbits(48):012X}"
+                    order['delivery'] = {
+                        'status': 'delivered', 'items': [code], 'stockId': stock_id, 'assignedAt': paid_at
+                    }
+                    self.add(STOCK_COLLECTION, {
+                        'id': stock_id, 'productId': product['id'], 'value': code,
+                        'status': 'assigned', 'orderId': order['id'],
+                        'createdAt': created_at - timedelta(days=self.rng.uniform(0, 30)),
+                        'createdBy': 'admin', 'assignedAt': paid_at
+                    })
+                    self.add('email_logs', self.email_log('delivered', user_id, email, paid_at, order['id']))
+                else:
+                    order['delivery'] = {'status': 'pending', 'message': 'Stok bekleniyor', 'items': []}
+                    self.add('email_logs', self.email_log('pending', user_id, email, paid_at, order['id']))
+            self.add('orders', order)
+            if len(self.order_ids) < 100_000:
+                self.order_ids.append(order['id'])
+
+            if (i + 1) % 100_000 == 0:
+                print(f"   ... {i + 1:,} orders generated")
+
+    def seed_available_stock(self, per_product):
+        for product in self.products:
+            for _ in range(per_product):
+                self.add(STOCK_COLLECTION, {
+                    'id': self.new_id(), 'productId': product['id'],
+                    'value': f"UC-{self.rng.getrandbits(48):012X}",
+                    'status': 'available', 'orderId': None,
+                    'createdAt': self.date_between(self.start, self.end), 'createdBy': 'admin'
+                })
+
+    def seed_tickets(self, count):
+        for _ in range(count):
+            user_id, _, _, email, _, user_created, _ = self.pick_user()
+            created_at = self.date_between(user_created, self.end)
+            status = self.rng.choice(['waiting_admin', 'waiting_user', 'waiting_user', 'closed', 'closed', 'closed'])
+            ticket = {
+                'id': self.new_id(),
+                'userId': user_id,
+                'subject': 'Sipariş teslimatı hakkında',
+                'category': self.rng.choice(TICKET_CATEGORIES),
+                'status': status,
+                'lastMessageBy': 'user' if status == 'waiting_admin' else 'admin',
+                'userCanReply': status == 'waiting_user',
+                'createdAt': created_at,
+                'updatedAt': created_at + timedelta(hours=self.rng.uniform(0, 48))
+            }
+            self.add('tickets', ticket)
+            if status != 'waiting_admin':
+                self.add('email_logs', self.email_log('support_reply', user_id, email, ticket['updatedAt'],
+                                                      ticket_id=ticket['id']))
+
+    def seed_audit_logs(self, count):
+        admin_id = self.new_id()
+        for i in range(count):
+            action, entity_type, actor = self.rng.choice(AUDIT_ACTIONS)
+            user_id, _, _, email, _, user_created, ip = self.pick_user()
+            if entity_type == 'order':
+                entity_id = self.rng.choice(self.order_ids) if self.order_ids else self.new_id()
+                meta = {'riskScore': self.rng.randrange(40, 100)} if action == 'order.risk_flag' else {}
+            elif entity_type == 'product':
+                entity_id = self.rng.choice(self.products)['id']
+                meta = {}
+            else:
+                entity_id = user_id
+                meta = {'email': email}
+            self.add('audit_logs', {
+                'id': self.new_id(),
+                'action': action,
+                'actorId': {'user': user_id, 'admin': admin_id, 'system': 'system'}[actor],
+                'entityType': entity_type,
+                'entityId': entity_id,
+                'ip': ip,
+                'userAgent': self.rng.choice(USER_AGENTS),
+                'meta': meta,
+                'createdAt': self.date_between(user_created, self.end),
+            })
+            if (i + 1) % 1_000_000 == 0:
+                print(f"   ... {i + 1:,} audit logs generated")
+
+
+def purge(db):
+    for collection in SEEDED_COLLECTIONS:
+        deleted = db[collection].delete_many({'seeded': True}).deleted_count
+        print(f"🧹 {collection}: removed {deleted:,} seeded documents")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-seed pubg_uc_store with synthetic data")
+    parser.add_argument("--orders", type=int, default=100_000, help="number of orders")
+    parser.add_argument("--users", type=int, default=None, help="number of users (default orders / 5)")
+    parser.add_argument("--tickets", type=int, default=None, help="number of tickets (default users / 10)")
+    parser.add_argument("--audit-logs", type=int, default=0, help="number of audit_logs rows")
+    parser.add_argument("--available-stock", type=int, default=1000, help="unassigned codes per product")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--days", type=int, default=180, help="history window ending now")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="insert_many batch size")
+    parser.add_argument("--db", default=None, help="database name (default DB_NAME env / pubg_uc_store)")
+    parser.add_argument("--purge", action="store_true", help="delete previously seeded documents first")
+    args = parser.parse_args(argv)
+
+    db = get_db(args.db)
+    if args.purge:
+        purge(db)
+
+    users = args.users if args.users is not None else max(1, args.orders // 5)
+    tickets = args.tickets if args.tickets is not None else users // 10
+
+    print(f"🌱 Seeding {db.name}: {users:,} users, {args.orders:,} orders, {tickets:,} tickets, "
+          f"{args.audit_logs:,} audit logs (seed {args.seed})")
+    start = time.perf_counter()
+    seeder = Seeder(db, args.seed, datetime.now(timezone.utc), args.days, args.batch_size)
+    seeder.load_products()
+    seeder.seed_users(users)
+    seeder.seed_orders(args.orders)
+    seeder.seed_available_stock(args.available_stock)
+    seeder.seed_tickets(tickets)
+    seeder.seed_audit_logs(args.audit_logs)
+    seeder.flush_all()
+    elapsed = time.perf_counter() - start
+
+    total = sum(seeder.inserted.values())
+    for collection in SEEDED_COLLECTIONS:
+        print(f"   {collection}: {seeder.inserted[collection]:,}")
+    print(f"✅ Inserted {total:,} documents in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} docs/sec)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
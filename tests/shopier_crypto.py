@@ -0,0 +1,237 @@
+"""
+Pure-Python port of lib/crypto.js
+
+- decrypt()/encrypt(): AES-256-GCM with the SHA-256 of MASTER_ENCRYPTION_KEY
+  as key and base64(iv[16] + ciphertext + tag[16]) as wire format, so the
+  encrypted Shopier credentials in `shopier_settings` can be read without
+  spawning node.
+- js_number(): JavaScript Number -> string conversion, i.e. what
+  `${order.amount}` produces inside generateShopierHash (20 -> "20",
+  19.99 -> "19.99", 1e21 -> "1e+21").
+- shopier_hash(): SHA256(orderId + amount + secret) exactly as the backend
+  computes it.
+
+Environment:
+    MASTER_ENCRYPTION_KEY   master key used by the Next.js app
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+from decimal import Decimal
+
+IV_LENGTH = 16
+AUTH_TAG_LENGTH = 16
+
+
+# ---------------------------------------------------------------------------
+# AES block cipher (encryption direction only, which is all GCM needs)
+# ---------------------------------------------------------------------------
+
+def _rotl8(x, shift):
+    return ((x << shift) | (x >> (8 - shift))) & 0xFF
+
+
+def _build_sbox():
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        # p *= 3 and q /= 3 in GF(2^8), so q is always p's inverse
+        p = p ^ ((p << 1) & 0xFF) ^ (0x1B if p & 0x80 else 0)
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xFF
+        if q & 0x80:
+            q ^= 0x09
+        sbox[p] = q ^ _rotl8(q, 1) ^ _rotl8(q, 2) ^ _rotl8(q, 3) ^ _rotl8(q, 4) ^ 0x63
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    return sbox
+
+
+SBOX = _build_sbox()
+XTIME = [((a << 1) ^ 0x1B) & 0xFF if a & 0x80 else a << 1 for a in range(256)]
+
+
+def _expand_key(key):
+    if len(key) != 32:
+        raise ValueError("AES-256 key must be 32 bytes")
+    words = [list(key[i:i + 4]) for i in range(0, 32, 4)]
+    rcon = 1
+    for i in range(8, 60):
+        temp = list(words[i - 1])
+        if i % 8 == 0:
+            temp = [SBOX[b] for b in temp[1:] + temp[:1]]
+            temp[0] ^= rcon
+            rcon = XTIME[rcon]
+        elif i % 8 == 4:
+            temp = [SBOX[b] for b in temp]
+        words.append([a ^ b for a, b in zip(words[i - 8], temp)])
+    return [sum(words[r * 4:r * 4 + 4], []) for r in range(15)]
+
+
+def _encrypt_block(round_keys, block):
+    state = [b ^ k for b, k in zip(block, round_keys[0])]
+    for rnd in range(1, 15):
+        s = [SBOX[b] for b in state]
+        # ShiftRows on the column-major state
+        s = [s[(i + 4 * (i % 4)) % 16] for i in range(16)]
+        if rnd != 14:
+            mixed = []
+            for c in range(0, 16, 4):
+                a0, a1, a2, a3 = s[c:c + 4]
+                total = a0 ^ a1 ^ a2 ^ a3
+                mixed += [a0 ^ total ^ XTIME[a0 ^ a1], a1 ^ total ^ XTIME[a1 ^ a2],
+                          a2 ^ total ^ XTIME[a2 ^ a3], a3 ^ total ^ XTIME[a3 ^ a0]]
+            s = mixed
+        state = [b ^ k for b, k in zip(s, round_keys[rnd])]
+    return bytes(state)
+
+
+# ---------------------------------------------------------------------------
+# GCM
+# ---------------------------------------------------------------------------
+
+_R = 0xE1 << 120
+
+
+def _gf_mult(x, y):
+    z = 0
+    for bit in range(127, -1, -1):
+        if (y >> bit) & 1:
+            z ^= x
+        x = (x >> 1) ^ _R if x & 1 else x >> 1
+    return z
+
+
+def _ghash(h, aad, data):
+    y = 0
+    for chunk in (aad, data):
+        for i in range(0, len(chunk), 16):
+            block = chunk[i:i + 16].ljust(16, b'\0')
+            y = _gf_mult(y ^ int.from_bytes(block, 'big'), h)
+    lengths = ((len(aad) * 8) << 64) | (len(data) * 8)
+    return _gf_mult(y ^ lengths, h)
+
+
+def _gctr(round_keys, counter, data):
+    out = bytearray()
+    prefix, count = counter[:12], int.from_bytes(counter[12:], 'big')
+    for i in range(0, len(data), 16):
+        keystream = _encrypt_block(round_keys, prefix + count.to_bytes(4, 'big'))
+        out += bytes(a ^ b for a, b in zip(data[i:i + 16], keystream))
+        count = (count + 1) & 0xFFFFFFFF
+    return bytes(out)
+
+
+def _gcm_setup(key, iv):
+    round_keys = _expand_key(key)
+    h = int.from_bytes(_encrypt_block(round_keys, bytes(16)), 'big')
+    if len(iv) == 12:
+        j0 = iv + b'\0\0\0\1'
+    else:
+        # Node's 16-byte IVs go through GHASH (NIST SP 800-38D 7.1)
+        j0 = _ghash(h, b'', iv).to_bytes(16, 'big')
+    return round_keys, h, j0
+
+
+def _inc32(block):
+    count = (int.from_bytes(block[12:], 'big') + 1) & 0xFFFFFFFF
+    return block[:12] + count.to_bytes(4, 'big')
+
+
+def aes_gcm_encrypt(key, iv, plaintext, aad=b''):
+    """-> (ciphertext, tag)"""
+    round_keys, h, j0 = _gcm_setup(key, iv)
+    ciphertext = _gctr(round_keys, _inc32(j0), plaintext)
+    tag = _gctr(round_keys, j0, _ghash(h, aad, ciphertext).to_bytes(16, 'big'))
+    return ciphertext, tag
+
+
+def aes_gcm_decrypt(key, iv, ciphertext, tag, aad=b''):
+    round_keys, h, j0 = _gcm_setup(key, iv)
+    expected = _gctr(round_keys, j0, _ghash(h, aad, ciphertext).to_bytes(16, 'big'))
+    if not hmac.compare_digest(expected, tag):
+        raise ValueError("Failed to decrypt data: authentication tag mismatch")
+    return _gctr(round_keys, _inc32(j0), ciphertext)
+
+
+# ---------------------------------------------------------------------------
+# lib/crypto.js equivalents
+# ---------------------------------------------------------------------------
+
+def master_key(secret=None):
+    """SHA-256 of MASTER_ENCRYPTION_KEY, as getMasterKey() does"""
+    secret = secret if secret is not None else os.getenv('MASTER_ENCRYPTION_KEY')
+    if not secret:
+        raise ValueError("MASTER_ENCRYPTION_KEY not found in environment variables")
+    return hashlib.sha256(secret.encode('utf-8')).digest()
+
+
+def encrypt(plaintext, key=None):
+    if not plaintext:
+        return None
+    iv = os.urandom(IV_LENGTH)
+    ciphertext, tag = aes_gcm_encrypt(key or master_key(), iv, plaintext.encode('utf-8'))
+    return base64.b64encode(iv + ciphertext + tag).decode('ascii')
+
+
+def decrypt(encrypted_data, key=None):
+    if not encrypted_data:
+        return None
+    combined = base64.b64decode(encrypted_data)
+    if len(combined) < IV_LENGTH + AUTH_TAG_LENGTH:
+        raise ValueError("Failed to decrypt data: input too short")
+    iv = combined[:IV_LENGTH]
+    tag = combined[-AUTH_TAG_LENGTH:]
+    ciphertext = combined[IV_LENGTH:-AUTH_TAG_LENGTH]
+    return aes_gcm_decrypt(key or master_key(), iv, ciphertext, tag).decode('utf-8')
+
+
+def js_number(value):
+    """String form of a value inside a JS template literal (Number::toString)"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, str):
+        return value
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return 'Infinity' if value > 0 else '-Infinity'
+    if value == 0:
+        return '0'
+    if value.is_integer() and abs(value) < 1e16:
+        return str(int(value))
+    text = repr(value)
+    if 'e' not in text:
+        # 1e-4 <= |value| < 1e16: Python and JS agree
+        return text
+    sign = '-' if value < 0 else ''
+    # repr() gives the same shortest round-trip digits as JS
+    _, digits, exponent = Decimal(repr(abs(value))).normalize().as_tuple()
+    digits = ''.join(map(str, digits))
+    k = len(digits)
+    n = k + exponent
+    if k <= n <= 21:
+        text = digits + '0' * (n - k)
+    elif 0 < n <= 21:
+        text = digits[:n] + '.' + digits[n:]
+    elif -6 < n <= 0:
+        text = '0.' + '0' * -n + digits
+    else:
+        e = n - 1
+        mantissa = digits if k == 1 else digits[0] + '.' + digits[1:]
+        text = f"{mantissa}e{'+' if e >= 0 else '-'}{abs(e)}"
+    return sign + text
+
+
+def shopier_hash(order_id, amount, secret):
+    """generateShopierHash(orderId, amount, secret)"""
+    data = f"{order_id}{js_number(amount)}{secret}"
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
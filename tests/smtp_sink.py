@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Local SMTP sink for the email pipeline tests (aiosmtpd)
+
+Accepts everything route.js's nodemailer transporter sends, classifies each
+message by subject into the email_logs types (welcome, order_created,
+paid, delivered, pending, support_reply, password_changed, test) and
+records arrival time, recipient and how long the DATA phase took. Slowness
+(--mail-delay-ms before MAIL FROM is answered, --data-delay-ms before the
+message is acknowledged) and failures (--fail-rate answered with
+--fail-code) can be injected.
+
+`--configure` points the app's email settings at the sink for the run and
+restores the previous email_settings document afterwards.
+`--register-burst N` / `--orders N` then drive registrations and paid
+orders and report end-to-end latency per email type plus throughput.
+
+Usage (from the repository root):
+    python -m tests.smtp_sink                                  # just listen and log
+    python -m tests.smtp_sink --configure --register-burst 30
+    python -m tests.smtp_sink --configure --orders 10 --data-delay-ms 500 --fail-rate 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from email import message_from_bytes, policy
+
+from aiosmtpd.controller import Controller
+
+from tests.latency import summarize, format_summary
+
+# Subject prefixes of the send*Email helpers in route.js
+SUBJECT_TYPES = [
+    ("Hoş geldin", "welcome"),
+    ("Siparişiniz alındı", "order_created"),
+    ("Ödemeniz alındı", "paid"),
+    ("Teslimat tamamlandı", "delivered"),
+    ("Stok bekleniyor", "pending"),
+    ("Destek talebinize yanıt var", "support_reply"),
+    ("Şifreniz değiştirildi", "password_changed"),
+    ("🧪 Test E-postası", "test"),
+]
+
+SINK_PASSWORD = "sink"
+
+
+def email_type(subject):
+    for prefix, kind in SUBJECT_TYPES:
+        if subject.startswith(prefix):
+            return kind
+    return "other"
+
+
+class SinkConfig:
+    def __init__(self, mail_delay_ms=0.0, data_delay_ms=0.0, fail_rate=0.0, fail_code=451, seed=None):
+        self.mail_delay_ms = mail_delay_ms
+        self.data_delay_ms = data_delay_ms
+        self.fail_rate = fail_rate
+        self.fail_code = fail_code
+        self.seed = seed
+
+
+class SinkMessage:
+    __slots__ = ('type', 'to', 'subject', 'session_started', 'data_started', 'arrived', 'accepted')
+
+    def __init__(self, kind, to, subject, session_started, data_started, arrived, accepted):
+        self.type = kind
+        self.to = to
+        self.subject = subject
+        self.session_started = session_started
+        self.data_started = data_started
+        self.arrived = arrived
+        self.accepted = accepted
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SinkHandler:
+    """aiosmtpd handler; timestamps are time.time() so other processes can compare"""
+
+    def __init__(self, config, on_message):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.on_message = on_message
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        session.sink_started = time.time()
+        if self.config.mail_delay_ms:
+            await asyncio.sleep(self.config.mail_delay_ms / 1000)
+        envelope.mail_from = address
+        envelope.mail_options.extend(mail_options)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        data_started = time.time()
+        if self.config.data_delay_ms:
+            await asyncio.sleep(self.config.data_delay_ms / 1000)
+        message = message_from_bytes(envelope.content, policy=policy.default)
+        subject = str(message.get('Subject', ''))
+        accepted = self.rng.random() >= self.config.fail_rate
+        for rcpt in envelope.rcpt_tos:
+            self.on_message(SinkMessage(
+                email_type(subject), rcpt.lower(), subject,
+                getattr(session, 'sink_started', data_started), data_started, time.time(), accepted
+            ))
+        if not accepted:
+            return f'{self.config.fail_code} Injected failure'
+        return '250 Message accepted'
+
+
+class SmtpSink:
+    """Runs the aiosmtpd controller in its own thread and collects messages"""
+
+    def __init__(self, config, host='127.0.0.1', port=2525, log_path=None, verbose=True):
+        self.messages = []
+        self.condition = threading.Condition()
+        self.log_file = open(log_path, 'a') if log_path else None
+        self.verbose = verbose
+        self.config = config
+        self.controller = Controller(SinkHandler(config, self._record), hostname=host, port=port)
+
+    def _record(self, message):
+        with self.condition:
+            self.messages.append(message)
+            self.condition.notify_all()
+        if self.log_file:
+            self.log_file.write(json.dumps(message.as_dict(), ensure_ascii=False) + '\n')
+            self.log_file.flush()
+        if self.verbose:
+            icon = "📨" if message.accepted else "💥"
+            print(f"{icon} {message.type:<16} {message.to:<40} {message.subject[:50]}")
+
+    def start(self):
+        self.controller.start()
+        return self
+
+    def stop(self):
+        self.controller.stop()
+        if self.log_file:
+            self.log_file.close()
+
+    def wait_for(self, predicate, count, timeout):
+        """Wait until `count` recorded messages satisfy `predicate`"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                matched = [m for m in self.messages if predicate(m)]
+                remaining = deadline - time.monotonic()
+                if len(matched) >= count or remaining <= 0:
+                    return matched
+                self.condition.wait(remaining)
+
+
+# ---------------------------------------------------------------------------
+# App wiring and scenarios
+# ---------------------------------------------------------------------------
+
+class EmailSettingsOverride:
+    """Point email_settings at the sink; restore the original document on exit"""
+
+    def __init__(self, host, port, enabled=True):
+        self.host = host
+        self.port = port
+        self.enabled = enabled
+        self.original = None
+
+    def __enter__(self):
+        from tests.db import get_db
+        from tests.shopier_crypto import encrypt
+
+        self.collection = get_db().email_settings
+        self.original = self.collection.find_one({'id': 'main'})
+        self.collection.update_one({'id': 'main'}, {'$set': {
+            'id': 'main', 'enableEmail': self.enabled, 'fromName': 'PINLY Test', 'fromEmail': 'noreply@example.com',
+            'smtpHost': self.host, 'smtpPort': str(self.port), 'smtpSecure': False,
+            'smtpUser': 'sink', 'smtpPass': encrypt(SINK_PASSWORD), 'testRecipientEmail': 'sink@example.com',
+        }}, upsert=True)
+        if self.enabled:
+            print(f"✅ email_settings point at smtp://{self.host}:{self.port}")
+        else:
+            print("✅ email_settings disabled (enableEmail: false)")
+        return self
+
+    def __exit__(self, *exc):
+        if self.original is None:
+            self.collection.delete_one({'id': 'main'})
+        else:
+            self.collection.replace_one({'id': 'main'}, self.original)
+        print("✅ email_settings restored")
+
+
+class Expectations:
+    """Emails a scenario expects, keyed by (type, recipient), with trigger time"""
+
+    def __init__(self):
+        self.triggered = {}
+
+    def expect(self, kind, recipient, triggered_at):
+        self.triggered[(kind, recipient.lower())] = triggered_at
+
+    def latencies(self, messages):
+        per_type = defaultdict(list)
+        seen = set()
+        for message in messages:
+            key = (message.type, message.to)
+            if key in self.triggered and key not in seen:
+                seen.add(key)
+                per_type[message.type].append(message.arrived - self.triggered[key])
+        missing = defaultdict(int)
+        for kind, recipient in self.triggered:
+            if (kind, recipient) not in seen:
+                missing[kind] += 1
+        return per_type, missing
+
+
+async def register_burst(count, expectations):
+    from tests.callback_load import fake_ip
+    from tests.http_client import create_async_client
+    from callback_test import BASE_URL
+
+    async def register(client, index):
+        email = f"sink.{uuid.uuid4().hex[:12]}@example.com"
+        expectations.expect('welcome', email, time.time())
+        response = await client.post(f"{BASE_URL}/auth/register", json={
+            "firstName": "Sink", "lastName": f"User{index}", "email": email,
+            "phone": "5551234567", "password": "sinktest123"
+        }, headers={"X-Forwarded-For": fake_ip(100000 + index)})
+        return response.status_code
+
+    async with create_async_client(pool_size=max(count, 1)) as client:
+        statuses = await asyncio.gather(*(register(client, i) for i in range(count)))
+    return statuses
+
+
+async def paid_orders(count, expectations):
+    import callback_test
+    from callback_test import BASE_URL, TEST_SHOPIER_API_SECRET, generate_shopier_hash
+    from tests.callback_load import CALLBACK_PATH, fake_ip
+    from tests.http_client import create_async_client
+
+    async def order_and_pay(client, index):
+        ip = fake_ip(200000 + index)
+        email = f"sink.{uuid.uuid4().hex[:12]}@example.com"
+        response = await client.post(f"{BASE_URL}/auth/register", json={
+            "firstName": "Sink", "lastName": f"Buyer{index}", "email": email,
+            "phone": "5551234567", "password": "sinktest123"
+        }, headers={"X-Forwarded-For": ip})
+        if response.status_code != 200:
+            return response.status_code
+        token = response.json()['data']['token']
+        expectations.expect('order_created', email, time.time())
+        response = await client.post(f"{BASE_URL}/orders", json={
+            "productId": callback_test.test_product_id, "playerId": f"{7000000000 + index}",
+            "playerName": f"SinkTest#{index:04d}"
+        }, headers={"Authorization": f"Bearer {token}", "X-Forwarded-For": ip})
+        if response.status_code != 200:
+            return response.status_code
+        order = response.json()['data']['order']
+        now = time.time()
+        for kind in ('paid', 'delivered', 'pending'):
+            expectations.expect(kind, email, now)
+        response = await client.post(f"{BASE_URL}{CALLBACK_PATH}", json={
+            "orderId": order['id'], "platform_order_id": order['id'], "status": "success",
+            "transactionId": f"TXN_SINK_{uuid.uuid4().hex}", "random_nr": uuid.uuid4().hex[:16],
+            "total_order_value": str(order['amount']),
+            "hash": generate_shopier_hash(order['id'], order['amount'], TEST_SHOPIER_API_SECRET)
+        }, headers={"X-Forwarded-For": ip})
+        return response.status_code
+
+    if not callback_test.setup():
+        return []
+    async with create_async_client(pool_size=max(count, 1)) as client:
+        return await asyncio.gather(*(order_and_pay(client, i) for i in range(count)))
+
+
+def print_report(sink, expectations, started):
+    messages = list(sink.messages)
+    per_type, missing = expectations.latencies(messages)
+    print("\n" + "=" * 80)
+    print("EMAIL PIPELINE RESULTS")
+    print("=" * 80)
+    for kind in sorted(per_type):
+        print(format_summary(f"{kind} (trigger -> sink)", summarize(per_type[kind])))
+    data = [m.arrived - m.data_started for m in messages]
+    print(format_summary("DATA phase", summarize(data)))
+    # delivered and pending are alternatives, so only one of them ever arrives per order
+    for kind in sorted(missing):
+        if kind not in ('delivered', 'pending'):
+            print(f"⚠️  {missing[kind]} expected {kind} email(s) never arrived")
+    if messages:
+        span = max(m.arrived for m in messages) - started
+        print(f"\n{len(messages)} messages ({sum(not m.accepted for m in messages)} rejected by injection) "
+              f"in {span:.1f}s -> {len(messages) / span if span > 0 else 0:.1f} emails/s")
+    print("=" * 80)
+
+
+def add_sink_arguments(parser):
+    group = parser.add_argument_group("SMTP sink")
+    group.add_argument('--smtp-host', default='127.0.0.1')
+    group.add_argument('--smtp-port', type=int, default=2525)
+    group.add_argument('--mail-delay-ms', type=float, default=0.0, help="delay before answering MAIL FROM")
+    group.add_argument('--data-delay-ms', type=float, default=0.0, help="delay before acknowledging DATA")
+    group.add_argument('--fail-rate', type=float, default=0.0, help="fraction of messages rejected")
+    group.add_argument('--fail-code', type=int, default=451, help="SMTP code for injected failures")
+    group.add_argument('--sink-seed', type=int, default=None)
+
+
+def config_from_args(args):
+    return SinkConfig(args.mail_delay_ms, args.data_delay_ms, args.fail_rate, args.fail_code, args.sink_seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local SMTP sink for the email pipeline")
+    add_sink_arguments(parser)
+    parser.add_argument('--log', default=None, help="append every message as JSON lines to this file")
+    parser.add_argument('--configure', action='store_true', help="point email_settings at the sink for this run")
+    parser.add_argument('--register-burst', type=int, default=0, help="register N users at once")
+    parser.add_argument('--orders', type=int, default=0, help="create and pay N orders")
+    parser.add_argument('--wait', type=float, default=30.0, help="seconds to wait for expected emails")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    sink = SmtpSink(config_from_args(args), args.smtp_host, args.smtp_port, args.log, not args.quiet).start()
+    print(f"📬 SMTP sink on {args.smtp_host}:{args.smtp_port}")
+    try:
+        if not (args.register_burst or args.orders):
+            if args.configure:
+                with EmailSettingsOverride(args.smtp_host, args.smtp_port):
+                    _serve_forever()
+            else:
+                _serve_forever()
+            return 0
+
+        with EmailSettingsOverride(args.smtp_host, args.smtp_port):
+            expectations = Expectations()
+            started = time.time()
+            if args.register_burst:
+                statuses = asyncio.run(register_burst(args.register_burst, expectations))
+                print(f"Registrations: {statuses.count(200)}/{len(statuses)} succeeded")
+            if args.orders:
+                statuses = asyncio.run(paid_orders(args.orders, expectations))
+                print(f"Paid callbacks: {statuses.count(200)}/{len(statuses)} succeeded")
+            expected = len([k for k in expectations.triggered if k[0] not in ('delivered', 'pending')])
+            sink.wait_for(lambda m: m.type not in ('delivered', 'pending', 'other'), expected, args.wait)
+            print_report(sink, expectations, started)
+    finally:
+        sink.stop()
+    return 0
+
+
+def _serve_forever():
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
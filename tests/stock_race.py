@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Stock-assignment race harness for paid Shopier callbacks
+
+Builds on the callback_test.py setup (admin token, Shopier settings,
+signed callbacks as in test_immutable_status_transitions):
+
+1. creates a throwaway inactive product and loads N codes through
+   POST /api/admin/products/{id}/stock
+2. registers buyers and creates M pending orders for it
+3. releases all M signed success callbacks at once (each one sent
+   --duplicates times, to also race the "already paid" check)
+4. checks Mongo: exactly min(N, M) codes assigned, no code on two orders,
+   no order holding two codes, no paid order left pending while codes
+   are still available
+5. reports assignment throughput and callback tail latency
+
+Every order gets its own buyer and X-Forwarded-For address so
+calculateOrderRisk scores it CLEAR (new account + first order = 35 < 40);
+FLAGGED orders are held without stock and are excluded from min(N, M).
+
+Stock lives in the `stock` collection in route.js (both the admin add
+endpoint and the callback use it), so that is what gets checked.
+
+Usage (from the repository root):
+    python -m tests.stock_race --codes 50 --orders 80
+    python callback_test.py --race --codes 100 --orders 100 --duplicates 3
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+import callback_test
+from callback_test import BASE_URL, TEST_SHOPIER_API_SECRET, generate_shopier_hash
+from tests.callback_load import CALLBACK_PATH, register_user
+from tests.db import get_db
+from tests.http_client import create_async_client
+from tests.latency import summarize, format_summary
+from tests.seed import STOCK_COLLECTION
+
+# Keep the amount under the 250 TRY risk bump
+RACE_PRODUCT_PRICE = 19.99
+STOCK_CHUNK = 500
+
+
+class RaceRun:
+    def __init__(self, codes, orders, duplicates):
+        self.run_id = uuid.uuid4().hex[:8]
+        self.codes = codes
+        self.orders = orders
+        self.duplicates = duplicates
+        self.product_id = None
+        self.order_ids = []
+        self.callback_latencies = []
+        self.status_counts = Counter()
+        self.errors = 0
+        self.burst_seconds = 0.0
+
+
+def admin_headers():
+    return {"Authorization": f"Bearer {callback_test.admin_token}"}
+
+
+async def create_product(client, run):
+    response = await client.post(f"{BASE_URL}/admin/products", headers=admin_headers(), json={
+        "title": f"Stock Race {run.run_id}",
+        "ucAmount": 60,
+        "price": 25,
+        "discountPrice": RACE_PRODUCT_PRICE,
+        "discountPercent": 20,
+        "active": False,
+        "sortOrder": 9999,
+        "imageUrl": None,
+    })
+    if response.status_code != 200:
+        print(f"❌ Could not create race product: {response.status_code} {response.text}")
+        return False
+    run.product_id = response.json()['data']['id']
+    print(f"✅ Created race product {run.product_id}")
+    return True
+
+
+async def load_codes(client, run):
+    codes = [f"RACE-{run.run_id}-{i:06d}" for i in range(run.codes)]
+    for start in range(0, len(codes), STOCK_CHUNK):
+        response = await client.post(
+            f"{BASE_URL}/admin/products/{run.product_id}/stock",
+            headers=admin_headers(),
+            json={"items": codes[start:start + STOCK_CHUNK]}
+        )
+        if response.status_code != 200:
+            print(f"❌ Stock upload failed: {response.status_code} {response.text}")
+            return False
+    print(f"✅ Loaded {len(codes)} codes")
+    return True
+
+
+async def create_order(client, semaphore, run, index, ip_offset):
+    async with semaphore:
+        user = await register_user(client, ip_offset + index)
+        if not user:
+            return None
+        token, ip = user
+        response = await client.post(
+            f"{BASE_URL}/orders",
+            json={"productId": run.product_id, "playerId": f"{6000000000 + index}",
+                  "playerName": f"RaceTest#{index:04d}"},
+            headers={"Authorization": f"Bearer {token}", "X-Forwarded-For": ip}
+        )
+        if response.status_code != 200:
+            return None
+        order = response.json()['data']['order']
+        return order['id'], order['amount'], ip
+
+
+async def send_callback(client, gate, run, order_id, amount, ip, attempt):
+    payload = {
+        "orderId": order_id,
+        "platform_order_id": order_id,
+        "status": "success",
+        "transactionId": f"TXN_RACE_{order_id}_{attempt}",
+        "random_nr": uuid.uuid4().hex[:16],
+        "total_order_value": str(amount),
+        "hash": generate_shopier_hash(order_id, amount, TEST_SHOPIER_API_SECRET)
+    }
+    await gate.wait()
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"{BASE_URL}{CALLBACK_PATH}", json=payload,
+                                     headers={"X-Forwarded-For": ip})
+        run.status_counts[response.status_code] += 1
+    except httpx.HTTPError:
+        run.errors += 1
+        return
+    run.callback_latencies.append(time.perf_counter() - start)
+
+
+async def race(run, concurrency, timeout):
+    async with create_async_client(timeout=timeout, pool_size=concurrency) as client:
+        if not await create_product(client, run) or not await load_codes(client, run):
+            return False
+
+        semaphore = asyncio.Semaphore(concurrency)
+        ip_offset = random.randrange(1 << 20)
+        orders = await asyncio.gather(*(
+            create_order(client, semaphore, run, i, ip_offset) for i in range(run.orders)
+        ))
+        orders = [o for o in orders if o]
+        run.order_ids = [order_id for order_id, _, _ in orders]
+        print(f"✅ Created {len(orders)}/{run.orders} pending orders")
+        if not orders:
+            return False
+
+        # All callbacks wait on one gate so they hit the server together
+        gate = asyncio.Event()
+        tasks = [
+            asyncio.create_task(send_callback(client, gate, run, order_id, amount, ip, attempt))
+            for order_id, amount, ip in orders
+            for attempt in range(run.duplicates)
+        ]
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        gate.set()
+        await asyncio.gather(*tasks)
+        run.burst_seconds = time.perf_counter() - start
+    return True
+
+
+def verify(db, run):
+    """List of problems found in Mongo, plus stats for the report"""
+    problems = []
+    orders = list(db.orders.find({"id": {"$in": run.order_ids}},
+                                 {"_id": 0, "id": 1, "status": 1, "risk.status": 1, "delivery": 1}))
+    stock = list(db[STOCK_COLLECTION].find({"productId": run.product_id},
+                                           {"_id": 0, "value": 1, "status": 1, "orderId": 1, "assignedAt": 1}))
+
+    assigned = [s for s in stock if s.get("status") == "assigned"]
+    available = sum(1 for s in stock if s.get("status") == "available")
+    paid_clear = [o for o in orders if o.get("status") == "paid" and (o.get("risk") or {}).get("status") == "CLEAR"]
+    flagged = sum(1 for o in orders if (o.get("risk") or {}).get("status") == "FLAGGED")
+    expected = min(run.codes, len(paid_clear))
+
+    if len(assigned) != expected:
+        problems.append(f"{len(assigned)} codes assigned, expected min({run.codes}, {len(paid_clear)}) = {expected}")
+
+    per_order = Counter(s.get("orderId") for s in assigned)
+    for order_id, count in per_order.items():
+        if count > 1:
+            problems.append(f"order {order_id} holds {count} stock documents")
+
+    delivered = Counter()
+    stock_owner = {s["value"]: s.get("orderId") for s in assigned}
+    for order in orders:
+        items = (order.get("delivery") or {}).get("items") or []
+        for code in items:
+            delivered[code] += 1
+            if stock_owner.get(code) != order["id"]:
+                problems.append(f"order {order['id']} shows code {code} owned by {stock_owner.get(code)}")
+    for code, count in delivered.items():
+        if count > 1:
+            problems.append(f"code {code} delivered to {count} orders")
+
+    stalled = [o["id"] for o in paid_clear if not (o.get("delivery") or {}).get("items")]
+    if stalled and available:
+        problems.append(f"{len(stalled)} paid orders undelivered while {available} codes are still available")
+
+    payments = Counter(p["orderId"] for p in db.payments.find({"orderId": {"$in": run.order_ids}},
+                                                              {"_id": 0, "orderId": 1}))
+    double_paid = sum(1 for count in payments.values() if count > 1)
+    if double_paid:
+        problems.append(f"{double_paid} orders have more than one payment record")
+
+    times = sorted(s["assignedAt"] for s in assigned if s.get("assignedAt"))
+    span = (times[-1] - times[0]).total_seconds() if len(times) > 1 else 0.0
+    stats = {"assigned": len(assigned), "available": available, "paid_clear": len(paid_clear),
+             "flagged": flagged, "expected": expected, "assign_span": span}
+    return problems, stats
+
+
+def cleanup(db, run):
+    if run.product_id:
+        db[STOCK_COLLECTION].delete_many({"productId": run.product_id})
+        db.products.delete_one({"id": run.product_id})
+
+
+def print_report(run, problems, stats):
+    print("\n" + "=" * 80)
+    print("STOCK ASSIGNMENT RACE RESULTS")
+    print("=" * 80)
+    print(f"Codes: {run.codes}, orders: {len(run.order_ids)}, callbacks per order: {run.duplicates}")
+    print(f"Paid CLEAR: {stats['paid_clear']}, FLAGGED: {stats['flagged']}, "
+          f"assigned: {stats['assigned']} (expected {stats['expected']}), still available: {stats['available']}")
+    print(format_summary(f"POST {CALLBACK_PATH}", summarize(run.callback_latencies)))
+    print(f"Status codes: {dict(sorted(run.status_counts.items()))}, client errors: {run.errors}")
+    if run.burst_seconds > 0:
+        print(f"Burst wall time: {run.burst_seconds:.2f}s -> {stats['assigned'] / run.burst_seconds:.1f} assignments/s")
+    if stats['assign_span'] > 0:
+        print(f"Server assignedAt span: {stats['assign_span']:.2f}s -> "
+              f"{stats['assigned'] / stats['assign_span']:.1f} assignments/s")
+
+    if problems:
+        print(f"\n❌ {len(problems)} problem(s):")
+        for problem in problems[:50]:
+            print(f"   - {problem}")
+    else:
+        print("\n✅ Exactly min(N, M) codes assigned, no duplicates")
+    print("=" * 80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Race concurrent paid callbacks over a fixed stock")
+    parser.add_argument("--codes", type=int, default=50, help="N stock codes to load")
+    parser.add_argument("--orders", type=int, default=80, help="M orders / concurrent callbacks")
+    parser.add_argument("--duplicates", type=int, default=1, help="times each callback is sent concurrently")
+    parser.add_argument("--concurrency", type=int, default=100, help="max in-flight setup requests")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--keep", action="store_true", help="keep the race product and its stock")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 80)
+    print("STOCK ASSIGNMENT RACE")
+    print("=" * 80)
+    if not callback_test.setup():
+        print("Setup failed!")
+        return 1
+
+    run = RaceRun(args.codes, args.orders, args.duplicates)
+    db = get_db()
+    try:
+        if not asyncio.run(race(run, args.concurrency, args.timeout)):
+            return 1
+        problems, stats = verify(db, run)
+        print_report(run, problems, stats)
+    finally:
+        if not args.keep:
+            cleanup(db, run)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
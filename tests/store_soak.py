@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Soak test for the in-memory rateLimitStore / bruteForceStore Maps
+
+route.js never evicts entries from either Map: every new X-Forwarded-For
+IP adds a rateLimitStore key (per pathname) and every failed login adds a
+bruteForceStore key per (email, IP). This tool keeps sending requests from
+fresh synthetic identities and samples the Next.js server while it runs:
+
+    --mode ip        POST /api/auth/login with an empty body from a new IP
+                     each time: one rateLimitStore key, answered 400
+    --mode identity  failed login for a new email from a new IP: one
+                     rateLimitStore + one bruteForceStore key (and one
+                     user.login_failed audit_logs row, removed by --cleanup)
+
+Every --sample-interval seconds it records the server's RSS (from /proc,
+so the app must run on this machine), GET /api/health latency and the
+latency of a login answered 429 (one fixed IP is pushed over its limit
+first), and finally fits RSS against keys created to get bytes per key
+and how long a node lasts at --bot-rate new identities per second before
+reaching --memory-limit-mb.
+
+Usage (from the repository root):
+    python -m tests.store_soak --keys 1000000 --rate 500
+    python -m tests.store_soak --mode identity --duration 3600 --csv soak.csv --cleanup
+"""
+
+import argparse
+import asyncio
+import csv
+import ipaddress
+import os
+import random
+import re
+import sys
+import time
+
+import httpx
+
+from callback_test import BASE_URL
+from tests.http_client import create_async_client
+from tests.latency import summarize, format_summary
+from tests.rate_limits import limit_for, load_limits
+
+SOAK_EMAIL_DOMAIN = "soak.invalid"
+# Public range so synthetic IPs never collide with the 10.x fake_ip() clients
+IP_BASE = int(ipaddress.IPv4Address('100.0.0.0'))
+IP_SPAN = 1 << 26
+# Fixed IP the sampler keeps over its login limit for the 429 latency probe
+LIMITED_IP = "192.0.2.1"
+NEXT_COMMAND = re.compile(r'(^|/)next(\.js)? (dev|start)\b')
+
+
+def find_server_pid():
+    """PID of the Next.js server process (largest RSS among next processes)"""
+    candidates = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(errors='replace')
+        except OSError:
+            continue
+        if 'next-server' in cmdline or NEXT_COMMAND.search(cmdline):
+            candidates.append((read_rss(int(entry)) or 0, int(entry)))
+    return max(candidates)[1] if candidates else None
+
+
+def read_rss(pid):
+    """Resident set size in bytes, or None if the process is gone"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class Sample:
+    __slots__ = ('elapsed', 'keys', 'rss', 'health_ms', 'limited_ms', 'errors')
+
+    def __init__(self, elapsed, keys, rss, health_ms, limited_ms, errors):
+        self.elapsed = elapsed
+        self.keys = keys
+        self.rss = rss
+        self.health_ms = health_ms
+        self.limited_ms = limited_ms
+        self.errors = errors
+
+
+class Soak:
+    def __init__(self, args):
+        self.args = args
+        self.ip_start = random.randrange(IP_SPAN - max(args.keys, 1))
+        self.sent = 0
+        self.errors = 0
+        self.latencies = []
+        self.samples = []
+        row = limit_for('/api/auth/login', load_limits())
+        self.login_limit = row['limit'] if row else 5
+
+    def identity(self, index):
+        ip = str(ipaddress.IPv4Address(IP_BASE + self.ip_start + index))
+        if self.args.mode == 'identity':
+            return ip, {"email": f"soak{self.ip_start + index}@{SOAK_EMAIL_DOMAIN}", "password": "x"}
+        return ip, {}
+
+    async def send(self, client, semaphore, index):
+        ip, body = self.identity(index)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await client.post(f"{BASE_URL}/auth/login", json=body, headers={"X-Forwarded-For": ip})
+                self.latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                self.errors += 1
+            self.sent += 1
+
+    async def traffic(self, client, deadline):
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        pending = set()
+        interval = 1 / self.args.rate
+        next_at = time.monotonic()
+        for index in range(self.args.keys):
+            if time.monotonic() > deadline:
+                break
+            task = asyncio.create_task(self.send(client, semaphore, index))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        await asyncio.gather(*pending)
+
+    async def probe(self, client, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            await client.request(kwargs.pop('method', 'GET'), f"{BASE_URL}{path}", **kwargs)
+        except httpx.HTTPError:
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    async def limited_probe(self, client):
+        """Latency of a 429 login, pushing LIMITED_IP over its limit first; None if no 429 came back"""
+        headers = {"X-Forwarded-For": LIMITED_IP}
+        for _ in range(self.login_limit + 1):
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"{BASE_URL}/auth/login", json={}, headers=headers)
+            except httpx.HTTPError:
+                return None
+            if response.status_code == 429:
+                return (time.perf_counter() - started) * 1000
+        return None
+
+    async def sampler(self, client, pid, started, done):
+        while True:
+            rss = read_rss(pid) if pid else None
+            health = await self.probe(client, "/health")
+            limited_ms = await self.limited_probe(client)
+            self.samples.append(Sample(time.monotonic() - started, self.sent, rss, health, limited_ms, self.errors))
+            s = self.samples[-1]
+            print(f"⏱️  {s.elapsed:7.0f}s  keys={s.keys:>9}  "
+                  f"rss={(s.rss or 0) / 2**20:8.1f}MB  health={s.health_ms or 0:7.1f}ms  "
+                  f"limited={s.limited_ms or 0:7.1f}ms  errors={s.errors}")
+            if done.is_set():
+                return
+            try:
+                await asyncio.wait_for(done.wait(), self.args.sample_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, pid):
+        started = time.monotonic()
+        deadline = started + self.args.duration if self.args.duration else float('inf')
+        done = asyncio.Event()
+        async with create_async_client(retries=0, pool_size=self.args.concurrency + 2) as client:
+            sampler = asyncio.create_task(self.sampler(client, pid, started, done))
+            await self.traffic(client, deadline)
+            # Let GC settle before the final sample
+            await asyncio.sleep(self.args.settle)
+            done.set()
+            await sampler
+
+
+def fit_bytes_per_key(samples):
+    """Least-squares slope of RSS over keys sent -> (bytes per key, intercept)"""
+    points = [(s.keys, s.rss) for s in samples if s.rss is not None]
+    if len(points) < 2:
+        return None, None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var:
+        return None, None
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+    return slope, mean_y - slope * mean_x
+
+
+def print_report(soak, args):
+    samples = soak.samples
+    print("\n" + "=" * 80)
+    print(f"STORE SOAK RESULTS ({args.mode} mode)")
+    print("=" * 80)
+    print(format_summary("POST /auth/login (new key)", summarize(soak.latencies)))
+    print(f"Keys sent: {soak.sent}, client errors: {soak.errors}")
+
+    # Latency drift: first vs last quarter of samples
+    quarter = max(1, len(samples) // 4)
+    for name, attr in (("GET /health", 'health_ms'), ("rate-limited login", 'limited_ms')):
+        head = [getattr(s, attr) for s in samples[:quarter] if getattr(s, attr) is not None]
+        tail = [getattr(s, attr) for s in samples[-quarter:] if getattr(s, attr) is not None]
+        if head and tail:
+            print(f"{name:<28} first quarter {sum(head) / len(head):7.1f}ms -> "
+                  f"last quarter {sum(tail) / len(tail):7.1f}ms")
+
+    slope, intercept = fit_bytes_per_key(samples)
+    if slope is None:
+        print("⚠️  No RSS samples - run on the app host or pass --pid")
+    else:
+        keys_per_entry = 2 if args.mode == 'identity' else 1
+        print(f"\nRSS growth: {slope:,.0f} bytes per identity "
+              f"(~{slope / keys_per_entry:,.0f} bytes per Map entry), baseline {intercept / 2**20:.0f}MB")
+        last = next(s.rss for s in reversed(samples) if s.rss is not None)
+        headroom = args.memory_limit_mb * 2**20 - last
+        if slope > 0 and headroom > 0:
+            hours = headroom / slope / args.bot_rate / 3600
+            print(f"At {args.bot_rate:g} new identities/s a node reaches {args.memory_limit_mb}MB "
+                  f"in ~{hours:,.1f} hours ({hours / 24:,.1f} days)")
+        elif headroom <= 0:
+            print(f"⚠️  RSS already above --memory-limit-mb {args.memory_limit_mb}")
+    print("=" * 80)
+
+
+def write_csv(path, samples):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['elapsed_s', 'keys', 'rss_bytes', 'health_ms', 'limited_ms', 'errors'])
+        for s in samples:
+            writer.writerow([round(s.elapsed, 2), s.keys, s.rss, s.health_ms, s.limited_ms, s.errors])
+    print(f"💾 Growth curve written to {path}")
+
+
+def cleanup():
+    from tests.db import get_db
+    result = get_db().audit_logs.delete_many({"meta.email": {"$regex": f"@{SOAK_EMAIL_DOMAIN}$"}})
+    print(f"🧹 Removed {result.deleted_count} soak audit_logs rows")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak rateLimitStore/bruteForceStore with synthetic identities")
+    parser.add_argument('--mode', choices=['ip', 'identity'], default='ip')
+    parser.add_argument('--keys', type=int, default=1_000_000, help="synthetic identities to send")
+    parser.add_argument('--rate', type=float, default=500.0, help="new identities per second")
+    parser.add_argument('--duration', type=float, default=0, help="stop after this many seconds (0 = --keys)")
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--sample-interval', type=float, default=10.0)
+    parser.add_argument('--settle', type=float, default=5.0, help="seconds before the final sample")
+    parser.add_argument('--pid', type=int, default=None, help="Next.js server PID (default: autodetect)")
+    parser.add_argument('--memory-limit-mb', type=int, default=1024, help="RSS at which a node is restarted")
+    parser.add_argument('--bot-rate', type=float, default=5.0, help="new identities/s in real bot traffic")
+    parser.add_argument('--csv', default=None, help="write the samples to this CSV file")
+    parser.add_argument('--cleanup', action='store_true', help="delete the audit_logs rows identity mode adds")
+    args = parser.parse_args(argv)
+
+    if args.keys > IP_SPAN:
+        parser.error(f"--keys is limited to {IP_SPAN} distinct IPs")
+    pid = args.pid or find_server_pid()
+    print(f"🧪 {args.keys} {args.mode} keys at {args.rate}/s against {BASE_URL}; "
+          f"server PID {pid or 'not found (no RSS samples)'}")
+
+    soak = Soak(args)
+    try:
+        asyncio.run(soak.run(pid))
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrupted")
+    print_report(soak, args)
+    if args.csv:
+        write_csv(args.csv, soak.samples)
+    if args.cleanup and args.mode == 'identity':
+        cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+On-disk JWT cache for the API test scripts
+
+Logins cost a bcrypt round on the server and count against the
+checkRateLimit buckets in route.js, so tokens are kept in a JSON file keyed
+by base URL and principal ("admin:admin", "user:someone@example.com") and
+reused until shortly before their `exp` claim. Safe to share between
+threads and between parallel processes.
+
+Tokens handed out by get_token() are renewed lazily: when the shared
+client (tests/http_client.py) gets a 401 for one, renew() drops the cache
+entry, logs in again once per principal and the request is retried with
+the new token - so a JWT secret rotation or database reset costs one extra
+login instead of failing every run until the cached token expires.
+
+Environment:
+    API_TOKEN_CACHE      cache file path (default tests/.token_cache.json)
+    API_TOKEN_CACHE=off  disable the cache
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread lock only
+    fcntl = None
+
+CACHE_PATH = os.getenv(
+    'API_TOKEN_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.token_cache.json')
+)
+ENABLED = CACHE_PATH.lower() != 'off'
+
+# Refresh tokens this many seconds before they actually expire
+EXPIRY_MARGIN = 300
+
+_lock = threading.Lock()
+
+# Renewal bookkeeping for this process: token -> (base_url, principal, login)
+# for every token get_token() returned, cache key -> token renew() issued
+_sources = {}
+_renewed = {}
+_renew_lock = threading.Lock()
+
+
+def token_expiry(token):
+    """`exp` claim of a JWT (no signature check), or None"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+def is_fresh(token, now=None):
+    exp = token_expiry(token)
+    if exp is None:
+        return False
+    return exp - EXPIRY_MARGIN > (now or time.time())
+
+
+def cache_key(base_url, principal):
+    """Scripts use both the host and host + /api as their base URL"""
+    base = base_url.rstrip('/')
+    if base.endswith('/api'):
+        base = base[:-len('/api')]
+    return f"{base}|{principal}"
+
+
+class _FileLock:
+    """Cross-process lock on a sidecar file"""
+
+    def __enter__(self):
+        _lock.acquire()
+        self.handle = None
+        if fcntl is not None:
+            self.handle = open(CACHE_PATH + '.lock', 'a')
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+        _lock.release()
+
+
+def _read():
+    try:
+        with open(CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(entries):
+    tmp_path = f"{CACHE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def load(base_url, principal):
+    """Cached entry ({'token': ..., ...}) if its token is still fresh"""
+    if not ENABLED:
+        return None
+    with _FileLock():
+        entry = _read().get(cache_key(base_url, principal))
+    if entry and is_fresh(entry.get('token')):
+        return entry
+    return None
+
+
+def save(base_url, principal, token, **extra):
+    """Store a token plus any extra fields (user id, email, password...)"""
+    if not ENABLED or not token:
+        return
+    with _FileLock():
+        entries = _read()
+        now = time.time()
+        # Drop expired entries while we are here
+        entries = {k: v for k, v in entries.items() if is_fresh(v.get('token'), now)}
+        entries[cache_key(base_url, principal)] = dict(extra, token=token, savedAt=now)
+        _write(entries)
+
+
+def update(base_url, principal, **fields):
+    """Change extra fields of an existing entry (e.g. after a password change)"""
+    if not ENABLED:
+        return
+    with _FileLock():
+        entries = _read()
+        key = cache_key(base_url, principal)
+        if key in entries:
+            entries[key].update(fields)
+            _write(entries)
+
+
+def invalidate(base_url, principal):
+    """Forget a token the server rejected"""
+    if not ENABLED:
+        return
+    with _FileLock():
+        entries = _read()
+        if entries.pop(cache_key(base_url, principal), None) is not None:
+            _write(entries)
+
+
+def _as_entry(result):
+    if isinstance(result, dict):
+        return result if result.get('token') else None
+    return {'token': result} if result else None
+
+
+def get_entry(base_url, principal, login):
+    """Cached entry, or call `login()` and cache what it returns
+
+    `login()` returns a token, a dict with 'token' plus extra fields to
+    cache alongside it, or None on failure.
+    """
+    entry = load(base_url, principal)
+    if entry is None:
+        entry = _as_entry(login())
+        if entry is None:
+            return None
+        save(base_url, principal, **entry)
+    with _renew_lock:
+        _sources[entry['token']] = (base_url, principal, login)
+    return entry
+
+
+def get_token(base_url, principal, login):
+    """Cached token, or call `login()` and cache its result (see get_entry)"""
+    entry = get_entry(base_url, principal, login)
+    return entry['token'] if entry else None
+
+
+def renew(token):
+    """New token for one the server rejected with 401, or None
+
+    Only tokens from get_token()/get_entry() are renewed, each principal at
+    most once per process; later calls with a stale token get the same
+    replacement. The old entry is still cached while `login()` runs, so it
+    can log the same account in again instead of creating a new one.
+    """
+    with _renew_lock:
+        source = _sources.get(token)
+        if source is None:
+            return None
+        base_url, principal, login = source
+        key = cache_key(base_url, principal)
+        if key in _renewed:
+            replacement = _renewed[key]
+            return replacement if replacement != token else None
+        entry = _as_entry(login())
+        _renewed[key] = entry['token'] if entry else None
+        if entry:
+            save(base_url, principal, **entry)
+            _sources[entry['token']] = source
+        else:
+            invalidate(base_url, principal)
+        return _renewed[key]
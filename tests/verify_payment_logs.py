@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Batch re-check of payment_security_logs
+
+Every `hash_mismatch` log stores the hash the callback sent
+(receivedHash) and the one the backend computed (expectedHash). This
+recomputes SHA256(orderId + amount + secret) for each log with the same
+amount formatting as the backend (tests/shopier_crypto.py), and sorts the
+logs into:
+
+    expected ok        expectedHash still reproduces with the current secret
+    expected stale     it does not (secret rotated or order amount changed)
+    order missing      the order no longer exists
+    received <variant> receivedHash matches a known client-side mistake
+                       (Python float repr "20.0", "%.2f", int(), payload
+                       total_order_value, another --secret)
+    received unknown   nothing we know of produces receivedHash
+
+The Shopier secret is decrypted in-process from shopier_settings using
+MASTER_ENCRYPTION_KEY, or passed with --secret (repeatable).
+
+Usage (from the repository root):
+    python -m tests.verify_payment_logs
+    python -m tests.verify_payment_logs --secret test_secret_abcdef --show 5
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+from collections import Counter
+
+from tests.db import get_db
+from tests.shopier_crypto import decrypt, js_number
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_EXAMPLES = 20
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def amount_variants(amount, payload):
+    """Ways a client might have formatted the amount when signing"""
+    variants = {}
+    if isinstance(amount, (int, float)) and not isinstance(amount, bool):
+        variants['python repr'] = str(float(amount))
+        variants['fixed 2'] = f"{amount:.2f}"
+        variants['int'] = str(int(amount))
+    total = (payload or {}).get('total_order_value')
+    if total is not None:
+        variants['payload total'] = str(total)
+    return variants
+
+
+def active_secret(db):
+    settings = db.shopier_settings.find_one({'isActive': True})
+    if not settings:
+        raise ValueError("No active shopier_settings document")
+    return decrypt(settings['apiSecret'])
+
+
+class Verification:
+    def __init__(self, secrets):
+        self.secrets = secrets
+        self.counts = Counter()
+        self.examples = {}
+        self.records = 0
+        self.hash_seconds = 0.0
+
+    def note(self, category, log):
+        self.counts[category] += 1
+        examples = self.examples.setdefault(category, [])
+        if len(examples) < MAX_EXAMPLES:
+            examples.append(log)
+
+    def check(self, log, order):
+        self.records += 1
+        if order is None:
+            self.note('order missing', log)
+            return
+
+        start = time.perf_counter()
+        order_id, amount = order['id'], order.get('amount')
+        prefix = f"{order_id}{js_number(amount)}"
+        primary, others = self.secrets[0], self.secrets[1:]
+
+        expected = _sha256(prefix + primary)
+        self.note('expected ok' if expected == log.get('expectedHash') else 'expected stale', log)
+
+        received = log.get('receivedHash')
+        category = 'received unknown'
+        if received == expected:
+            category = 'received valid'
+        else:
+            for name, text in amount_variants(amount, log.get('payload')).items():
+                if _sha256(f"{order_id}{text}{primary}") == received:
+                    category = f"received {name}"
+                    break
+            else:
+                for index, secret in enumerate(others, start=2):
+                    if _sha256(prefix + secret) == received:
+                        category = f"received secret #{index}"
+                        break
+        self.note(category, log)
+        self.hash_seconds += time.perf_counter() - start
+
+
+def verify(db, secrets, batch_size=DEFAULT_BATCH_SIZE, limit=0):
+    result = Verification(secrets)
+    projection = {'_id': 0, 'orderId': 1, 'expectedHash': 1, 'receivedHash': 1,
+                  'payload.total_order_value': 1, 'timestamp': 1}
+    cursor = db.payment_security_logs.find({}, projection, batch_size=batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    batch = []
+
+    def flush():
+        ids = list({log.get('orderId') for log in batch})
+        orders = {o['id']: o for o in db.orders.find({'id': {'$in': ids}}, {'_id': 0, 'id': 1, 'amount': 1})}
+        for log in batch:
+            result.check(log, orders.get(log.get('orderId')))
+        batch.clear()
+
+    for log in cursor:
+        batch.append(log)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return result
+
+
+def print_report(result, elapsed, show):
+    print("\n" + "=" * 80)
+    print("🔐 PAYMENT SECURITY LOG VERIFICATION")
+    print("=" * 80)
+    print(f"Records: {result.records}")
+    for category, count in sorted(result.counts.items()):
+        icon = "✅" if category in ('expected ok', 'received valid') else "⚠️ "
+        print(f"{icon} {category:<28} {count}")
+    if elapsed > 0:
+        print(f"\n⏱️  {result.records / elapsed:,.0f} records/s end to end, "
+              f"{result.records / result.hash_seconds if result.hash_seconds else 0:,.0f} records/s hashing")
+
+    for category, logs in sorted(result.examples.items()):
+        if show and category not in ('expected ok', 'received valid'):
+            print(f"\n{category}:")
+            for log in logs[:show]:
+                print(f"   order={log.get('orderId')} received={log.get('receivedHash')} "
+                      f"expected={log.get('expectedHash')} at {log.get('timestamp')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-check payment_security_logs hashes offline")
+    parser.add_argument('--secret', action='append', default=[],
+                        help="Shopier API secret (repeatable; default: decrypt the active one)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--limit', type=int, default=0, help="only check this many logs")
+    parser.add_argument('--show', type=int, default=0, help="print N examples per problem category")
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args(argv)
+
+    db = get_db(args.db)
+    secrets = list(args.secret)
+    if not secrets:
+        try:
+            secrets = [active_secret(db)]
+        except ValueError as e:
+            print(f"❌ Could not load the Shopier secret: {e}")
+            return 1
+
+    start = time.perf_counter()
+    result = verify(db, secrets, args.batch_size, args.limit)
+    print_report(result, time.perf_counter() - start, args.show)
+    return 0 if result.counts['expected stale'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())